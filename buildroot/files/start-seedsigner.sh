@@ -26,13 +26,22 @@ killall rkipc 2>/dev/null
 # Change to SeedSigner directory
 cd /seedsigner
 
+# With TEST_METRICS set (a file path or unix:SOCKET, see
+# /test_suite/read_metrics.py), run under the test suite's metrics exporter
+# when the suite is installed
+if [ -n "$TEST_METRICS" ] && [ -f /test_suite/run_with_metrics.py ]; then
+    SEEDSIGNER_CMD="python /test_suite/run_with_metrics.py main.py"
+else
+    SEEDSIGNER_CMD="python main.py"
+fi
+
 # Retry loop
 retry_count=0
 while [ $retry_count -lt $MAX_RETRIES ]; do
     log_message "Starting SeedSigner (attempt $((retry_count + 1))/$MAX_RETRIES)"
     
     # Start SeedSigner
-    if python main.py; then
+    if $SEEDSIGNER_CMD; then
         log_message "SeedSigner exited successfully"
         exit 0
     else
@@ -3,19 +3,24 @@
 import sys
 import os
 import time
+import argparse
 import platform
 
 # Add the seedsigner src directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seedsigner'))
 
-# Monkey patch the Settings class to use our custom settings file
-from seedsigner.models.settings import Settings
+from perf.imports import lazy_import, use_test_settings_file
+from perf.runner import Test, add_runner_arguments, finish, run_tests
 
+# Monkey patch the Settings class to use our custom settings file, whenever
+# something first imports it
+use_test_settings_file()
 
-Settings.SETTINGS_FILENAME = "/seedsigner/settings.json"
-
-from seedsigner.hardware.buttons import HardwareButtons, HardwareButtonsConstants
-from seedsigner.models.settings_definition import SettingsConstants
+# SeedSigner's settings and button driver load on first use, not at startup
+Settings = lazy_import("seedsigner.models.settings", "Settings")
+SettingsConstants = lazy_import("seedsigner.models.settings_definition", "SettingsConstants")
+HardwareButtons = lazy_import("seedsigner.hardware.buttons", "HardwareButtons")
+HardwareButtonsConstants = lazy_import("seedsigner.hardware.buttons", "HardwareButtonsConstants")
 
 def test_button_initialization():
     """Test that buttons can be initialized"""
@@ -144,35 +149,27 @@ def test_each_button():
     print(f"\nPassed: {passed}/{total}")
     return passed == total
 
+def suite():
+    """The button tests, in order"""
+    return [
+        Test(test_button_initialization, resources=["buttons"]),
+        Test(test_button_names),
+        Test(test_hardware_config),
+        Test(test_current_hardware_config),
+        # trigger_override() would end a wait_for() in progress
+        Test(test_button_press_simulation, resources=["buttons"]),
+        Test(test_each_button, interactive=True, resources=["buttons"]),
+    ]
+
 def main():
+    parser = argparse.ArgumentParser(description='Test the hardware buttons')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
     print("=== Basic Button Test Script ===\n")
     
-    tests = [
-        test_button_initialization,
-        test_button_names,
-        test_hardware_config,
-        test_current_hardware_config,
-        test_button_press_simulation,
-        test_each_button
-    ]
-    
-    passed = 0
-    total = len(tests)
-    
-    for test in tests:
-        if test():
-            passed += 1
-        print()
-    
-    print(f"=== Test Results ===")
-    print(f"Passed: {passed}/{total}")
-    
-    if passed == total:
-        print("✓ All tests passed!")
-        return 0
-    else:
-        print("✗ Some tests failed!")
-        return 1
+    report = run_tests("buttons", suite(), concurrent=not args.serial)
+    return finish(report, args)
 
 if __name__ == "__main__":
     sys.exit(main())
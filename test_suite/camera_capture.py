@@ -7,12 +7,24 @@ from datetime import datetime
 # Add the seedsigner src directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seedsigner'))
 
-# Monkey patch the Settings class to use our custom settings file
-from seedsigner.models.settings import Settings
-Settings.SETTINGS_FILENAME = "/seedsigner/settings.json"
+from capture.framelog import FrameLogWriter
+from capture.ring import CaptureProducer, FrameRing, format_ring_stats
+from capture.scheduler import DeadlineScheduler
+from capture.sources import CameraImageSource
+from capture.v4l2 import V4L2Stream
+from capture.warmup import thumbnail_probe, wait_for_ring
+from capture.writer import PhotoWriter
+from perf.imports import lazy_import, use_test_settings_file
+from perf.stats import format_summary
 
-from seedsigner.models.settings_definition import SettingsConstants
-from seedsigner.hardware.camera import Camera
+# Monkey patch the Settings class to use our custom settings file, whenever
+# something first imports it
+use_test_settings_file()
+
+# SeedSigner's settings and camera load on first use, not at startup
+Settings = lazy_import("seedsigner.models.settings", "Settings")
+SettingsConstants = lazy_import("seedsigner.models.settings_definition", "SettingsConstants")
+Camera = lazy_import("seedsigner.hardware.camera", "Camera")
 
 def initialize_camera():
     """Initialize the camera"""
@@ -49,12 +61,107 @@ def get_camera_settings():
         print(f"✗ Camera settings failed: {e}")
         return False
 
-def capture_photos(camera, interval_seconds, output_dir, max_photos=None, format='jpg'):
+class FrameSaver:
+    """
+    Where captured frames go: encoded images through the PhotoWriter pool,
+    or raw NV12 frames appended to a single frame log for `raw`.
+    """
+    def __init__(self, source, output_dir, format, workers, fsync_batch):
+        self.source = source
+        self.output_dir = output_dir
+        self.extension = format.lower()
+        self.writer = None
+        self.log = None
+        if self.extension == "raw":
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            log_path = os.path.join(output_dir, f"frames_{timestamp}.nv12log")
+            self.log = FrameLogWriter(log_path, source.width, source.height, stride=source.stride,
+                                      frame_size=source.frame_size, pixelformat=source.pixelformat)
+        else:
+            # Map user format to PIL format string
+            format_map = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG"}
+            self.save_format = format_map.get(self.extension, "PNG")
+            # Encoding and file writes happen on a worker pool off the capture loop
+            self.writer = PhotoWriter(workers=workers, fsync_batch=fsync_batch)
+
+
+    def save(self, frame, name, capture_time=0.0):
+        """Save a ring frame; returns a description of where it went"""
+        if self.log:
+            n = self.log.append(frame.data, frame.timestamp)
+            return f"{self.log.path} [frame {n}]"
+        filepath = os.path.join(self.output_dir, f"{name}.{self.extension}")
+        self.writer.submit(self.source.to_image(frame), filepath, self.save_format, capture_time)
+        return filepath
+
+
+    def close(self):
+        if self.log:
+            self.log.close()
+            print(f"\n✓ Frame log: {self.log.path} ({self.log.count} frames, {self.log.bytes_written} bytes)")
+        else:
+            # Let queued photos finish writing before reporting
+            self.writer.close()
+            print("\n=== Save Timing ===")
+            self.writer.report()
+
+class BurstFrame:
+    """A frame read for a burst, shaped like a ring Frame"""
+    def __init__(self, timestamp, data):
+        self.timestamp = timestamp
+        self.data = data
+
+def capture_burst(source, saver, count, timeout=5):
+    """
+    Grab `count` consecutive frames into memory as fast as the sensor
+    delivers them, then hand them all to the saver.
+
+    Frames are read straight from the source, so none can be overwritten
+    in a ring between two reads; the capture thread must be stopped.
+    """
+    print(f"\nCapturing burst of {count} frames...")
+    frames = []
+    deadline = time.monotonic() + timeout
+    while len(frames) < count:
+        buf = bytearray(source.frame_size)
+        length = source.readinto(buf)
+        if not length:
+            if time.monotonic() > deadline:
+                print(f"✗ Burst stopped after {len(frames)} frames")
+                break
+            time.sleep(0.005)
+            continue
+        deadline = time.monotonic() + timeout
+        frames.append(BurstFrame(source.last_timestamp, buf if length == len(buf) else buf[:length]))
+    
+    if len(frames) > 1:
+        elapsed = frames[-1].timestamp - frames[0].timestamp
+        gaps = [b.timestamp - a.timestamp for a, b in zip(frames, frames[1:])]
+        print(f"✓ Captured {len(frames)} frames in {elapsed:.2f}s ({(len(frames) - 1) / elapsed:.1f} fps)")
+        print(format_summary("  frame gap", gaps))
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for i, frame in enumerate(frames, 1):
+        saver.save(frame, f"burst_{timestamp}_{i:04d}")
+    print(f"✓ Saved {len(frames)} burst frames")
+    return len(frames)
+
+def capture_photos(camera, interval_seconds, output_dir, max_photos=None, format='jpg', workers=2, fsync_batch=8,
+                   policy='skip', burst=None, warmup=3.0):
     """Capture photos at specified intervals and save them"""
+    if burst and max_photos:
+        burst = min(burst, max_photos)
     print(f"\n=== Starting Photo Capture ===")
-    print(f"Interval: {interval_seconds} seconds")
+    if burst:
+        print(f"Burst: {burst} frames")
+    elif interval_seconds > 0:
+        print(f"Interval: {interval_seconds} seconds ({policy} late frames)")
+    else:
+        print("Interval: every frame")
     print(f"Output directory: {output_dir}")
     print(f"Format: {format}")
+    if format != "raw":
+        print(f"Writer threads: {workers}, fsync every {fsync_batch} photos")
     if max_photos:
         print(f"Max photos: {max_photos}")
     else:
@@ -63,59 +170,82 @@ def capture_photos(camera, interval_seconds, output_dir, max_photos=None, format
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # Start video stream mode
-    camera.start_video_stream_mode()
+    # Start video stream mode. Raw frames come straight from V4L2 so they
+    # are recorded exactly as the sensor delivered them.
+    if format == "raw":
+        source = V4L2Stream.from_settings()
+    else:
+        source = CameraImageSource(camera)
+    stream_started = time.monotonic()
+    source.start()
     print("✓ Video stream started")
     
-    # Give the camera time to initialize and warm up
-    print("Waiting for camera to initialize...")
-    time.sleep(3)
+    # Capture runs on its own thread so saving never holds up the sensor
+    ring = FrameRing(source.frame_size)
+    producer = CaptureProducer(source, ring)
+    producer.start()
+    
+    # Wait until exposure has settled rather than for a fixed time
+    print("Waiting for camera to warm up...")
+    warmup_state = wait_for_ring(ring, thumbnail_probe(source), max_wait=warmup, started_at=stream_started)
+    print(warmup_state.summary())
+    last_seq = 0
+    
+    saver = FrameSaver(source, output_dir, format, workers, fsync_batch)
     
     photo_count = 0
     start_time = time.time()
     
-    # Map user format to PIL format string
-    format_map = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG"}
-    save_format = format_map.get(format.lower(), "PNG")
+    # Deadlines are fixed on the monotonic clock so capture time doesn't add drift
+    scheduler = DeadlineScheduler(interval_seconds, policy=policy) if interval_seconds > 0 else None
     
     try:
+        if burst:
+            # The burst reads the source itself, one frame after another
+            producer.stop()
+            if producer.is_alive():
+                print("✗ Capture thread did not stop, no burst taken")
+                return photo_count
+            photo_count = capture_burst(source, saver, burst)
+            return photo_count
+        
         while True:
             if max_photos and photo_count >= max_photos:
                 print(f"\n✓ Reached maximum number of photos ({max_photos})")
                 break
             
+            # Wait for the next slot on the schedule
+            lateness = scheduler.wait() if scheduler else 0.0
+            
             photo_count += 1
             current_time = datetime.now()
             timestamp = current_time.strftime("%Y%m%d_%H%M%S")
-            filename = f"photo_{timestamp}_{photo_count:04d}.{format.lower()}"
-            filepath = os.path.join(output_dir, filename)
+            name = f"photo_{timestamp}_{photo_count:04d}"
             
-            print(f"\nTaking photo {photo_count}...")
+            if scheduler:
+                print(f"\nTaking photo {photo_count}... (late by {lateness * 1000:.1f}ms)")
             
             try:
-                # Capture image from camera
-                image = camera.read_video_stream(as_image=True)
+                # Take the newest frame from the capture thread
+                capture_start = time.monotonic()
+                frame = ring.acquire(after_seq=last_seq, timeout=5)
                 
-                if image is not None:
-                    # Save the image
-                    image.save(filepath, format=save_format)
-                    print(f"✓ Photo {photo_count} saved: {filename}")
-                    print(f"  Size: {image.size}")
-                    print(f"  File: {filepath}")
+                if frame is not None:
+                    with frame:
+                        last_seq = frame.seq
+                        location = saver.save(frame, name, time.monotonic() - capture_start)
+                    if scheduler:
+                        print(f"✓ Photo {photo_count} saved: {location}")
                 else:
                     print(f"✗ Failed to capture photo {photo_count}")
+                    if producer.error:
+                        print(f"✗ Capture thread stopped: {producer.error}")
+                        break
                     continue
                 
             except Exception as e:
                 print(f"✗ Error capturing photo {photo_count}: {e}")
                 continue
-            
-            # Wait for next capture (except after the last photo)
-            if max_photos and photo_count >= max_photos:
-                break
-            
-            print(f"Waiting {interval_seconds} seconds before next capture...")
-            time.sleep(interval_seconds)
     
     except KeyboardInterrupt:
         print(f"\n\n=== Capture Interrupted by User ===")
@@ -124,22 +254,39 @@ def capture_photos(camera, interval_seconds, output_dir, max_photos=None, format
         print(f"Total time: {elapsed_time:.1f} seconds")
     
     finally:
-        # Stop video stream mode
-        camera.stop_video_stream_mode()
+        # Stop the capture thread, then video stream mode
+        producer.stop()
+        source.stop()
         print("✓ Video stream stopped")
+        print(f"Frame ring: {format_ring_stats(ring.stats())}")
+        
+        saver.close()
+        if scheduler and scheduler.ticks:
+            print("\n=== Schedule Jitter ===")
+            scheduler.report()
     
     return photo_count
 
 def main():
     parser = argparse.ArgumentParser(description='Capture photos from camera at configurable intervals')
-    parser.add_argument('--interval', '-i', type=int, default=5, 
-                       help='Interval between photos in seconds (default: 5)')
+    parser.add_argument('--interval', '-i', type=float, default=5, 
+                       help='Interval between photos in seconds, fractions allowed; 0 takes every frame (default: 5)')
+    parser.add_argument('--policy', type=str, choices=['skip', 'catchup'], default='skip',
+                       help='What to do with deadlines missed while busy (default: skip)')
+    parser.add_argument('--burst', '-b', type=int, default=None,
+                       help='Capture N consecutive frames into memory, then save them (at most --max)')
     parser.add_argument('--output', '-o', type=str, default='./captured_photos',
                        help='Output directory for photos (default: ./captured_photos)')
     parser.add_argument('--max', '-m', type=int, default=None,
                        help='Maximum number of photos to capture (default: unlimited)')
-    parser.add_argument('--format', '-f', type=str, choices=['jpg', 'png'], default='jpg',
-                       help='Image format (default: jpg)')
+    parser.add_argument('--format', '-f', type=str, choices=['jpg', 'png', 'raw'], default='jpg',
+                       help='Image format; raw appends NV12 frames to an indexed frame log (default: jpg)')
+    parser.add_argument('--workers', '-w', type=int, default=2,
+                       help='Threads encoding and writing photos (default: 2)')
+    parser.add_argument('--fsync-batch', type=int, default=8,
+                       help='Number of photos written between fsyncs (default: 8)')
+    parser.add_argument('--warmup', type=float, default=3.0,
+                       help='Longest to wait for camera exposure to settle, in seconds (default: 3)')
     parser.add_argument('--settings', '-s', action='store_true',
                        help='Show camera settings and exit')
     
@@ -169,7 +316,12 @@ def main():
         interval_seconds=args.interval,
         output_dir=args.output,
         max_photos=args.max,
-        format=args.format
+        format=args.format,
+        workers=args.workers,
+        fsync_batch=args.fsync_batch,
+        policy=args.policy,
+        burst=args.burst,
+        warmup=args.warmup
     )
     
     print(f"\n=== Capture Complete ===")
@@ -1,18 +1,41 @@
 import sys
 import os
 import time
+import argparse
 import platform
 
 # Add the seedsigner src directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seedsigner'))
 
-# Monkey patch the Settings class to use our custom settings file
-from seedsigner.models.settings import Settings
-Settings.SETTINGS_FILENAME = "/seedsigner/settings.json"
+from capture.preview import PreviewPipeline
+from capture.ring import format_ring_stats
+from capture.session import format_session_stats, get_session, stop_sessions
+from capture.sources import CameraImageSource
+from capture.v4l2 import V4L2Stream
+from imaging.nv12 import NV12ToRGB565
+from imaging.remap import remap_cache
+from perf.imports import lazy_import, use_test_settings_file
+from perf.memory import low_memory_requested
+from perf.metrics import export_metrics
+from perf.profiling import profiled, span
+from perf.runner import Test, add_runner_arguments, finish, run_tests
 
-from seedsigner.gui.renderer import Renderer
-from seedsigner.models.settings_definition import SettingsConstants
-from seedsigner.hardware.camera import Camera
+# Monkey patch the Settings class to use our custom settings file, whenever
+# something first imports it
+use_test_settings_file()
+
+# SeedSigner's settings, GUI and camera load on first use, not at startup
+Settings = lazy_import("seedsigner.models.settings", "Settings")
+SettingsConstants = lazy_import("seedsigner.models.settings_definition", "SettingsConstants")
+Renderer = lazy_import("seedsigner.gui.renderer", "Renderer")
+Camera = lazy_import("seedsigner.hardware.camera", "Camera")
+
+# How long the live preview benchmark runs for
+PREVIEW_SECONDS = 10
+
+# TEST_LOW_MEMORY=1 runs the preview on preallocated buffers; compare the
+# peak RSS the runner records against a normal run
+LOW_MEMORY = low_memory_requested()
 
 def initialize_renderer():
     """Initialize the renderer once for all tests"""
@@ -89,74 +112,80 @@ def test_current_camera_config():
         print(f"✗ Failed to get current camera config: {e}")
         return False
 
+def fit_to_canvas(data, size, mode, renderer):
+    """
+    Scale raw image bytes to the canvas with Pillow's nearest-neighbour
+    resize, through a cached remap table. The SeedSigner camera already
+    applies the rotation setting, so none is added here. The result is a
+    new image, so the frame can go back to the ring right after.
+    """
+    table = remap_cache.get(size[0], size[1], renderer.canvas_width, renderer.canvas_height,
+                            fit="stretch", layout=mode.lower())
+    with span("resize"):
+        return table.apply(data)
+
+def camera_session():
+    """The shared camera stream, kept open between tests"""
+    return get_session("camera", lambda: CameraImageSource(Camera.get_instance()))
+
 def test_camera_capture_and_display():
     """Test taking photos and displaying them on the LCD"""
     print("\n=== Testing Camera Capture and Display ===")
     print("Taking 10 photos and displaying them on screen...")
     
     try:
-        camera = Camera.get_instance()
         renderer = Renderer.get_instance()
         
-        # Start video stream mode
-        camera.start_video_stream_mode()
-        print("✓ Video stream started")
-        
-        for i in range(1, 11):
-            print(f"\nTaking photo {i}/10...")
+        # The session keeps capturing in the background while frames are displayed
+        with camera_session() as session:
+            print("✓ Video stream ready")
             
-            try:
-                # Capture image from camera using read_video_stream
-                image = camera.read_video_stream(as_image=True)
+            for i in range(1, 11):
+                print(f"\nTaking photo {i}/10...")
                 
-                if image is not None:
-                    print(f"✓ Photo {i} captured successfully")
-                    
-                    # Resize image to fit the LCD screen
-                    resized_image = image.resize((renderer.canvas_width, renderer.canvas_height))
+                try:
+                    # Take the newest frame from the capture thread
+                    resized_image = None
+                    frame = session.next_frame(timeout=5)
+                    if frame is not None:
+                        with frame:
+                            # Scale straight out of the ring buffer to fit the LCD screen
+                            resized_image = fit_to_canvas(frame.data, session.source.size, session.source.mode, renderer)
                     
-                    # Display the image on the LCD
-                    renderer.show_image(resized_image, show_direct=True)
-                    
-                    print(f"✓ Photo {i} displayed on screen")
-                else:
-                    print(f"✗ Failed to capture photo {i}")
-                
-                # Wait between captures
-                if i < 10:  # Don't wait after the last photo
-                    print("Waiting 3 seconds before next capture...")
-                    time.sleep(3)
+                    if resized_image is not None:
+                        print(f"✓ Photo {i} captured successfully")
+                        
+                        # Display the image on the LCD
+                        renderer.show_image(resized_image, show_direct=True)
+                        
+                        print(f"✓ Photo {i} displayed on screen")
+                    else:
+                        print(f"✗ Failed to capture photo {i}")
                     
-            except Exception as e:
-                print(f"✗ Error capturing/displaying photo {i}: {e}")
-                continue
-        
-        # Stop video stream mode
-        camera.stop_video_stream_mode()
-        print("✓ Video stream stopped")
+                    # Wait between captures
+                    if i < 10:  # Don't wait after the last photo
+                        print("Waiting 3 seconds before next capture...")
+                        time.sleep(3)
+                        
+                except Exception as e:
+                    print(f"✗ Error capturing/displaying photo {i}: {e}")
+                    continue
+            
+            print(f"Frame ring: {format_ring_stats(session.ring.stats())}")
         
         print("\n✓ Camera capture and display test completed")
         return True
         
     except Exception as e:
         print(f"✗ Camera capture and display test failed: {e}")
-        # Make sure to stop video stream even if there's an error
-        try:
-            camera.stop_video_stream_mode()
-        except:
-            pass
         return False
 
 def test_camera_resolution():
     """Test different camera resolutions"""
     print("\nTesting camera resolutions...")
     try:
-        camera = Camera.get_instance()
         renderer = Renderer.get_instance()
         
-        # Start video stream mode
-        camera.start_video_stream_mode()
-        
         # Get current resolution from settings
         settings = Settings.get_instance()
         hardware_config = settings.get_value(SettingsConstants.SETTING__HARDWARE_CONFIG)
@@ -164,30 +193,96 @@ def test_camera_resolution():
         current_resolution = pin_mapping["resolution"]
         print(f"✓ Current resolution: {current_resolution}")
         
-        # Test capturing at current resolution
-        image = camera.read_video_stream(as_image=True)
-        if image is not None:
-            print(f"✓ Captured image size: {image.size}")
-            
-            # Display the image
-            resized_image = image.resize((renderer.canvas_width, renderer.canvas_height))
-            renderer.show_image(resized_image, show_direct=True)
-            time.sleep(2)
-        
-        # Stop video stream mode
-        camera.stop_video_stream_mode()
+        # Test capturing at current resolution; the stream stays open for the next test
+        with camera_session() as session:
+            frame = session.next_frame(timeout=5)
+            if frame is not None:
+                with frame:
+                    print(f"✓ Captured image size: {session.source.size}")
+                    resized_image = fit_to_canvas(frame.data, session.source.size, session.source.mode, renderer)
+                
+                # Display the image
+                renderer.show_image(resized_image, show_direct=True)
+                time.sleep(2)
         
         return True
     except Exception as e:
         print(f"✗ Camera resolution test failed: {e}")
-        # Make sure to stop video stream even if there's an error
-        try:
-            camera.stop_video_stream_mode()
-        except:
-            pass
         return False
 
+def make_preview_stages(renderer, source):
+    """
+    Pick the convert/display pair for the live preview. Panels that accept
+    a pre-encoded RGB565 buffer get one straight from the fused converter;
+    otherwise the renderer is fed PIL images from the same Pillow crop,
+    scale and transpose. The camera rotation setting is followed frame by
+    frame.
+
+    Returns (convert, sink, kind, output_size); in low-memory mode the
+    RGB565 path converts into the pipeline's preallocated buffers of
+    output_size bytes, otherwise output_size is None.
+    """
+    converter = NV12ToRGB565(source.width, source.height, renderer.canvas_width, renderer.canvas_height,
+                             stride=source.stride, rotation=None, fit="crop")
+    show_buffer = getattr(getattr(renderer, "disp", None), "ShowBuffer", None)
+    if show_buffer is not None:
+        if LOW_MEMORY:
+            return converter.convert_into, show_buffer, "rgb565, preallocated buffers", converter.output_size
+        return converter.convert, show_buffer, "rgb565", None
+    return converter.to_image, lambda image: renderer.show_image(image, show_direct=True), "image", None
+
+def test_camera_live_preview():
+    """Benchmark the live camera -> LCD path with pipelined stages"""
+    print(f"\n=== Live Preview Benchmark ({PREVIEW_SECONDS}s) ===")
+    source = None
+    try:
+        renderer = Renderer.get_instance()
+        
+        # The raw stream needs the device to itself
+        stop_sessions()
+        source = V4L2Stream.from_settings()
+        source.start()
+        print(f"✓ Raw stream started: {source.width}x{source.height} {source.pixelformat}")
+        
+        convert, sink, kind, output_size = make_preview_stages(renderer, source)
+        print(f"✓ Display path: {kind}")
+        
+        pipeline = PreviewPipeline(source, convert, sink, output_size=output_size)
+        pipeline.run(PREVIEW_SECONDS)
+        pipeline.report()
+        
+        if pipeline.error:
+            print(f"✗ Preview stopped early: {pipeline.error}")
+            return False
+        if not pipeline.displayed:
+            print("✗ No frames were displayed")
+            return False
+        print("✓ Live preview benchmark completed")
+        return True
+    except Exception as e:
+        print(f"✗ Live preview benchmark failed: {e}")
+        return False
+    finally:
+        if source is not None:
+            source.stop()
+
+def suite():
+    """The camera tests, in order; the renderer must already be initialized"""
+    return [
+        Test(test_camera_initialization, resources=["camera"]),
+        Test(test_camera_settings),
+        Test(test_camera_hardware_config),
+        Test(test_current_camera_config),
+        Test(test_camera_resolution, resources=["camera", "display"]),
+        Test(test_camera_capture_and_display, resources=["camera", "display"]),
+        Test(test_camera_live_preview, resources=["camera", "display"]),
+    ]
+
 def main():
+    parser = argparse.ArgumentParser(description='Test the camera and its capture and preview paths')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
     print("=== Camera Test Script ===\n")
     
     # Initialize the renderer once at the beginning
@@ -197,32 +292,12 @@ def main():
         print("✗ Failed to initialize renderer. Exiting.")
         return 1
     
-    tests = [
-        test_camera_initialization,
-        test_camera_settings,
-        test_camera_hardware_config,
-        test_current_camera_config,
-        test_camera_resolution,
-        test_camera_capture_and_display
-    ]
+    report = run_tests("camera", suite(), concurrent=not args.serial)
     
-    passed = 0
-    total = len(tests)
-    
-    for test in tests:
-        if test():
-            passed += 1
-        print()
-    
-    print(f"=== Test Results ===")
-    print(f"Passed: {passed}/{total}")
-    
-    if passed == total:
-        print("✓ All tests passed!")
-        return 0
-    else:
-        print("✗ Some tests failed!")
-        return 1
+    stop_sessions()
+    print(f"Camera session: {format_session_stats(camera_session().stats())}")
+    return finish(report, args)
 
 if __name__ == "__main__":
-    sys.exit(main())
+    with export_metrics():
+        sys.exit(profiled(main))
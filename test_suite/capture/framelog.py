@@ -0,0 +1,186 @@
+import mmap
+import os
+import struct
+import time
+
+from imaging.nv12 import nv12_frame_size
+
+
+# Log file: fixed header, then raw frames back to back.
+LOG_MAGIC = b"NV12LOG1"
+LOG_HEADER = struct.Struct("<8sIIII8s32x")    # magic, width, height, stride, frame_size, pixelformat
+
+# Index file: fixed header, then one fixed-size record per frame so a reader
+# can jump to record N directly.
+INDEX_MAGIC = b"NV12IDX1"
+INDEX_HEADER = struct.Struct("<8s8x")
+INDEX_RECORD = struct.Struct("<QdII")          # offset, timestamp, size, sequence
+
+
+def index_path(log_path):
+    return os.path.splitext(log_path)[0] + ".idx"
+
+
+class FrameLogWriter:
+    """
+    Append-only log of raw NV12 frames with a separate seekable index.
+
+    Frames are written as-is, with no encoding, into a file that is
+    preallocated in chunks of `prealloc_frames` so appends don't fragment or
+    stall on block allocation. close() trims the unused preallocated tail.
+
+    Every `flush_frames` frames the log and then the index are flushed, so
+    a reader, or a capture that is cut short, sees the index up to there.
+    """
+    def __init__(self, path, width, height, stride=None, frame_size=None, pixelformat="NV12", prealloc_frames=256,
+                 flush_frames=30):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+        self.frame_size = frame_size or nv12_frame_size(width, height, self.stride)
+        self.prealloc_bytes = prealloc_frames * self.frame_size
+        self.flush_frames = flush_frames
+        self.count = 0
+
+        self._log = open(path, "wb")
+        self._log.write(LOG_HEADER.pack(LOG_MAGIC, width, height, self.stride, self.frame_size, pixelformat.encode()))
+        self._offset = LOG_HEADER.size
+        self._allocated = self._offset
+        self._preallocate()
+
+        self._index = open(index_path(path), "wb")
+        self._index.write(INDEX_HEADER.pack(INDEX_MAGIC))
+
+
+    def _preallocate(self):
+        target = self._allocated + self.prealloc_bytes
+        try:
+            os.posix_fallocate(self._log.fileno(), self._allocated, target - self._allocated)
+        except (AttributeError, OSError):
+            # Not supported by every filesystem; appends still work without it
+            pass
+        self._allocated = target
+
+
+    def append(self, data, timestamp=None):
+        """Append one frame (any bytes-like object) and index it"""
+        size = len(data)
+        if self._offset + size > self._allocated:
+            self._preallocate()
+        self._log.write(data)
+        self._index.write(INDEX_RECORD.pack(self._offset, time.monotonic() if timestamp is None else timestamp, size, self.count))
+        self._offset += size
+        self.count += 1
+        if self.flush_frames and self.count % self.flush_frames == 0:
+            self.flush()
+        return self.count - 1
+
+
+    def flush(self):
+        # The log goes first, so no flushed index record points past its data
+        self._log.flush()
+        self._index.flush()
+
+
+    @property
+    def bytes_written(self):
+        return self._offset
+
+
+    def close(self):
+        if self._log.closed:
+            return
+        self._log.flush()
+        self._log.truncate(self._offset)
+        self._log.close()
+        self._index.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FrameLogReader:
+    """
+    Random access to a frame log through mmap.
+
+    Only the fixed-size header and index records are parsed, so opening a
+    log is constant time and frame(n) is a zero-copy slice of the log.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._log = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.stride, self.frame_size, pixelformat = LOG_HEADER.unpack_from(self._log, 0)
+        if magic != LOG_MAGIC:
+            raise ValueError(f"{path} is not a frame log")
+        self.pixelformat = pixelformat.rstrip(b"\0").decode()
+
+        with open(index_path(path), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if len(self._index) < INDEX_HEADER.size or INDEX_HEADER.unpack_from(self._index, 0)[0] != INDEX_MAGIC:
+            raise ValueError(f"{index_path(path)} is not a frame log index")
+        # A torn final record from an interrupted capture is ignored
+        self.count = (len(self._index) - INDEX_HEADER.size) // INDEX_RECORD.size
+
+
+    def __len__(self):
+        return self.count
+
+
+    def record(self, n):
+        """(offset, timestamp, size, sequence) of frame n"""
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        return INDEX_RECORD.unpack_from(self._index, INDEX_HEADER.size + n * INDEX_RECORD.size)
+
+
+    def frame(self, n):
+        """
+        Zero-copy view of the raw bytes of frame n. Views must be released
+        before the reader is closed.
+        """
+        offset, _, size, _ = self.record(n)
+        return memoryview(self._log)[offset:offset + size]
+
+
+    def timestamp(self, n):
+        return self.record(n)[1]
+
+
+    def find(self, timestamp):
+        """Index of the first frame captured at or after `timestamp`"""
+        # Binary search straight over the index records
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+    def __iter__(self):
+        for n in range(self.count):
+            yield self.frame(n)
+
+
+    def close(self):
+        self._log.close()
+        if isinstance(self._index, mmap.mmap):
+            self._index.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,198 @@
+import queue
+import threading
+import time
+
+from capture.ring import CaptureProducer, FrameRing, format_ring_stats
+from perf.stats import format_summary, summarize
+
+
+class _Mailbox:
+    """Single-slot handoff where a newer item replaces one not yet taken"""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.replaced = 0
+
+
+    def put(self, item):
+        """Leave `item` for the consumer; returns the item it replaced, if any"""
+        with self._cond:
+            replaced = self._item
+            if replaced is not None:
+                self.replaced += 1
+            self._item = item
+            self._cond.notify()
+            return replaced
+
+
+    def get(self, timeout=None):
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class PreviewPipeline:
+    """
+    Live camera -> LCD preview with the stages overlapped on separate threads:
+
+      capture   CaptureProducer filling a FrameRing from the raw source
+      convert   NV12 -> panel format through the fused converter
+      display   panel transfer through `sink`
+
+    Each stage only ever works on the newest item from the one before it,
+    so a slow stage lowers the frame rate without building up latency.
+    `convert` is called with the raw frame bytes and returns whatever `sink`
+    accepts (an RGB565 buffer or a PIL image).
+
+    Each stage is timed: `capture` is the source read on the producer
+    thread, which includes waiting for the sensor's next frame.
+
+    Latency is measured from when the frame was read off the sensor to when
+    the display write returned, which is the closest software-visible proxy
+    for glass-to-glass latency.
+
+    With `output_size`, the converted frames live in a fixed set of
+    preallocated buffers of that size instead: `convert` is called as
+    convert(frame_data, out) and fills `out`, and each buffer goes back to
+    the pool once `sink` has returned or a newer frame replaced it. Three
+    are enough for one on the panel, one waiting and one being converted,
+    so together with the ring the whole path runs on preallocated memory.
+    """
+    OUTPUT_BUFFERS = 3
+
+    def __init__(self, source, convert, sink, ring_slots=4, output_size=None):
+        self.source = source
+        self.convert = convert
+        self.sink = sink
+        self.ring = FrameRing(source.frame_size, slots=ring_slots)
+        self.producer = CaptureProducer(source, self.ring)
+        self._mailbox = _Mailbox()
+        self._free = None
+        if output_size is not None:
+            self._free = queue.SimpleQueue()
+            for _ in range(self.OUTPUT_BUFFERS):
+                self._free.put(bytearray(output_size))
+        self._running = threading.Event()
+        self.convert_times = []
+        self.display_times = []
+        self.latencies = []
+        self.displayed = 0
+        self.duration = 0.0
+        self.error = None
+
+
+    def _take_buffer(self):
+        """A free output buffer, or None once the pipeline has stopped"""
+        while self._running.is_set():
+            try:
+                return self._free.get(timeout=0.5)
+            except queue.Empty:
+                # All three are out; one comes back when the display is done
+                continue
+        return None
+
+
+    def _convert_loop(self):
+        last_seq = 0
+        try:
+            while self._running.is_set():
+                frame = self.ring.acquire(after_seq=last_seq, timeout=0.5)
+                if frame is None:
+                    continue
+                with frame:
+                    last_seq = frame.seq
+                    start = time.monotonic()
+                    if self._free is None:
+                        output = self.convert(frame.data)
+                    else:
+                        output = self._take_buffer()
+                        if output is None:
+                            break
+                        try:
+                            self.convert(frame.data, output)
+                        except BaseException:
+                            self._free.put(output)
+                            raise
+                    self.convert_times.append(time.monotonic() - start)
+                    replaced = self._mailbox.put((frame.timestamp, output))
+                    if replaced is not None and self._free is not None:
+                        self._free.put(replaced[1])
+        except Exception as e:
+            self.error = e
+            self._running.clear()
+        finally:
+            self._mailbox.close()
+
+
+    def run(self, duration):
+        """Run the preview for `duration` seconds; display happens on this thread"""
+        self._running.set()
+        self.producer.start()
+        converter = threading.Thread(target=self._convert_loop, name="preview-convert", daemon=True)
+        converter.start()
+
+        start = time.monotonic()
+        end = start + duration
+        try:
+            while self._running.is_set() and time.monotonic() < end:
+                item = self._mailbox.get(timeout=0.5)
+                if item is None:
+                    continue
+                captured_at, output = item
+                t0 = time.monotonic()
+                try:
+                    self.sink(output)
+                finally:
+                    if self._free is not None:
+                        self._free.put(output)
+                t1 = time.monotonic()
+                self.display_times.append(t1 - t0)
+                self.latencies.append(t1 - captured_at)
+                self.displayed += 1
+        finally:
+            self.duration = time.monotonic() - start
+            self._running.clear()
+            self.producer.stop()
+            converter.join(2)
+        if self.error is None:
+            self.error = self.producer.error
+        return self.displayed
+
+
+    def results(self):
+        """Summary of the run as plain data"""
+        return {
+            "duration": self.duration,
+            "displayed": self.displayed,
+            "fps": self.displayed / self.duration if self.duration else 0.0,
+            "capture_fps": self.ring.captured / self.duration if self.duration else 0.0,
+            "superseded": self._mailbox.replaced,
+            "capture": summarize(self.producer.read_times),
+            "convert": summarize(self.convert_times),
+            "display": summarize(self.display_times),
+            "latency": summarize(self.latencies),
+            "ring": self.ring.stats(),
+        }
+
+
+    def report(self):
+        r = self.results()
+        print(f"Displayed {r['displayed']} frames in {r['duration']:.1f}s: {r['fps']:.1f} fps "
+              f"(sensor {r['capture_fps']:.1f} fps)")
+        print(format_summary("  capture", self.producer.read_times))
+        print(format_summary("  convert", self.convert_times))
+        print(format_summary("  display", self.display_times))
+        print(format_summary("  capture->display latency", self.latencies))
+        lat = r["latency"]
+        print(f"  latency p90={lat['p90'] * 1000:.1f}ms p99={lat['p99'] * 1000:.1f}ms")
+        print(f"  converted frames replaced before display: {r['superseded']}")
+        print(f"  ring: {format_ring_stats(r['ring'])}")
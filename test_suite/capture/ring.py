@@ -0,0 +1,259 @@
+import threading
+import time
+from collections import deque
+
+from perf.metrics import metrics
+from perf.stats import summarize
+
+
+# Process-wide totals over every ring; the capture frame rate is the rate of capture.frames
+_captured = metrics.counter("capture.frames", "Frames committed to a frame ring")
+_dropped = metrics.counter("capture.dropped", "Frames overwritten before any consumer saw them")
+_stale = metrics.counter("capture.stale", "Frames older than the ring's stale_after when consumed")
+_empty_reads = metrics.counter("capture.empty_reads", "Reads that returned no frame")
+_read_ms = metrics.histogram("capture.read_ms", help="Time to read one frame from the source")
+
+
+class FrameSlot:
+    """One preallocated frame buffer in a FrameRing"""
+    __slots__ = ("index", "data", "length", "seq", "timestamp", "meta", "readers", "consumed")
+
+    def __init__(self, index, frame_size):
+        self.index = index
+        self.data = bytearray(frame_size)
+        self.length = 0
+        self.seq = 0
+        self.timestamp = 0.0
+        self.meta = None
+        self.readers = 0
+        self.consumed = False
+
+
+class Frame:
+    """
+    A consumer's hold on a ring slot.
+
+    The slot is not recycled by the producer until release() is called, so
+    `data` can be used without copying. Use it as a context manager.
+    """
+    def __init__(self, ring, slot):
+        self._ring = ring
+        self._slot = slot
+        self.seq = slot.seq
+        self.timestamp = slot.timestamp
+        self.meta = slot.meta
+        self.data = memoryview(slot.data)[:slot.length]
+
+
+    def release(self):
+        if self._slot is None:
+            return
+        self.data.release()
+        self._ring._release(self._slot)
+        self._slot = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FrameRing:
+    """
+    Fixed-size ring of preallocated frame buffers between one producer and
+    any number of consumers.
+
+    The producer always overwrites the oldest slot nobody is reading, so
+    capture never waits on processing. Consumers get the newest frame.
+
+    Counters:
+      captured  frames committed by the producer
+      dropped   frames overwritten before any consumer looked at them
+      stale     frames that were older than `stale_after` when consumed
+    """
+    def __init__(self, frame_size, slots=4, stale_after=0.2, latency_samples=1000):
+        if slots < 3:
+            # One slot being written, one holding the newest frame and at
+            # least one a consumer can keep while the other two rotate.
+            raise ValueError("FrameRing needs at least 3 slots")
+        self.frame_size = frame_size
+        self.stale_after = stale_after
+        self._slots = [FrameSlot(i, frame_size) for i in range(slots)]
+        self._cond = threading.Condition()
+        self._newest = None
+        self._seq = 0
+        self._closed = False
+
+        self.captured = 0
+        self.dropped = 0
+        self.stale = 0
+        self.consumed = 0
+        self.latencies = deque(maxlen=latency_samples)
+
+
+    def begin_write(self):
+        """
+        Producer: claim the oldest free slot to fill with the next frame.
+        Returns None once the ring has been closed.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                candidates = [s for s in self._slots if s.readers == 0 and s is not self._newest]
+                if candidates:
+                    break
+                # Every slot is held by a consumer; wait for one to be released
+                self._cond.wait()
+            slot = min(candidates, key=lambda s: s.seq)
+            if slot.seq and not slot.consumed:
+                self.dropped += 1
+                _dropped.inc()
+            slot.seq = 0
+            return slot
+
+
+    def commit(self, slot, length, timestamp=None, meta=None):
+        """
+        Producer: publish a filled slot as the newest frame. `meta` is handed
+        to consumers as Frame.meta.
+        """
+        with self._cond:
+            self._seq += 1
+            slot.length = length
+            slot.seq = self._seq
+            slot.timestamp = timestamp if timestamp is not None else time.monotonic()
+            slot.meta = meta
+            slot.consumed = False
+            self._newest = slot
+            self.captured += 1
+            _captured.inc()
+            self._cond.notify_all()
+
+
+    def acquire(self, after_seq=0, timeout=None):
+        """
+        Consumer: hold the newest frame with a sequence number above
+        `after_seq`, blocking until one arrives. Returns None on timeout or
+        once the ring has been closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._newest is None or self._newest.seq <= after_seq:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            slot = self._newest
+            slot.readers += 1
+            age = time.monotonic() - slot.timestamp
+            if not slot.consumed:
+                slot.consumed = True
+                self.consumed += 1
+                self.latencies.append(age)
+                if age > self.stale_after:
+                    self.stale += 1
+                    _stale.inc()
+            return Frame(self, slot)
+
+
+    def latest(self, timeout=None):
+        """Consumer: hold the newest frame, whether or not it was seen before"""
+        return self.acquire(after_seq=0, timeout=timeout)
+
+
+    def _release(self, slot):
+        with self._cond:
+            slot.readers -= 1
+            self._cond.notify_all()
+
+
+    def close(self):
+        """
+        Wake up any blocked consumers and the producer; acquire() and
+        begin_write() return None afterwards.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+    def stats(self):
+        with self._cond:
+            return {
+                "captured": self.captured,
+                "consumed": self.consumed,
+                "dropped": self.dropped,
+                "stale": self.stale,
+                "latency": summarize(list(self.latencies)),
+            }
+
+
+class CaptureProducer(threading.Thread):
+    """
+    Background thread that reads frames from a source into a FrameRing.
+
+    A source needs a `frame_size` attribute and a `readinto(buf)` method that
+    fills `buf` with the next frame and returns the number of bytes written
+    (0 when no frame was available yet).
+
+    `analyze`, if given, is called on the capture thread with a view of each
+    new frame; its return value travels with the frame as Frame.meta.
+    `read_times` holds how long the last `read_samples` reads that
+    delivered a frame took.
+    """
+    def __init__(self, source, ring, analyze=None, read_samples=1000):
+        super().__init__(name="capture-producer", daemon=True)
+        self.source = source
+        self.ring = ring
+        self.analyze = analyze
+        self.error = None
+        self.read_times = deque(maxlen=read_samples)
+        self._stop_event = threading.Event()
+
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                slot = self.ring.begin_write()
+                if slot is None:
+                    break
+                start = time.monotonic()
+                length = self.source.readinto(slot.data)
+                elapsed = time.monotonic() - start
+                _read_ms.observe(elapsed * 1000)
+                if length:
+                    self.read_times.append(elapsed)
+                    meta = None
+                    if self.analyze is not None:
+                        with memoryview(slot.data)[:length] as view:
+                            meta = self.analyze(view)
+                    self.ring.commit(slot, length, getattr(self.source, "last_timestamp", None), meta)
+                else:
+                    _empty_reads.inc()
+                    time.sleep(0.005)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ring.close()
+
+
+    def stop(self, timeout=2):
+        # Closing the ring also wakes a producer waiting for a free slot
+        self._stop_event.set()
+        self.ring.close()
+        self.join(timeout)
+
+
+def format_ring_stats(stats):
+    """Human readable summary of FrameRing.stats()"""
+    latency = stats["latency"]
+    return (f"captured={stats['captured']} consumed={stats['consumed']} "
+            f"dropped={stats['dropped']} stale={stats['stale']} "
+            f"latency p50={latency['p50'] * 1000:.1f}ms p95={latency['p95'] * 1000:.1f}ms "
+            f"max={latency['max'] * 1000:.1f}ms")
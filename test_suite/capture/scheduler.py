@@ -0,0 +1,73 @@
+import time
+
+from perf.stats import format_summary
+
+
+class DeadlineScheduler:
+    """
+    Fixed-rate scheduler on the monotonic clock.
+
+    Deadlines sit on a fixed grid (start + n * interval), so time spent
+    capturing and saving never accumulates into drift. When a tick runs late:
+      "catchup"  fires every missed tick back-to-back until back on schedule
+      "skip"     drops every tick whose slot has passed and waits for the
+                 next grid slot still ahead
+    """
+    POLICIES = ("skip", "catchup")
+
+    def __init__(self, interval, policy="skip", clock=time.monotonic, sleep=time.sleep):
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        self.interval = interval
+        self.policy = policy
+        self._clock = clock
+        self._sleep = sleep
+        self._next_deadline = None
+        self._last_fire = None
+        self.ticks = 0
+        self.skipped = 0
+        self.lateness = []
+        self.periods = []
+
+
+    def wait(self):
+        """
+        Sleep until the next deadline. The first call returns immediately
+        and starts the grid. Returns how late the tick fired, in seconds.
+        """
+        now = self._clock()
+        if self._next_deadline is None:
+            self._next_deadline = now
+
+        behind = now - self._next_deadline
+        if self.policy == "skip" and behind > 0:
+            missed = int(behind // self.interval) + 1
+            self.skipped += missed
+            self._next_deadline += missed * self.interval
+
+        delay = self._next_deadline - now
+        if delay > 0:
+            self._sleep(delay)
+            now = self._clock()
+
+        lateness = now - self._next_deadline
+        self.lateness.append(lateness)
+        if self._last_fire is not None:
+            self.periods.append(now - self._last_fire)
+        self._last_fire = now
+        self._next_deadline += self.interval
+        self.ticks += 1
+        return lateness
+
+
+    def report(self):
+        """Print jitter statistics for the ticks so far"""
+        print(f"Ticks: {self.ticks}, skipped: {self.skipped}, policy: {self.policy}")
+        print(format_summary("  lateness", self.lateness))
+        print(format_summary("  period  ", self.periods))
+        if len(self.periods) > 1:
+            mean = sum(self.periods) / len(self.periods)
+            variance = sum((p - mean) ** 2 for p in self.periods) / (len(self.periods) - 1)
+            print(f"  period stddev: {variance ** 0.5 * 1000:.2f}ms (target {self.interval * 1000:.2f}ms)")
@@ -0,0 +1,190 @@
+import atexit
+import threading
+import time
+
+from capture.ring import CaptureProducer, FrameRing
+from capture.warmup import thumbnail_probe, wait_for_ring
+
+
+class CameraSession:
+    """
+    A camera stream shared by everyone who holds the session.
+
+    The first holder starts the source, the capture thread and a FrameRing
+    and waits for warm-up; later holders get the running stream and its
+    already-allocated ring buffers as they are. When the last holder lets go
+    the stream keeps running for `idle_timeout` seconds, so a test or
+    capture that follows shortly after doesn't pay for a restart.
+
+    Use it as a (re-entrant) context manager, or call hold()/release().
+
+    Counters:
+      starts   times the stream was actually started
+      stops    times it was stopped
+      reuses   holds that found the stream running: start/stop cycles avoided
+    """
+    def __init__(self, factory, idle_timeout=5.0, warmup=3.0, ring_slots=4):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self.warmup = warmup
+        self.ring_slots = ring_slots
+        self.source = None
+        self.ring = None
+        self.warmup_state = None
+        self._producer = None
+        self._holders = 0
+        self._idle_timer = None
+        self._lock = threading.RLock()
+        self._last_seq = 0
+
+        self.starts = 0
+        self.stops = 0
+        self.reuses = 0
+
+
+    @property
+    def running(self):
+        return self._producer is not None
+
+
+    def hold(self):
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            if self.running and self._producer.error is None:
+                self.reuses += 1
+            else:
+                self._stop()
+                self._start()
+            self._holders += 1
+            return self
+
+
+    def release(self):
+        with self._lock:
+            self._holders = max(0, self._holders - 1)
+            if self._holders or not self.running:
+                return
+            if self.idle_timeout <= 0:
+                self._stop()
+                return
+            self._idle_timer = threading.Timer(self.idle_timeout, self._stop_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+
+    def _start(self):
+        stream_started = time.monotonic()
+        source = self.factory()
+        source.start()
+        producer = None
+        try:
+            ring = FrameRing(source.frame_size, slots=self.ring_slots)
+            producer = CaptureProducer(source, ring)
+            producer.start()
+            self.warmup_state = wait_for_ring(ring, thumbnail_probe(source), max_wait=self.warmup,
+                                              started_at=stream_started)
+        except Exception:
+            if producer is not None and producer.is_alive():
+                producer.stop()
+            source.stop()
+            raise
+        self.source = source
+        self.ring = ring
+        self._producer = producer
+        self._last_seq = 0
+        self.starts += 1
+        print(self.warmup_state.summary())
+
+
+    def _stop(self):
+        if not self.running:
+            return
+        self._producer.stop()
+        self.source.stop()
+        self._producer = None
+        self.stops += 1
+
+
+    def _stop_if_idle(self):
+        with self._lock:
+            self._idle_timer = None
+            if not self._holders:
+                self._stop()
+
+
+    def stop(self):
+        """Stop the stream now, whoever holds it"""
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._stop()
+
+
+    def next_frame(self, timeout=5):
+        """
+        Hold the newest frame this session hasn't handed out yet, as a ring
+        Frame to be released (or used as a context manager). None on timeout.
+        """
+        if not self.running:
+            raise RuntimeError("Camera session is not held")
+        frame = self.ring.acquire(after_seq=self._last_seq, timeout=timeout)
+        if frame is None:
+            if self._producer.error:
+                raise self._producer.error
+            return None
+        self._last_seq = frame.seq
+        return frame
+
+
+    def read_frame(self, timeout=5):
+        """The next new frame as a standalone bytes object, or None"""
+        frame = self.next_frame(timeout)
+        if frame is None:
+            return None
+        with frame:
+            return bytes(frame.data)
+
+
+    def stats(self):
+        return {"starts": self.starts, "stops": self.stops, "reuses": self.reuses, "holders": self._holders}
+
+
+    def __enter__(self):
+        return self.hold()
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+# Sessions are per process and per device
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name, factory, **kwargs):
+    """The process-wide session called `name`, created from `factory` on first use"""
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _sessions[name] = CameraSession(factory, **kwargs)
+        return session
+
+
+def stop_sessions():
+    """Stop every session's stream, e.g. before something else opens the device"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    for session in sessions:
+        session.stop()
+
+
+def format_session_stats(stats):
+    return (f"stream starts={stats['starts']} stops={stats['stops']} "
+            f"restarts avoided={stats['reuses']}")
+
+
+atexit.register(stop_sessions)
@@ -0,0 +1,88 @@
+import time
+import zlib
+
+from PIL import Image
+
+from perf.profiling import span
+
+
+class CameraImageSource:
+    """
+    Frame source adapter for the SeedSigner `Camera`.
+
+    The camera hands out PIL images, so each one is unpacked into the
+    caller's preallocated buffer; `to_image()` turns a ring frame back into
+    an image. The first frame is read at start() to learn the frame size.
+
+    read_video_stream() doesn't block: it returns the camera's latest
+    frame, and the same one again until the next arrives. So reads are
+    paced to `framerate`, and a frame that is the same image object as the
+    last one, or has the same content (by CRC), counts as no new frame.
+    """
+    def __init__(self, camera, first_frame_timeout=5, framerate=30):
+        self.camera = camera
+        self.first_frame_timeout = first_frame_timeout
+        self.frame_interval = 1 / framerate if framerate else 0
+        self.mode = None
+        self.size = None
+        self.frame_size = None
+        self.last_timestamp = None
+        self.repeats = 0
+        self._last_image = None
+        self._last_crc = None
+
+
+    def start(self):
+        self.camera.start_video_stream_mode()
+        deadline = time.monotonic() + self.first_frame_timeout
+        image = None
+        while image is None:
+            image = self.camera.read_video_stream(as_image=True)
+            if image is None:
+                if time.monotonic() > deadline:
+                    raise TimeoutError("Camera did not deliver a frame")
+                time.sleep(0.05)
+        self.mode = image.mode
+        self.size = image.size
+        data = image.tobytes()
+        self.frame_size = len(data)
+        # The first frame only sizes the buffers; readinto() waits for the next
+        self._last_image = image
+        self._last_crc = zlib.crc32(data)
+        self.last_timestamp = time.monotonic()
+
+
+    def stop(self):
+        self.camera.stop_video_stream_mode()
+
+
+    def readinto(self, buf):
+        """Copy the next new frame into `buf`; returns 0 while the camera has none"""
+        if self.frame_interval and self.last_timestamp is not None:
+            wait = self.last_timestamp + self.frame_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        with span("capture"):
+            image = self.camera.read_video_stream(as_image=True)
+        if image is None:
+            return 0
+        if image is self._last_image:
+            self.repeats += 1
+            return 0
+        self._last_image = image
+        if image.mode != self.mode or image.size != self.size:
+            image = image.convert(self.mode).resize(self.size)
+        data = image.tobytes()
+        crc = zlib.crc32(data)
+        if crc == self._last_crc:
+            self.repeats += 1
+            return 0
+        self._last_crc = crc
+        self.last_timestamp = time.monotonic()
+        buf[:len(data)] = data
+        return len(data)
+
+
+    def to_image(self, frame):
+        """Copy a ring Frame out into a standalone PIL image"""
+        return Image.frombytes(self.mode, self.size, bytes(frame.data))
@@ -0,0 +1,202 @@
+import os
+import re
+import subprocess
+import time
+
+from imaging.nv12 import nv12_frame_size
+from perf.profiling import span
+
+
+def parse_resolution(resolution):
+    """Accepts "WIDTHxHEIGHT" strings or (width, height) pairs"""
+    if isinstance(resolution, str):
+        width, height = resolution.lower().split("x")
+        return int(width), int(height)
+    width, height = resolution
+    return int(width), int(height)
+
+
+def query_format(device, width, height, pixelformat="NV12"):
+    """
+    Set the capture format on `device` and read back what the driver made
+    of it: (width, height, bytesperline, sizeimage).
+
+    sizeimage is exactly what each frame on a `--stream-to` pipe is, and
+    needn't be nv12_frame_size(): for an odd height some drivers round the
+    chroma rows down (240x135 NV12 is 48480 bytes, not 48720).
+    """
+    output = subprocess.run([
+        "v4l2-ctl",
+        f"--device={device}",
+        f"--set-fmt-video=width={width},height={height},pixelformat={pixelformat}",
+        "--get-fmt-video",
+    ], capture_output=True, text=True, check=True, timeout=5).stdout
+    # The same fields appear under a "Plane 0" heading on multiplanar devices
+    fields = {}
+    for name, pattern in (("size", r"Width/Height\s*:\s*(\d+)/(\d+)"),
+                          ("stride", r"Bytes per Line\s*:\s*(\d+)"),
+                          ("frame_size", r"Size Image\s*:\s*(\d+)")):
+        match = re.search(pattern, output)
+        if match is None:
+            raise ValueError(f"No {name} in the format {device} reported")
+        fields[name] = [int(g) for g in match.groups()]
+    (width, height), (stride,), (frame_size,) = fields["size"], fields["stride"], fields["frame_size"]
+    return width, height, stride, frame_size
+
+
+class V4L2Stream:
+    """
+    Continuous raw NV12 stream from a V4L2 device.
+
+    `v4l2-ctl` is started once and streams frames to a pipe, so frames are
+    read back-to-back without renegotiating the device for each capture.
+    Frames are handed out as raw bytes; nothing here converts color.
+
+    The pipe carries frames back to back with nothing between them, so the
+    frame size has to be the driver's: it is taken from `frame_size` when
+    given, else asked of the driver (see query_format), and only computed
+    with nv12_frame_size() when neither is possible, as off the device.
+    """
+    def __init__(self, device="/dev/video15", width=240, height=240, pixelformat="NV12", stride=None, frame_size=None):
+        if pixelformat != "NV12":
+            raise ValueError(f"Unsupported pixel format: {pixelformat}")
+        if frame_size is None:
+            try:
+                width, height, stride, frame_size = query_format(device, width, height, pixelformat)
+            except (OSError, subprocess.SubprocessError, ValueError):
+                # No v4l2-ctl or no device here; start() reports that
+                pass
+        self.device = device
+        self.width = width
+        self.height = height
+        self.pixelformat = pixelformat
+        self.stride = stride or width
+        self.luma_size = self.stride * height
+        self.frame_size = frame_size or nv12_frame_size(width, height, self.stride)
+        if self.frame_size < self.luma_size:
+            raise ValueError(f"A {self.frame_size} byte frame can't hold a {width}x{height} luma plane")
+        self.last_timestamp = None
+        self._process = None
+        self._pipe = None
+        self._chroma_scratch = bytearray(self.frame_size - self.luma_size)
+
+
+    @classmethod
+    def from_settings(cls, settings=None):
+        """
+        Build a stream from the camera pin mapping of the configured hardware.
+
+        When the VIRTUAL_CAMERA environment variable is set, a VirtualCamera
+        described by it is returned instead (see VirtualCamera.from_spec).
+        """
+        spec = os.environ.get("VIRTUAL_CAMERA")
+        if spec:
+            from capture.virtual import VirtualCamera
+            return VirtualCamera.from_spec(spec)
+
+        from seedsigner.models.settings import Settings
+        from seedsigner.models.settings_definition import SettingsConstants
+
+        settings = settings or Settings.get_instance()
+        hardware_config = settings.get_value(SettingsConstants.SETTING__HARDWARE_CONFIG)
+        pin_mapping = SettingsConstants.ALL_HARDWARE_PIN_CONFIGS__PIN_DEFINITIONS[hardware_config]["camera"]
+        width, height = parse_resolution(pin_mapping["resolution"])
+        return cls(
+            device=pin_mapping["device"],
+            width=width,
+            height=height,
+            pixelformat=pin_mapping["pixelformat"],
+        )
+
+
+    @property
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+
+    def start(self):
+        if self.is_running:
+            return
+        cmd = [
+            "v4l2-ctl",
+            f"--device={self.device}",
+            f"--set-fmt-video=width={self.width},height={self.height},pixelformat={self.pixelformat}",
+            "--stream-mmap",
+            "--stream-to=-",
+        ]
+        # Unbuffered so readinto() lands directly in the caller's buffer
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        self._pipe = self._process.stdout
+
+
+    def stop(self):
+        if self._process is None:
+            return
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._pipe.close()
+        self._process = None
+        self._pipe = None
+
+
+    def _fill(self, view):
+        got = 0
+        while got < len(view):
+            n = self._pipe.readinto(view[got:])
+            if not n:
+                raise EOFError("Camera stream ended")
+            got += n
+        return got
+
+
+    def readinto(self, buf):
+        """Read the next full NV12 frame into a preallocated buffer; returns its size"""
+        view = memoryview(buf)[:self.frame_size]
+        try:
+            with span("capture"):
+                self._fill(view)
+        finally:
+            view.release()
+        self.last_timestamp = time.monotonic()
+        return self.frame_size
+
+
+    def read_frame(self):
+        """Read the next full NV12 frame as a new bytes object"""
+        buf = bytearray(self.frame_size)
+        self.readinto(buf)
+        return bytes(buf)
+
+
+    def read_luma(self):
+        """
+        Luma-only capture mode: returns just the Y plane of the next frame.
+
+        The chroma plane is drained into a scratch buffer and never looked at,
+        and the Y plane comes back as a standalone bytes object that pyzbar
+        can consume as 8-bit grayscale without any further conversion.
+        """
+        with span("capture"):
+            luma = self._pipe.read(self.luma_size)
+            if not luma:
+                raise EOFError("Camera stream ended")
+            if len(luma) < self.luma_size:
+                rest = bytearray(self.luma_size - len(luma))
+                self._fill(memoryview(rest))
+                luma += rest
+            self._fill(memoryview(self._chroma_scratch))
+        self.last_timestamp = time.monotonic()
+        return luma
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
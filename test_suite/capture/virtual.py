@@ -0,0 +1,316 @@
+import glob
+import math
+import mmap
+import os
+import random
+import time
+
+from PIL import Image
+
+from capture.v4l2 import parse_resolution
+from imaging.nv12 import nv12_frame_size, nv12_to_image, rgb_to_nv12
+from perf.profiling import span
+
+
+class YuvFrames:
+    """
+    Raw NV12 frames from disk: either one file of frames back to back (as
+    written by `v4l2-ctl --stream-to=FILE`) or a directory of single-frame
+    .yuv files. Presented like a FrameLogReader. `frame_size` is the size
+    the driver delivered frames at, if not the computed NV12 size.
+    """
+    def __init__(self, path, width, height, stride=None, frame_size=None):
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+        self.frame_size = frame_size or nv12_frame_size(width, height, self.stride)
+        self._paths = None
+        self._map = None
+        if os.path.isdir(path):
+            self._paths = sorted(glob.glob(os.path.join(path, "*.yuv")))
+            self.count = len(self._paths)
+        else:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.count = len(self._map) // self.frame_size
+
+
+    def __len__(self):
+        return self.count
+
+
+    def frame(self, n):
+        if self._paths is not None:
+            with open(self._paths[n], "rb") as f:
+                return f.read()
+        offset = n * self.frame_size
+        return memoryview(self._map)[offset:offset + self.frame_size]
+
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+
+
+class SyntheticFrames:
+    """
+    Generated NV12 frames: a slowly drifting gradient, with `qr_image`
+    (if given) moving in a small circle on top of it so decoders and the
+    duplicate-frame check see realistic frame-to-frame change.
+    """
+    def __init__(self, width, height, count=60, qr_image=None, fill=0.6):
+        self.width = width
+        self.height = height
+        self.stride = width
+        self.frame_size = nv12_frame_size(width, height)
+        self.count = count
+        self._frames = []
+
+        side = int(min(width, height) * fill)
+        qr = qr_image.convert("RGB").resize((side, side), Image.NEAREST) if qr_image else None
+        gradient = Image.linear_gradient("L").resize((width, height))
+        radius = min(width, height) * 0.05
+        for n in range(count):
+            shade = 60 + (n * 4) % 80
+            background = Image.merge("RGB", (
+                gradient.point(lambda v: v // 2 + shade),
+                gradient.point(lambda v: 255 - v // 2),
+                Image.new("L", (width, height), shade),
+            ))
+            if qr is not None:
+                angle = 2 * math.pi * n / count
+                x = int((width - side) / 2 + radius * math.cos(angle))
+                y = int((height - side) / 2 + radius * math.sin(angle))
+                background.paste(qr, (x, y))
+            self._frames.append(rgb_to_nv12(background))
+
+
+    def __len__(self):
+        return self.count
+
+
+    def frame(self, n):
+        return self._frames[n]
+
+
+class VirtualCamera:
+    """
+    Stand-in for V4L2Stream that plays back recorded or synthesized NV12
+    frames, so the capture -> convert -> decode/display pipeline can run
+    and be timed on a host without the camera.
+
+    Frames are paced like a sensor: one every 1/`fps` seconds on a fixed
+    schedule, each delivered late by a random amount with a standard
+    deviation of `jitter` seconds. Frames can be lost in transit, at random
+    with probability `drop` or as every `drop_every`th frame; time still
+    passes for them, as it would on hardware. As with a driver's buffer
+    queue, a reader that falls more than `buffers` frames behind loses the
+    oldest ones (counted as overruns). With `realtime=False` frames come as
+    fast as they are read.
+    `frames` is anything with len(), frame(n) and a frame_size, such as a
+    FrameLogReader, YuvFrames or SyntheticFrames; frames are delivered at
+    that size, with a short one padded out with neutral chroma.
+    """
+    def __init__(self, frames, fps=30.0, jitter=0.0, drop=0.0, drop_every=0, buffers=4, loop=True, realtime=True,
+                 seed=0, name="virtual", clock=time.monotonic, sleep=time.sleep):
+        if not len(frames):
+            raise ValueError("No frames to play back")
+        self.frames = frames
+        self.device = f"virtual:{name}"
+        self.width = frames.width
+        self.height = frames.height
+        self.pixelformat = "NV12"
+        self.stride = frames.stride
+        self.luma_size = self.stride * self.height
+        self.frame_size = frames.frame_size
+        self.fps = fps
+        self.jitter = jitter
+        self.drop = drop
+        self.drop_every = drop_every
+        self.buffers = buffers
+        self.loop = loop
+        self.realtime = realtime
+        self.clock = clock
+        self.sleep = sleep
+        self.last_timestamp = None
+        self._rng = random.Random(seed)
+        self._running = False
+        self._index = 0
+        self._next_slot = 0.0
+
+        self.delivered = 0
+        self.dropped = 0
+        self.overruns = 0
+
+
+    @classmethod
+    def from_log(cls, path, **kwargs):
+        from capture.framelog import FrameLogReader
+        return cls(FrameLogReader(path), name=os.path.basename(path), **kwargs)
+
+
+    @classmethod
+    def from_yuv(cls, path, width, height, stride=None, frame_size=None, **kwargs):
+        return cls(YuvFrames(path, width, height, stride, frame_size), name=os.path.basename(path.rstrip("/")),
+                   **kwargs)
+
+
+    @classmethod
+    def synthetic(cls, width=240, height=240, count=60, qr_image=None, **kwargs):
+        return cls(SyntheticFrames(width, height, count, qr_image), name="synthetic", **kwargs)
+
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Build a camera from a compact description, as used for the
+        VIRTUAL_CAMERA environment variable:
+
+          synthetic[,resolution=240x240][,qr=test-qrcode.png][,count=60]
+          frames.nv12log
+          capture.yuv,resolution=240x240[,stride=256][,frame_size=48480]
+
+        followed by any of ,fps=30 ,jitter=0.002 ,drop=0.05 ,drop_every=10
+        ,buffers=4 ,loop=0 ,realtime=0 ,seed=1
+        """
+        source, *options = spec.split(",")
+        opts = dict(option.split("=", 1) for option in options)
+        kwargs = {}
+        for key, convert in (("fps", float), ("jitter", float), ("drop", float), ("drop_every", int),
+                             ("buffers", int), ("loop", int), ("realtime", int), ("seed", int)):
+            if key in opts:
+                kwargs[key] = convert(opts.pop(key))
+        resolution = parse_resolution(opts.pop("resolution", "240x240"))
+
+        if source == "synthetic":
+            qr = opts.pop("qr", None)
+            camera = cls.synthetic(*resolution, count=int(opts.pop("count", 60)),
+                                   qr_image=Image.open(qr) if qr else None, **kwargs)
+        elif source.endswith(".nv12log"):
+            camera = cls.from_log(source, **kwargs)
+        else:
+            stride = opts.pop("stride", None)
+            frame_size = opts.pop("frame_size", None)
+            camera = cls.from_yuv(source, *resolution, stride=int(stride) if stride else None,
+                                  frame_size=int(frame_size) if frame_size else None, **kwargs)
+        if opts:
+            raise ValueError(f"Unknown virtual camera options: {', '.join(opts)}")
+        return camera
+
+
+    @property
+    def is_running(self):
+        return self._running
+
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._index = 0
+        self._next_slot = self.clock()
+
+
+    def stop(self):
+        self._running = False
+
+
+    def _dropped(self, n):
+        if self.drop_every and (n + 1) % self.drop_every == 0:
+            return True
+        return self.drop > 0 and self._rng.random() < self.drop
+
+
+    def _next_frame(self):
+        """Wait for the next delivered frame's slot; returns its index in `frames`"""
+        while True:
+            if not self._running:
+                raise EOFError("Camera stream ended")
+            n = self._index
+            if n >= len(self.frames) and not self.loop:
+                raise EOFError("Recording ended")
+            self._index += 1
+
+            slot = self._next_slot
+            self._next_slot += 1.0 / self.fps
+            if self.realtime:
+                due = slot + (abs(self._rng.gauss(0, self.jitter)) if self.jitter else 0.0)
+                delay = due - self.clock()
+                if delay > 0:
+                    self.sleep(delay)
+                elif -delay > self.buffers / self.fps:
+                    self.overruns += 1
+                    continue
+            if self._dropped(n):
+                self.dropped += 1
+                continue
+            return n % len(self.frames)
+
+
+    def readinto(self, buf):
+        """Read the next frame into a preallocated buffer; returns its size"""
+        with span("capture"):
+            data = self.frames.frame(self._next_frame())
+            size = min(len(data), self.frame_size)
+            # Copied through fixed-length views, so `buf` never changes size
+            with memoryview(buf)[:self.frame_size] as view, memoryview(data)[:size] as frame:
+                view[:size] = frame
+                if size < self.frame_size:
+                    view[size:] = b"\x80" * (self.frame_size - size)
+        if isinstance(data, memoryview):
+            data.release()
+        self.last_timestamp = self.clock()
+        self.delivered += 1
+        return self.frame_size
+
+
+    def read_frame(self):
+        buf = bytearray(self.frame_size)
+        self.readinto(buf)
+        return bytes(buf)
+
+
+    def read_luma(self):
+        data = self.frames.frame(self._next_frame())
+        luma = bytes(data[:self.luma_size])
+        if isinstance(data, memoryview):
+            data.release()
+        self.last_timestamp = self.clock()
+        self.delivered += 1
+        return luma
+
+
+    def stats(self):
+        return {"delivered": self.delivered, "dropped": self.dropped, "overruns": self.overruns}
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class VirtualSeedSignerCamera:
+    """
+    The SeedSigner `Camera` interface over a VirtualCamera, for code that
+    reads PIL images (such as CameraImageSource).
+    """
+    def __init__(self, camera):
+        self.camera = camera
+
+
+    def start_video_stream_mode(self, *args, **kwargs):
+        self.camera.start()
+
+
+    def read_video_stream(self, as_image=False):
+        data = self.camera.read_frame()
+        image = nv12_to_image(data, self.camera.width, self.camera.height, self.camera.stride)
+        return image if as_image else image.tobytes()
+
+
+    def stop_video_stream_mode(self):
+        self.camera.stop()
@@ -0,0 +1,154 @@
+import time
+
+from PIL import Image
+
+
+def thumbnail_probe(source, grid=8):
+    """
+    Function that reduces one frame of `source` to a `grid` x `grid` block
+    luma thumbnail: the Y plane of raw V4L2 frames, or the grayscale of the
+    images a CameraImageSource puts in the ring.
+    """
+    if hasattr(source, "pixelformat"):
+        def probe(data):
+            luma = Image.frombuffer("L", (source.width, source.height), data, "raw", "L", source.stride, 1)
+            return luma.resize((grid, grid), Image.BOX).tobytes()
+    else:
+        def probe(data):
+            return image_thumbnail(Image.frombuffer(source.mode, source.size, data, "raw", source.mode, 0, 1), grid)
+    return probe
+
+
+def image_thumbnail(image, grid=8):
+    return image.convert("L").resize((grid, grid), Image.BOX).tobytes()
+
+
+class WarmupDetector:
+    """
+    Decides when a freshly started camera is delivering usable frames.
+
+    Right after start the sensor produces black or badly exposed frames
+    while auto-exposure and white balance converge. Each frame is reduced to
+    a small luma thumbnail; the stream is ready once `stable_frames` frames
+    in a row are brighter than `min_luma`, have a mean within
+    `luma_tolerance` of the previous frame and differ from it by at most
+    `change_tolerance` per block on average. If that doesn't happen within
+    `max_wait` seconds the stream is declared ready anyway, so a scene that
+    is genuinely changing can't stall capture.
+
+    Only distinct frames count: a frame whose capture timestamp is not
+    newer than the last one's is a repeat of it, and is ignored rather than
+    taken as a stable frame.
+    """
+    def __init__(self, max_wait=3.0, stable_frames=3, luma_tolerance=2.0, change_tolerance=3.0, min_luma=8.0,
+                 clock=time.monotonic):
+        self.max_wait = max_wait
+        self.stable_frames = stable_frames
+        self.luma_tolerance = luma_tolerance
+        self.change_tolerance = change_tolerance
+        self.min_luma = min_luma
+        self.clock = clock
+        self.started_at = None
+        self.ready_at = None
+        self.timed_out = False
+        self.frames = 0
+        self.mean_luma = 0.0
+        self.repeats = 0
+        self._previous = None
+        self._last_timestamp = None
+        self._stable = 0
+
+
+    def start(self, started_at=None):
+        """Begin timing; `started_at` is when the stream was started, if earlier"""
+        self.started_at = self.clock() if started_at is None else started_at
+        return self
+
+
+    @property
+    def ready(self):
+        return self.ready_at is not None
+
+
+    @property
+    def elapsed(self):
+        end = self.ready_at if self.ready_at is not None else self.clock()
+        return end - self.started_at
+
+
+    @property
+    def remaining(self):
+        return max(0.0, self.max_wait - (self.clock() - self.started_at))
+
+
+    def expire(self):
+        """Declare the stream ready without it having settled"""
+        self.ready_at = self.clock()
+        self.timed_out = True
+
+
+    def update(self, thumbnail, timestamp=None):
+        """
+        Feed one frame's thumbnail, with the frame's capture timestamp if
+        known; returns True once the stream is ready
+        """
+        if self.ready:
+            return True
+        if self.started_at is None:
+            self.start()
+        if timestamp is not None:
+            if self._last_timestamp is not None and timestamp <= self._last_timestamp:
+                self.repeats += 1
+                return self._check_deadline()
+            self._last_timestamp = timestamp
+        self.frames += 1
+        mean = sum(thumbnail) / len(thumbnail)
+        if self._previous is not None and mean >= self.min_luma:
+            previous, previous_mean = self._previous
+            change = sum(abs(a - b) for a, b in zip(thumbnail, previous)) / len(thumbnail)
+            if abs(mean - previous_mean) <= self.luma_tolerance and change <= self.change_tolerance:
+                self._stable += 1
+            else:
+                self._stable = 0
+        self._previous = (thumbnail, mean)
+        self.mean_luma = mean
+
+        if self._stable >= self.stable_frames:
+            self.ready_at = self.clock()
+            return True
+        return self._check_deadline()
+
+
+    def _check_deadline(self):
+        if self.clock() - self.started_at >= self.max_wait:
+            self.expire()
+        return self.ready
+
+
+    def summary(self):
+        if self.timed_out:
+            return (f"✗ Camera did not settle within {self.max_wait:.1f}s "
+                    f"({self.frames} frames, mean luma {self.mean_luma:.0f}), continuing anyway")
+        return (f"✓ Camera ready in {self.elapsed:.2f}s: first usable frame after {self.frames} frames, "
+                f"mean luma {self.mean_luma:.0f}")
+
+
+def wait_for_ring(ring, probe, max_wait=3.0, started_at=None):
+    """
+    Watch frames arriving in `ring` until the camera has warmed up; returns
+    the WarmupDetector. `probe` turns frame data into a thumbnail (see
+    thumbnail_probe).
+    """
+    detector = WarmupDetector(max_wait=max_wait).start(started_at)
+    last_seq = 0
+    while not detector.ready:
+        frame = ring.acquire(after_seq=last_seq, timeout=detector.remaining)
+        if frame is None:
+            # No frame before the deadline, or capture stopped
+            detector.expire()
+            continue
+        with frame:
+            last_seq = frame.seq
+            detector.update(probe(frame.data), frame.timestamp)
+    return detector
+
@@ -0,0 +1,120 @@
+import io
+import os
+import queue
+import threading
+import time
+
+from perf.stats import format_summary
+
+
+class PhotoWriter:
+    """
+    Bounded worker pool that encodes and saves images off the capture thread.
+
+    submit() blocks once `queue_size` photos are waiting (backpressure), so a
+    slow card throttles capture instead of growing memory without bound.
+    Files are fsynced in batches of `fsync_batch` rather than one by one.
+    Timing for every photo is kept and summarized by report().
+    """
+    def __init__(self, workers=2, queue_size=4, fsync_batch=8):
+        self.fsync_batch = fsync_batch
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._unsynced = []
+        self._workers = [
+            threading.Thread(target=self._work, name=f"photo-writer-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        self.records = []
+        self.errors = []
+        self.blocked_time = 0.0
+        self.sync_times = []
+        for worker in self._workers:
+            worker.start()
+
+
+    def submit(self, image, filepath, format="JPEG", capture_time=0.0):
+        """Queue an image for encoding and writing; blocks while the queue is full"""
+        start = time.monotonic()
+        self._queue.put((image, filepath, format, capture_time, start))
+        self.blocked_time += time.monotonic() - start
+
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            image, filepath, format, capture_time, queued_at = item
+            try:
+                started = time.monotonic()
+                buf = io.BytesIO()
+                image.save(buf, format=format)
+                encoded = time.monotonic()
+                with open(filepath, "wb") as f:
+                    f.write(buf.getbuffer())
+                written = time.monotonic()
+                with self._lock:
+                    self.records.append({
+                        "path": filepath,
+                        "bytes": buf.tell(),
+                        "capture": capture_time,
+                        "queue": started - queued_at,
+                        "encode": encoded - started,
+                        "write": written - encoded,
+                    })
+                    self._unsynced.append(filepath)
+                    batch = None
+                    if len(self._unsynced) >= self.fsync_batch:
+                        batch, self._unsynced = self._unsynced, []
+                if batch:
+                    self._sync(batch)
+            except Exception as e:
+                with self._lock:
+                    self.errors.append((filepath, e))
+            finally:
+                self._queue.task_done()
+
+
+    def _sync(self, paths):
+        start = time.monotonic()
+        for path in paths:
+            # fsync flushes the file's dirty pages no matter which fd is used
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        for directory in {os.path.dirname(os.path.abspath(p)) for p in paths}:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        with self._lock:
+            self.sync_times.append(time.monotonic() - start)
+
+
+    def close(self):
+        """Wait for queued photos, stop the workers and sync anything left"""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        if self._unsynced:
+            batch, self._unsynced = self._unsynced, []
+            self._sync(batch)
+
+
+    def report(self):
+        """Print per-stage timing for everything written"""
+        print(f"Photos written: {len(self.records)}, errors: {len(self.errors)}")
+        print(format_summary("  capture", [r["capture"] for r in self.records]))
+        print(format_summary("  queue  ", [r["queue"] for r in self.records]))
+        print(format_summary("  encode ", [r["encode"] for r in self.records]))
+        print(format_summary("  write  ", [r["write"] for r in self.records]))
+        print(format_summary("  fsync  ", self.sync_times))
+        print(f"  capture blocked on full queue: {self.blocked_time:.2f}s")
+        for filepath, error in self.errors:
+            print(f"✗ Failed to save {filepath}: {error}")
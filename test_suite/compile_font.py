@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+import time
+import argparse
+import subprocess
+
+from imaging.bitmapfont import DEFAULT_CHARS, compile_font, compiled_font_path
+
+
+# Screens the test scripts show, used to time rendering
+MESSAGES = [
+    "Welcome to Hardware Test.\n\nPress KEY1 for Button Test\nPress KEY2 for Camera Test\nPress IN to exit.",
+    "Press KEY1 button",
+    "KEY1 Button OK  ",
+    "RIGHT Button NOT pressed (timeout)",
+    "Button Test Results:\nKEY2: [OK]\nKEY1: [OK]\nRIGHT: [FAIL]\nDOWN: [OK]\n",
+    "Testing Camera...",
+    "Camera Test Result:\n[OK]",
+]
+
+MODES = ("truetype", "atlas", "bitmap")
+
+
+def parse_sizes(value):
+    sizes = tuple(int(s) for s in value.split(","))
+    if not sizes or any(s < 1 for s in sizes):
+        raise argparse.ArgumentTypeError(f"Invalid sizes: {value}")
+    return sizes
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def measure(mode, font_path, size, iterations):
+    """
+    Time one text path in this (fresh) process: opening the font, drawing
+    the first screen, and drawing screens once warmed up. RSS growth is
+    counted from after PIL.Image is imported, which every path needs.
+    """
+    from PIL import Image
+
+    baseline = rss_kib()
+    start = time.perf_counter()
+    if mode == "truetype":
+        # What display_message did before fonts were cached
+        from PIL import ImageDraw, ImageFont
+        font = ImageFont.truetype(font_path, size)
+
+        def draw(image, text):
+            d = ImageDraw.Draw(image)
+            left, top, _, _ = d.textbbox((0, 0), text, font=font)
+            d.text((10 - left, 10 - top), text, font=font, fill=(255, 255, 255))
+    else:
+        if mode == "atlas":
+            from imaging.fonts import GlyphAtlas, get_font
+            font = GlyphAtlas(get_font(font_path, size))
+        else:
+            from imaging.bitmapfont import BitmapFont
+            font = BitmapFont(compiled_font_path(font_path, size))
+
+        def draw(image, text):
+            left, top, _, _ = font.textbbox(text)
+            font.draw(image, (10 - left, 10 - top), text)
+    load = time.perf_counter() - start
+
+    image = Image.new("RGB", (240, 240))
+    start = time.perf_counter()
+    draw(image, MESSAGES[0])
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in MESSAGES:
+            draw(Image.new("RGB", (240, 240)), text)
+    render = (time.perf_counter() - start) / (iterations * len(MESSAGES))
+    return {"mode": mode, "load": load, "first": first, "render": render, "rss_kib": rss_kib() - baseline}
+
+def place_text(image, font, text):
+    """Draw `text` centered the way test.render_message does"""
+    left, top, right, bottom = font.textbbox(text)
+    x = (image.width - (right - left)) // 2
+    y = (image.height - (bottom - top)) // 2
+    font.draw(image, (x, y + font.ascent), text)
+
+def check(font_path, size):
+    """
+    Render every test screen with ImageDraw.text, as display_message did
+    originally, and with the glyph atlas and the compiled font; returns how
+    many screens differ
+    """
+    from PIL import Image, ImageChops, ImageDraw
+    from imaging.bitmapfont import BitmapFont
+    from imaging.fonts import GlyphAtlas, get_font
+
+    font = get_font(font_path, size)
+    renderers = {"atlas": GlyphAtlas(font), "bitmap": BitmapFont(compiled_font_path(font_path, size))}
+    failures = 0
+    print(f"\n{os.path.basename(font_path)} at {size}px against ImageDraw.text:")
+    for text in MESSAGES:
+        expected = Image.new("RGB", (240, 240))
+        draw = ImageDraw.Draw(expected)
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        draw.text(((240 - (right - left)) // 2, (240 - (bottom - top)) // 2), text, font=font, fill=(255, 255, 255))
+        for name, renderer in renderers.items():
+            image = Image.new("RGB", (240, 240))
+            place_text(image, renderer, text)
+            diff = ImageChops.difference(image, expected).convert("L").point(lambda v: 255 if v else 0)
+            pixels = diff.histogram()[255]
+            if pixels:
+                failures += 1
+                print(f"  ✗ {name}: {pixels} pixels differ in {text.splitlines()[0]!r}")
+    if not failures:
+        print(f"  ✓ All {len(MESSAGES)} screens are pixel-identical")
+    return failures
+
+def compare(font_path, size, iterations):
+    """Run every text path in its own interpreter so imports and RSS don't mix"""
+    results = []
+    for mode in MODES:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), font_path, "--sizes", str(size),
+                                 "--measure", mode, "--iterations", str(iterations)],
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output))
+    print(f"\n{os.path.basename(font_path)} at {size}px, {len(MESSAGES)} screens x {iterations}:")
+    print(f"  {'path':<10}{'open':>10}{'first':>10}{'per screen':>12}{'RSS':>10}")
+    for r in results:
+        print(f"  {r['mode']:<10}{r['load'] * 1000:>8.2f}ms{r['first'] * 1000:>8.2f}ms"
+              f"{r['render'] * 1000:>10.3f}ms{r['rss_kib']:>7d}KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-rasterize a TrueType/OpenType font into memory-mappable bitmap fonts. '
+                                                 'Run it by hand wherever the test suite is installed, e.g. '
+                                                 '"python3 compile_font.py Poppins-Regular.otf --check" in '
+                                                 '/test_suite; the OS build does not do it')
+    parser.add_argument('font', type=str, help='Font file (.otf or .ttf)')
+    parser.add_argument('--sizes', '-s', type=parse_sizes, default=(16,),
+                       help='Comma separated pixel sizes to compile (default: 16)')
+    parser.add_argument('--chars', type=str, default=DEFAULT_CHARS,
+                       help='Characters to include (default: printable ASCII)')
+    parser.add_argument('--output-dir', '-o', type=str, default=None,
+                       help='Where to write the compiled fonts (default: next to the font, where get_atlas looks)')
+    parser.add_argument('--compare', action='store_true',
+                       help='After compiling, compare load time, render time and RSS against ImageFont.truetype')
+    parser.add_argument('--check', action='store_true',
+                       help='After compiling, check the test screens render pixel-identical to ImageDraw.text')
+    parser.add_argument('--iterations', type=int, default=50,
+                       help='Render passes over the test screens for --compare (default: 50)')
+    parser.add_argument('--measure', choices=MODES, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.font, args.sizes[0], args.iterations)))
+        return 0
+
+    from imaging.fonts import get_font
+
+    for size in args.sizes:
+        path = compiled_font_path(args.font, size)
+        if args.output_dir:
+            path = os.path.join(args.output_dir, os.path.basename(path))
+        start = time.perf_counter()
+        try:
+            data = compile_font(get_font(args.font, size), args.chars)
+        except OSError as e:
+            print(f"✗ Could not load {args.font}: {e}")
+            return 1
+        with open(path, "wb") as f:
+            f.write(data)
+        print(f"✓ {path}: {len(args.chars)} glyphs, {len(data) / 1024:.1f} KiB "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    if (args.compare or args.check) and args.output_dir:
+        print("✗ --compare and --check need the compiled fonts next to the font file")
+        return 1
+    failures = 0
+    if args.check:
+        for size in args.sizes:
+            failures += check(args.font, size)
+    if args.compare:
+        for size in args.sizes:
+            compare(args.font, size, args.iterations)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
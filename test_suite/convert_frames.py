@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import csv
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw, ImageStat
+
+from capture.framelog import FrameLogReader
+from capture.v4l2 import parse_resolution
+from imaging.nv12 import nv12_frame_size, nv12_to_image
+
+
+class YuvDirectory:
+    """A directory of single-frame .yuv files, presented like a frame log"""
+    def __init__(self, paths, width, height, stride=None):
+        self.paths = paths
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+        self.frame_size = nv12_frame_size(width, height, self.stride)
+
+
+    def __len__(self):
+        return len(self.paths)
+
+
+    def frame(self, n):
+        with open(self.paths[n], "rb") as f:
+            return f.read()
+
+
+    def timestamp(self, n):
+        return os.path.getmtime(self.paths[n])
+
+
+    def name(self, n):
+        return os.path.splitext(os.path.basename(self.paths[n]))[0]
+
+
+def frame_name(source, n):
+    if isinstance(source, YuvDirectory):
+        return source.name(n)
+    return f"frame_{n:06d}"
+
+
+def open_source(spec):
+    """Open a frame source from a (kind, ...) spec that can be sent to workers"""
+    if spec[0] == "log":
+        return FrameLogReader(spec[1])
+    _, paths, width, height, stride = spec
+    return YuvDirectory(paths, width, height, stride)
+
+
+# Each worker process opens (and for logs, mmaps) the source once
+_worker_source = None
+
+def _init_worker(spec):
+    global _worker_source
+    _worker_source = open_source(spec)
+
+
+def _convert_chunk(frames, output_dir, save_format, extension, thumb_size, want_stats):
+    source = _worker_source
+    results = []
+    for n in frames:
+        data = source.frame(n)
+        if len(data) < source.frame_size:
+            results.append({"frame": n, "error": f"short frame ({len(data)} bytes)"})
+            continue
+        image = nv12_to_image(data, source.width, source.height, source.stride)
+        if isinstance(data, memoryview):
+            data.release()
+
+        result = {"frame": n, "timestamp": source.timestamp(n)}
+        if output_dir:
+            path = os.path.join(output_dir, f"{frame_name(source, n)}.{extension}")
+            image.save(path, format=save_format)
+            result["path"] = path
+        if thumb_size:
+            thumb = image.copy()
+            thumb.thumbnail(thumb_size)
+            result["thumbnail"] = (thumb.size, thumb.tobytes())
+        if want_stats:
+            luma = ImageStat.Stat(image.convert("L"))
+            rgb = ImageStat.Stat(image)
+            result.update({
+                "luma_mean": round(luma.mean[0], 2),
+                "luma_stddev": round(luma.stddev[0], 2),
+                "luma_min": luma.extrema[0][0],
+                "luma_max": luma.extrema[0][1],
+                "r_mean": round(rgb.mean[0], 2),
+                "g_mean": round(rgb.mean[1], 2),
+                "b_mean": round(rgb.mean[2], 2),
+            })
+        results.append(result)
+    return results
+
+
+def write_contact_sheets(results, output_dir, thumb_size, columns=8, per_sheet=64):
+    """Tile thumbnails into labelled contact sheets; returns the sheet paths"""
+    thumbs = [r for r in results if "thumbnail" in r]
+    cell_w, cell_h = thumb_size[0], thumb_size[1] + 12
+    paths = []
+    for sheet_no, start in enumerate(range(0, len(thumbs), per_sheet)):
+        batch = thumbs[start:start + per_sheet]
+        rows = (len(batch) + columns - 1) // columns
+        sheet = Image.new("RGB", (columns * cell_w, rows * cell_h), (32, 32, 32))
+        draw = ImageDraw.Draw(sheet)
+        for i, r in enumerate(batch):
+            size, data = r["thumbnail"]
+            x, y = (i % columns) * cell_w, (i // columns) * cell_h
+            sheet.paste(Image.frombytes("RGB", size, data), (x, y))
+            draw.text((x + 2, y + thumb_size[1]), str(r["frame"]), fill=(255, 255, 255))
+        path = os.path.join(output_dir, f"contact_{sheet_no:03d}.png")
+        sheet.save(path)
+        paths.append(path)
+    return paths
+
+
+def write_stats(results, path):
+    fields = ["frame", "timestamp", "gap_ms", "luma_mean", "luma_stddev", "luma_min", "luma_max",
+              "r_mean", "g_mean", "b_mean", "path", "error"]
+    previous = None
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for r in results:
+            row = dict(r)
+            if previous is not None and "timestamp" in r:
+                row["gap_ms"] = round((r["timestamp"] - previous) * 1000, 2)
+            previous = r.get("timestamp", previous)
+            writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert captured raw NV12 frames to images in parallel')
+    parser.add_argument('input', type=str,
+                       help='A .nv12log frame log or a directory of .yuv frames')
+    parser.add_argument('--output', '-o', type=str, default='./converted_frames',
+                       help='Output directory (default: ./converted_frames)')
+    parser.add_argument('--format', '-f', type=str, choices=['png', 'jpg', 'none'], default='png',
+                       help='Per-frame image format, or none to skip (default: png)')
+    parser.add_argument('--resolution', '-r', type=str, default=None,
+                       help='Frame size for .yuv directories, e.g. 240x240')
+    parser.add_argument('--stride', type=int, default=None,
+                       help='Bytes per row for .yuv directories (default: width)')
+    parser.add_argument('--every', type=int, default=1,
+                       help='Only convert every Nth frame (default: 1)')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count(),
+                       help='Worker processes (default: number of cores)')
+    parser.add_argument('--chunk', type=int, default=16,
+                       help='Frames per work unit (default: 16)')
+    parser.add_argument('--thumbnails', '-t', action='store_true',
+                       help='Write contact sheets of frame thumbnails')
+    parser.add_argument('--thumb-size', type=str, default='96x96',
+                       help='Thumbnail size (default: 96x96)')
+    parser.add_argument('--stats', action='store_true',
+                       help='Write per-frame statistics to frame_stats.csv')
+
+    args = parser.parse_args()
+
+    if os.path.isdir(args.input):
+        if not args.resolution:
+            print("✗ --resolution is required for a directory of .yuv frames")
+            return 1
+        width, height = parse_resolution(args.resolution)
+        spec = ("yuv", sorted(glob.glob(os.path.join(args.input, "*.yuv"))), width, height, args.stride)
+    else:
+        spec = ("log", args.input)
+
+    source = open_source(spec)
+    total = len(source)
+    print("=== Frame Converter ===\n")
+    print(f"Input: {args.input} ({total} frames, {source.width}x{source.height})")
+    if isinstance(source, FrameLogReader):
+        source.close()
+
+    os.makedirs(args.output, exist_ok=True)
+    frames = list(range(0, total, args.every))
+    chunks = [frames[i:i + args.chunk] for i in range(0, len(frames), args.chunk)]
+    image_dir = None if args.format == 'none' else args.output
+    save_format = {"png": "PNG", "jpg": "JPEG"}.get(args.format)
+    thumb_size = parse_resolution(args.thumb_size) if args.thumbnails else None
+
+    start = time.monotonic()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker, initargs=(spec,)) as pool:
+        futures = [
+            pool.submit(_convert_chunk, chunk, image_dir, save_format, args.format, thumb_size, args.stats)
+            for chunk in chunks
+        ]
+        for future in futures:
+            results.extend(future.result())
+    elapsed = time.monotonic() - start
+
+    errors = [r for r in results if "error" in r]
+    converted = len(results) - len(errors)
+    print(f"✓ Converted {converted} frames in {elapsed:.2f}s "
+          f"({converted / elapsed if elapsed else 0:.1f} frames/s, {args.jobs} workers)")
+    for r in errors:
+        print(f"✗ Frame {r['frame']}: {r['error']}")
+
+    if thumb_size:
+        for path in write_contact_sheets(results, args.output, thumb_size):
+            print(f"✓ Contact sheet: {path}")
+    if args.stats:
+        stats_path = os.path.join(args.output, "frame_stats.csv")
+        write_stats(results, stats_path)
+        print(f"✓ Frame statistics: {stats_path}")
+
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,15 +4,30 @@ from periphery import CdevGPIO, GPIO
 import time
 import array
 
+from imaging.nv12 import rgb_to_rgb565
+from perf.memory import low_memory_requested
+from perf.metrics import metrics
+from perf.profiling import span
+
+
+# The panel frame rate is the rate of display.frames
+_frames = metrics.counter("display.frames", "Full frames written to the panel")
+_write_ms = metrics.histogram("display.write_ms", help="SPI transfer time per frame")
+_input_latency = metrics.pending_latency("input.latency_ms", help="Key press to the next frame on the panel")
+
 
 
 class ST7789(object):
     """class for ST7789  240*240 1.3inch OLED displays."""
 
-    def __init__(self):
+    def __init__(self, low_memory=None):
         self.width = 240
         self.height = 240
 
+        # In low-memory mode ShowImage encodes into this one panel buffer
+        self.low_memory = low_memory_requested() if low_memory is None else low_memory
+        self._buffer = bytearray(self.width * self.height * 2) if self.low_memory else None
+
         #Initialize DC RST pin
         # self._dc = 22
         # self._rst = 13
@@ -163,18 +178,34 @@ class ST7789(object):
         if imwidth != self.width or imheight != self.height:
             raise ValueError('Image must be same dimensions as display \
                 ({0}x{1}).' .format(self.width, self.height))
+        if self._buffer is not None:
+            rgb = Image if Image.mode == "RGB" else Image.convert("RGB")
+            self.ShowBuffer(rgb_to_rgb565(rgb, self._buffer))
+            return
         # convert 24-bit RGB-8:8:8 to gBRG-3:5:5:3; then per-pixel byteswap to 16-bit RGB-5:6:5
-        arr = array.array("H", Image.convert("BGR;16").tobytes())
-        arr.byteswap()
-        pix = arr.tobytes()
-        self.SetWindows ( 0, 0, self.width, self.height)
-        # GPIO.output(self._dc,GPIO.HIGH)
-        self._dc.write(True)
-        self._spi.writebytes2(pix)	
+        with span("rgb565-encode"):
+            arr = array.array("H", Image.convert("BGR;16").tobytes())
+            arr.byteswap()
+        self.ShowBuffer(arr.tobytes())
+
+    def ShowBuffer(self, pix):
+        """Write a pre-encoded big-endian RGB565 full-screen buffer to the display"""
+        if len(pix) != self.width * self.height * 2:
+            raise ValueError('Buffer must be {0} bytes for a {1}x{2} display.'
+                .format(self.width * self.height * 2, self.width, self.height))
+        start = time.monotonic()
+        with span("spi-write"):
+            self.SetWindows ( 0, 0, self.width, self.height)
+            # GPIO.output(self._dc,GPIO.HIGH)
+            self._dc.write(True)
+            self._spi.writebytes2(pix)	
+        _write_ms.observe((time.monotonic() - start) * 1000)
+        _frames.inc()
+        _input_latency.complete()
         
     def clear(self):
         """Clear contents of image buffer"""
-        _buffer = [0xff]*(self.width * self.height * 2)
+        _buffer = b"\xff" * (self.width * self.height * 2)
         self.SetWindows ( 0, 0, self.width, self.height)
         # GPIO.output(self._dc,GPIO.HIGH)
         self._dc.write(True)
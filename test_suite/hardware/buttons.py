@@ -5,6 +5,17 @@ import time
 
 from seedsigner.models.singleton import Singleton
 
+try:
+    from perf.metrics import metrics
+except ImportError:
+    # Installed in the SeedSigner tree and started without run_with_metrics.py,
+    # so the test suite isn't importable
+    metrics = None
+
+# seedsigner.controller imports this module in turn, so it can't be imported
+# up front; wait_for() imports it the first time it runs
+Controller = None
+
 class HardwareButtons(Singleton):
     # if GPIO.RPI_INFO['P1_REVISION'] == 3: #This indicates that we have revision 3 GPIO
     #     print("Detected 40pin GPIO (Rasbperry Pi 2 and above)")
@@ -97,18 +108,23 @@ class HardwareButtons(Singleton):
 
     def wait_for(self, keys=[], check_release=True, release_keys=[]) -> int:
         print(f"wait for --- {keys}")
-        import random
-        # TODO: Refactor to keep control in the Controller and not here
-        from seedsigner.controller import Controller
+        global Controller
+        if Controller is None:
+            # TODO: Refactor to keep control in the Controller and not here
+            from seedsigner.controller import Controller
         controller = Controller.get_instance()
 
         if not release_keys:
             release_keys = keys
         self.override_ind = False
+        last_poll = None
 
         while True:
             # print("wait_for loop")
             cur_time = int(time.time() * 1000)
+            # The gap since the last poll bounds how late a press is seen
+            poll = time.monotonic()
+            poll_gap, last_poll = poll - (last_poll or poll), poll
             if cur_time - self.last_input_time > controller.screensaver_activation_ms and not controller.is_screensaver_running:
                 # Start the screensaver. Will block execution until input detected.
                 controller.start_screensaver()
@@ -147,6 +163,7 @@ class HardwareButtons(Singleton):
                             self.cur_input = key
                             self.cur_input_started = int(time.time() * 1000)  # in milliseconds
                             self.last_input_time = self.cur_input_started
+                            self.record_input(poll_gap)
                             return key
 
                         else:
@@ -156,12 +173,14 @@ class HardwareButtons(Singleton):
                                 #   continuous input. Treat as a new separate press.
                                 self.cur_input_started = cur_time
                                 self.last_input_time = cur_time
+                                self.record_input(poll_gap)
                                 return key
 
                             elif cur_time - self.cur_input_started > self.first_repeat_threshold:
                                 # We're good to relay this immediately as continuous
                                 #   input.
                                 self.last_input_time = cur_time
+                                self.record_input(poll_gap, repeat=True)
                                 return key
 
                             else:
@@ -180,6 +199,15 @@ class HardwareButtons(Singleton):
             time.sleep(0.01) # wait 10 ms to give CPU chance to do other things
 
 
+    def record_input(self, poll_gap, repeat=False):
+        """Feed a press handed to the caller into the metrics registry, when there is one"""
+        if metrics is None:
+            return
+        metrics.counter("input.repeats" if repeat else "input.presses").inc()
+        metrics.histogram("input.poll_gap_ms", help="Time between the polls around a press").observe(poll_gap * 1000)
+        metrics.pending_latency("input.latency_ms").mark()
+
+
     def update_last_input_time(self):
         print("update_last_input_time")
         self.last_input_time = int(time.time() * 1000)
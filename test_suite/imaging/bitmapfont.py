@@ -0,0 +1,162 @@
+import mmap
+import os
+import struct
+import threading
+
+from PIL import Image
+
+from imaging.fonts import Glyph, GlyphAtlas, GlyphText
+
+
+# File layout, all little-endian:
+#   header
+#   glyph records, sorted by codepoint
+#   kerning records, sorted by (left, right) codepoint; only non-zero pairs
+#   glyph bitmaps: 8-bit coverage, row-major, width*height bytes each
+# Advances and kerning are in 1/64 pixel, as FreeType measures them.
+MAGIC = b"BFNT"
+VERSION = 1
+HEADER = struct.Struct("<4sHHhhhIIIII")
+GLYPH = struct.Struct("<IhhHHiI")
+KERN = struct.Struct("<IIi")
+
+EXTENSION = ".bitmapfont"
+
+# Printable ASCII, what the test scripts' messages are sanitized to
+DEFAULT_CHARS = "".join(chr(c) for c in range(32, 127))
+
+
+def compiled_font_path(font_path, size):
+    """Where the compiled form of `font_path` at `size` lives: Poppins-Regular-16.bitmapfont"""
+    return f"{os.path.splitext(font_path)[0]}-{size}{EXTENSION}"
+
+
+def compile_font(font, chars=DEFAULT_CHARS, spacing=4):
+    """
+    Rasterize `chars` of a FreeTypeFont and return the compiled font file
+    contents. Glyphs are drawn the same way GlyphAtlas draws them, so text
+    from the compiled font matches the live one.
+    """
+    atlas = GlyphAtlas(font, spacing)
+    chars = sorted(set(chars))
+    ascent, descent = font.getmetrics()
+
+    glyphs = []
+    bitmaps = bytearray()
+    for char in chars:
+        glyph = atlas.glyph(char)
+        width, height = glyph.mask.size if glyph.mask is not None else (0, 0)
+        glyphs.append(GLYPH.pack(ord(char), glyph.left, glyph.top, width, height,
+                                 round(glyph.advance * 64), len(bitmaps)))
+        if glyph.mask is not None:
+            bitmaps += glyph.mask.tobytes()
+
+    kerns = []
+    for a in chars:
+        for b in chars:
+            kern = round(atlas.kerning(a, b) * 64)
+            if kern:
+                kerns.append(KERN.pack(ord(a), ord(b), kern))
+
+    glyph_offset = HEADER.size
+    kern_offset = glyph_offset + GLYPH.size * len(glyphs)
+    bitmap_offset = kern_offset + KERN.size * len(kerns)
+    header = HEADER.pack(MAGIC, VERSION, font.size, ascent, descent, atlas.line_spacing,
+                         len(glyphs), len(kerns), glyph_offset, kern_offset, bitmap_offset)
+    return b"".join([header] + glyphs + kerns + [bytes(bitmaps)])
+
+
+class BitmapFont(GlyphText):
+    """
+    Text rendering from a compiled font file, without FreeType.
+
+    The file is memory-mapped: glyph records and kerning pairs are found by
+    binary search in the mapping and glyph masks are Images over the mapped
+    bitmaps, so opening costs a header read and only the pages of glyphs
+    actually drawn are ever paged in. Looked-up glyphs and pairs are kept.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.size, self.ascent, self.descent, self.line_spacing, self.glyph_count,
+         self.kern_count, self._glyph_offset, self._kern_offset, self._bitmap_offset) = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} compiled font")
+        self._view = memoryview(self._map)
+        self._glyphs = {}
+        self._kerning = {}
+        self._lock = threading.Lock()
+        self._missing = None
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def _find_glyph(self, codepoint):
+        low, high = 0, self.glyph_count
+        while low < high:
+            middle = (low + high) // 2
+            record = GLYPH.unpack_from(self._map, self._glyph_offset + middle * GLYPH.size)
+            if record[0] == codepoint:
+                return record
+            if record[0] < codepoint:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+
+    def _load(self, char):
+        record = self._find_glyph(ord(char))
+        if record is None:
+            # Characters that weren't compiled in are drawn as "?"
+            if self._missing is None:
+                self._missing = self._load("?") if char != "?" else Glyph(None, 0, 0, 0.0)
+            return self._missing
+        _, left, top, width, height, advance, offset = record
+        mask = None
+        if width and height:
+            start = self._bitmap_offset + offset
+            mask = Image.frombuffer("L", (width, height), self._view[start:start + width * height], "raw", "L", 0, 1)
+        return Glyph(mask, left, top, advance / 64)
+
+
+    def glyph(self, char):
+        glyph = self._glyphs.get(char)
+        if glyph is not None:
+            self.hits += 1
+            return glyph
+        with self._lock:
+            glyph = self._glyphs.get(char)
+            if glyph is None:
+                glyph = self._glyphs[char] = self._load(char)
+                self.misses += 1
+        return glyph
+
+
+    def kerning(self, a, b):
+        pair = a + b
+        kern = self._kerning.get(pair)
+        if kern is not None:
+            return kern
+        key = (ord(a), ord(b))
+        kern = 0.0
+        low, high = 0, self.kern_count
+        while low < high:
+            middle = (low + high) // 2
+            left, right, value = KERN.unpack_from(self._map, self._kern_offset + middle * KERN.size)
+            if (left, right) == key:
+                kern = value / 64
+                break
+            if (left, right) < key:
+                low = middle + 1
+            else:
+                high = middle
+        self._kerning[pair] = kern
+        return kern
+
+
+    def stats(self):
+        return {"glyphs": len(self._glyphs), "pairs": len(self._kerning), "hits": self.hits, "misses": self.misses}
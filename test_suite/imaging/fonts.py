@@ -0,0 +1,219 @@
+import math
+import os
+import string
+import threading
+from abc import ABC, abstractmethod
+
+from PIL import Image
+
+# PIL.ImageFont and ImageDraw (which loads FreeType) are imported where a
+# font is actually opened or rasterized, so text drawn from a compiled
+# bitmap font never loads them.
+
+
+_fonts = {}
+_atlases = {}
+_lock = threading.Lock()
+
+# Font files actually parsed, and get_font/get_atlas calls served from cache
+font_stats = {"loads": 0, "hits": 0}
+
+
+def get_font(path, size):
+    """
+    The process-wide FreeTypeFont for (`path`, `size`). The file is read and
+    parsed on first use only, instead of on every message.
+    """
+    from PIL import ImageFont
+
+    key = (path, size)
+    with _lock:
+        font = _fonts.get(key)
+        if font is None:
+            font = _fonts[key] = ImageFont.truetype(path, size)
+            font_stats["loads"] += 1
+        else:
+            font_stats["hits"] += 1
+        return font
+
+
+def get_atlas(path, size):
+    """
+    The process-wide text renderer for (`path`, `size`): the compiled
+    bitmap font next to the font file if there is an up-to-date one,
+    otherwise a GlyphAtlas over the FreeType font. The OS build doesn't
+    install the test suite, so the compiled font is made by hand where the
+    suite is copied to, with compile_font.py.
+    """
+    key = (path, size)
+    with _lock:
+        atlas = _atlases.get(key)
+        if atlas is not None:
+            return atlas
+    from imaging.bitmapfont import BitmapFont, compiled_font_path
+
+    compiled = compiled_font_path(path, size)
+    if os.path.exists(compiled) and (not os.path.exists(path) or os.path.getmtime(compiled) >= os.path.getmtime(path)):
+        atlas = BitmapFont(compiled)
+    else:
+        atlas = GlyphAtlas(get_font(path, size))
+    with _lock:
+        return _atlases.setdefault(key, atlas)
+
+
+class Glyph:
+    __slots__ = ("mask", "left", "top", "advance")
+
+    def __init__(self, mask, left, top, advance):
+        self.mask = mask
+        self.left = left
+        self.top = top
+        self.advance = advance
+
+
+class GlyphText(ABC):
+    """
+    Text layout and drawing over cached glyph masks.
+
+    Subclasses provide glyph(char), returning a Glyph, kerning(a, b) in
+    pixels, `ascent` and `line_spacing`. Text is composed by pasting glyph
+    masks along the baseline at whole-pixel positions; drawn with the
+    baseline one ascent below the top-left, the test screens come out
+    pixel-identical to ImageDraw.text (compile_font.py --check verifies
+    that). Newlines start a new left-aligned line, as ImageDraw does.
+    """
+    line_spacing = 0
+    ascent = 0
+
+
+    @abstractmethod
+    def glyph(self, char):
+        pass
+
+
+    @abstractmethod
+    def kerning(self, a, b):
+        pass
+
+
+    def _layout(self, text):
+        """
+        (glyph, x, y) for each character, relative to the baseline origin of
+        the first line, and (y, advance width, empty) for each line
+        """
+        placed = []
+        lines = []
+        for row, line in enumerate(text.split("\n")):
+            x = 0.0
+            y = row * self.line_spacing
+            previous = None
+            for char in line:
+                if previous is not None:
+                    x += self.kerning(previous, char)
+                glyph = self.glyph(char)
+                placed.append((glyph, int(round(x)), y))
+                x += glyph.advance
+                previous = char
+            lines.append((y, x, not line))
+        return placed, lines
+
+
+    def textbbox(self, text):
+        """
+        Bounding box of `text` drawn with its baseline origin at (0, 0).
+
+        As with ImageDraw.textbbox, each line's box covers its pen advance
+        along the baseline as well as the ink, so trailing spaces count, and
+        an empty line extends the box to its ascender.
+        """
+        placed, lines = self._layout(text)
+        boxes = [(x + g.left, y + g.top, x + g.left + g.mask.width, y + g.top + g.mask.height)
+                 for g, x, y in placed if g.mask is not None]
+        for y, width, empty in lines:
+            if empty:
+                boxes.append((0, y - self.ascent, 0, y - self.ascent))
+            else:
+                boxes.append((0, y, math.ceil(width), y))
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+    def textlength(self, text):
+        """Advance width of the longest line"""
+        return max(width for _, width, _ in self._layout(text)[1])
+
+
+    def draw(self, image, xy, text, fill=(255, 255, 255)):
+        """Paste `text` onto `image` with its baseline origin at `xy`"""
+        origin_x, origin_y = xy
+        placed, _ = self._layout(text)
+        for glyph, x, y in placed:
+            if glyph.mask is not None:
+                image.paste(fill, (origin_x + x + glyph.left, origin_y + y + glyph.top), glyph.mask)
+
+
+class GlyphAtlas(GlyphText):
+    """
+    Glyphs of one font rasterized once and kept as "L" coverage masks.
+
+    After warm-up drawing a string costs a few image pastes and no FreeType
+    work. Pair kerning is measured once per character pair the same way.
+    Lines are `spacing` pixels apart, as with ImageDraw.multiline_text.
+    """
+    def __init__(self, font, spacing=4):
+        self.font = font
+        self._glyphs = {}
+        self._kerning = {}
+        self._lock = threading.Lock()
+        ascent, descent = font.getmetrics()
+        self.ascent = ascent
+        self.descent = descent
+        # Baseline to baseline, measured the way ImageDraw.multiline_text does
+        self.line_spacing = font.getbbox("A")[3] + spacing
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def warm(self, chars=string.printable):
+        """Rasterize `chars` ahead of time"""
+        for char in chars:
+            self.glyph(char)
+        return self
+
+
+    def glyph(self, char):
+        glyph = self._glyphs.get(char)
+        if glyph is not None:
+            self.hits += 1
+            return glyph
+        with self._lock:
+            glyph = self._glyphs.get(char)
+            if glyph is None:
+                glyph = self._glyphs[char] = self._rasterize(char)
+                self.misses += 1
+        return glyph
+
+
+    def _rasterize(self, char):
+        from PIL import ImageDraw
+
+        left, top, right, bottom = self.font.getbbox(char, anchor="ls")
+        mask = None
+        if right > left and bottom > top:
+            mask = Image.new("L", (right - left, bottom - top), 0)
+            ImageDraw.Draw(mask).text((-left, -top), char, font=self.font, fill=255, anchor="ls")
+        return Glyph(mask, left, top, self.font.getlength(char))
+
+
+    def kerning(self, a, b):
+        pair = a + b
+        kern = self._kerning.get(pair)
+        if kern is None:
+            kern = self._kerning[pair] = (self.font.getlength(pair) - self.glyph(a).advance
+                                          - self.glyph(b).advance)
+        return kern
+
+
+    def stats(self):
+        return {"glyphs": len(self._glyphs), "pairs": len(self._kerning), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,178 @@
+from PIL import Image
+
+from imaging.remap import camera_remap, remap_cache
+from perf.profiling import span
+
+
+# Per-channel lookup tables that split 8-bit RGB into the two bytes of a
+# big-endian RGB565 pixel. Each table is 768 entries long (R, G, B) so it
+# can be applied to an RGB image with a single Image.point() call.
+#   high byte: RRRRRGGG   low byte: GGGBBBBB
+_RGB565_HIGH_LUT = [v & 0xF8 for v in range(256)] + [v >> 5 for v in range(256)] + [0] * 256
+_RGB565_LOW_LUT = [0] * 256 + [(v << 3) & 0xE0 for v in range(256)] + [v >> 3 for v in range(256)]
+
+
+def nv12_frame_size(width, height, stride=None):
+    """
+    Size in bytes of one full NV12 frame (Y plane followed by interleaved
+    UV), with a chroma row for every two luma rows rounded up. That is the
+    layout rgb_to_nv12() writes; a camera driver may deliver less for odd
+    heights, so live frames are sized by what the driver reports.
+    """
+    stride = stride or width
+    return stride * height + stride * ((height + 1) // 2)
+
+
+def pad_nv12(frame_data, frame_size):
+    """
+    `frame_data` extended to `frame_size` bytes with neutral chroma, for
+    frames whose driver rounds the chroma rows down or delivers a
+    truncated UV plane; returned as is when already long enough.
+    """
+    if len(frame_data) < frame_size:
+        return bytes(frame_data) + b"\x80" * (frame_size - len(frame_data))
+    return frame_data
+
+
+def rgb_to_rgb565(image, out=None):
+    """
+    Encode an RGB PIL image as a big-endian RGB565 buffer.
+
+    All of the work happens inside Pillow: two LUT passes pull the bit fields
+    out of each channel, a matrix convert sums them into the high and low
+    bytes, and an LA merge interleaves those bytes into panel order.
+
+    With `out`, a writable bytearray of width * height * 2 bytes, the high
+    and low bytes are interleaved straight into it instead and `out` is
+    returned; that skips the LA image and the full-size result.
+    """
+    with span("rgb565-encode"):
+        high = image.point(_RGB565_HIGH_LUT).convert("L", matrix=(1, 1, 0, 0))
+        low = image.point(_RGB565_LOW_LUT).convert("L", matrix=(0, 1, 1, 0))
+        if out is None:
+            return Image.merge("LA", (high, low)).tobytes()
+        out[0::2] = high.tobytes()
+        del high
+        out[1::2] = low.tobytes()
+        return out
+
+
+def rgb_to_nv12(image):
+    """
+    Encode a PIL image as an NV12 frame, the layout the camera delivers.
+
+    Chroma is box-filtered down to quarter resolution like a sensor ISP
+    would. Mostly useful for synthesizing test and benchmark frames.
+    """
+    width, height = image.size
+    if width % 2:
+        raise ValueError("NV12 frames must have an even width")
+    y, cb, cr = image.convert("YCbCr").split()
+    chroma_size = (width // 2, (height + 1) // 2)
+    cb = cb.resize(chroma_size, Image.BOX)
+    cr = cr.resize(chroma_size, Image.BOX)
+    return y.tobytes() + Image.merge("LA", (cb, cr)).tobytes()
+
+
+def nv12_to_image(frame_data, width, height, stride=None):
+    """
+    Full-resolution NV12 -> RGB PIL image.
+
+    Planes are wrapped with Image.frombuffer, chroma is upsampled and the
+    YCbCr conversion runs in Pillow's C code, so there is no per-pixel
+    Python work. Uses the same JFIF coefficients as convert_nv12_to_rgb.
+    """
+    stride = stride or width
+    chroma_size = (width // 2, (height + 1) // 2)
+    y_size = stride * height
+    frame_data = pad_nv12(frame_data, nv12_frame_size(width, height, stride))
+    with span("nv12-convert"):
+        y = Image.frombuffer("L", (width, height), frame_data, "raw", "L", stride, 1)
+        uv = Image.frombuffer("LA", chroma_size, memoryview(frame_data)[y_size:], "raw", "LA", stride, 1)
+        cb, cr = (c.resize((width, height), Image.NEAREST) for c in uv.split())
+        return Image.merge("YCbCr", (y, cb, cr)).convert("RGB")
+
+
+class NV12ToRGB565:
+    """
+    Fused NV12 -> panel conversion.
+
+    Scaling, crop-to-fit and rotation are folded into one precomputed remap
+    table, so each frame is cropped and scaled to the panel resolution by
+    Pillow before the C YCbCr->RGB and RGB565 packing. No full-size RGB
+    copy of the camera frame is ever made.
+
+    With `rotation=None` the camera rotation setting is looked up for every
+    frame, so changing it takes effect on the next frame.
+
+    convert_into() is the low-memory variant: the RGB565 encode writes into
+    a buffer that is allocated once and reused, as is the letterbox canvas,
+    so the only per-frame memory is Pillow's own panel-sized working
+    images. A converter used that way belongs to one thread.
+    """
+    def __init__(self, src_width, src_height, dst_width, dst_height, stride=None, rotation=0, fit="crop"):
+        self.src_width = src_width
+        self.src_height = src_height
+        self.dst_width = dst_width
+        self.dst_height = dst_height
+        self.stride = stride or src_width
+        self.rotation = rotation
+        self.fit = fit
+        self.frame_size = nv12_frame_size(src_width, src_height, self.stride)
+        self.output_size = dst_width * dst_height * 2
+        self._canvas = None
+        self._canvas_key = None
+        if rotation is not None:
+            self._table = remap_cache.get(src_width, src_height, dst_width, dst_height,
+                                          stride=self.stride, rotation=rotation, fit=fit, layout="nv12")
+        else:
+            self._table = None
+
+
+    @property
+    def table(self):
+        if self._table is not None:
+            return self._table
+        return camera_remap(self.src_width, self.src_height, self.dst_width, self.dst_height,
+                            stride=self.stride, fit=self.fit, layout="nv12")
+
+
+    def _pad(self, frame_data):
+        # Drivers that round odd chroma rows down, or a truncated UV plane,
+        # leave frames short; the missing chroma becomes neutral gray.
+        return pad_nv12(frame_data, self.frame_size)
+
+
+    def to_image(self, frame_data, reuse=False):
+        """
+        Convert an NV12 frame to an RGB PIL image at the panel resolution.
+        With `reuse`, a letterboxed image is the converter's canvas, valid
+        until the next call.
+        """
+        table = self.table
+        # "remap" is the crop, scale and rotation of the YCbCr planes;
+        # "nv12-convert" the YCbCr -> RGB conversion and letterboxing
+        with span("remap"):
+            ycbcr = table.apply(self._pad(frame_data))
+        with span("nv12-convert"):
+            image = ycbcr.convert("RGB")
+            if table.letterboxed:
+                # The bars stay black as long as the content box doesn't move
+                canvas = self._canvas if reuse and self._canvas_key == table.key else None
+                if canvas is None:
+                    canvas = Image.new("RGB", (self.dst_width, self.dst_height), (0, 0, 0))
+                    if reuse:
+                        self._canvas, self._canvas_key = canvas, table.key
+                canvas.paste(image, table.content_box)
+                image = canvas
+        return image
+
+
+    def convert(self, frame_data):
+        """Convert an NV12 frame straight to a big-endian RGB565 panel buffer."""
+        return rgb_to_rgb565(self.to_image(frame_data))
+
+
+    def convert_into(self, frame_data, out):
+        """Like convert(), into `out` (output_size bytes); returns `out`"""
+        return rgb_to_rgb565(self.to_image(frame_data, reuse=True), out)
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+
+class ScreenCache:
+    """
+    LRU of finished screens as encoded RGB565 panel buffers.
+
+    Keys describe everything that went into drawing a screen (text, font,
+    size, colors, layout); showing a screen that is still cached costs one
+    SPI transfer and no drawing or conversion. The cache is bounded by the
+    total size of the buffers it holds, `max_bytes`, rather than by a count,
+    so it stays predictable whatever the panel size. A buffer larger than
+    the whole budget is returned but not kept.
+    """
+    def __init__(self, max_bytes=1 << 20):
+        self.max_bytes = max_bytes
+        self._screens = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def get(self, key):
+        with self._lock:
+            buffer = self._screens.get(key)
+            if buffer is None:
+                self.misses += 1
+                return None
+            self._screens.move_to_end(key)
+            self.hits += 1
+            return buffer
+
+
+    def put(self, key, buffer):
+        """Store `buffer` (made immutable) under `key`; returns it"""
+        buffer = bytes(buffer)
+        if len(buffer) > self.max_bytes:
+            return buffer
+        with self._lock:
+            previous = self._screens.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._screens[key] = buffer
+            self.size += len(buffer)
+            while self.size > self.max_bytes:
+                _, evicted = self._screens.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+        return buffer
+
+
+    def render(self, key, draw):
+        """The cached buffer for `key`, calling `draw()` to produce it on a miss"""
+        buffer = self.get(key)
+        if buffer is None:
+            buffer = self.put(key, draw())
+        return buffer
+
+
+    def clear(self):
+        with self._lock:
+            self._screens.clear()
+            self.size = 0
+
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "screens": len(self._screens),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def format_cache_stats(stats):
+    return (f"{stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate'] * 100:.0f}% hit rate), "
+            f"{stats['screens']} screens in {stats['bytes'] / 1024:.0f}/{stats['max_bytes'] / 1024:.0f} KiB, "
+            f"{stats['evictions']} evicted")
+
+
+# Process-wide cache for the test scripts' menu and status screens
+screen_cache = ScreenCache()
@@ -3,18 +3,27 @@
 import sys
 import os
 import time
+import argparse
 import platform
-from PIL import Image, ImageDraw
 
 # Add the seedsigner src directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seedsigner'))
 
-# Monkey patch the Settings class to use our custom settings file
-from seedsigner.models.settings import Settings
-Settings.SETTINGS_FILENAME = "/seedsigner/settings.json"
+from perf.imports import lazy_import, use_test_settings_file
+from perf.metrics import export_metrics
+from perf.profiling import profiled
+from perf.runner import Test, add_runner_arguments, finish, run_tests
 
-from seedsigner.gui.renderer import Renderer
-from seedsigner.models.settings_definition import SettingsConstants
+# Monkey patch the Settings class to use our custom settings file, whenever
+# something first imports it
+use_test_settings_file()
+
+# PIL and SeedSigner's settings and GUI load on first use, not at startup
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+Settings = lazy_import("seedsigner.models.settings", "Settings")
+SettingsConstants = lazy_import("seedsigner.models.settings_definition", "SettingsConstants")
+Renderer = lazy_import("seedsigner.gui.renderer", "Renderer")
 
 def initialize_renderer():
     """Initialize the renderer once for all tests"""
@@ -288,7 +297,24 @@ def test_blank_screen():
         print(f"✗ Blank screen test failed: {e}")
         return False
 
+def suite():
+    """The LCD tests, in order; the renderer must already be initialized"""
+    return [
+        Test(test_lcd_initialization),
+        Test(test_display_settings),
+        Test(test_display_dimensions),
+        Test(test_color_display, resources=["display"]),
+        Test(test_pattern_display, resources=["display"]),
+        Test(test_flag_display, resources=["display"]),
+        Test(test_text_display, resources=["display"]),
+        Test(test_blank_screen, resources=["display"]),
+    ]
+
 def main():
+    parser = argparse.ArgumentParser(description='Test the LCD display')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
     print("=== LCD Display Test Script ===\n")
     
     # Initialize the renderer once at the beginning
@@ -298,34 +324,9 @@ def main():
         print("✗ Failed to initialize renderer. Exiting.")
         return 1
     
-    tests = [
-        test_lcd_initialization,
-        test_display_settings,
-        test_display_dimensions,
-        test_color_display,
-        test_pattern_display,
-        test_flag_display,
-        test_text_display,
-        test_blank_screen
-    ]
-    
-    passed = 0
-    total = len(tests)
-    
-    for test in tests:
-        if test():
-            passed += 1
-        print()
-    
-    print(f"=== Test Results ===")
-    print(f"Passed: {passed}/{total}")
-    
-    if passed == total:
-        print("✓ All tests passed!")
-        return 0
-    else:
-        print("✗ Some tests failed!")
-        return 1
+    report = run_tests("lcd", suite(), concurrent=not args.serial)
+    return finish(report, args)
 
 if __name__ == "__main__":
-    sys.exit(main())
+    with export_metrics():
+        sys.exit(profiled(main))
@@ -0,0 +1,302 @@
+import os
+import sys
+import threading
+import time
+
+# Importing this module should import as little as possible itself, so the
+# startup profile of a script shows what the script pulls in. This is the
+# import machinery the interpreter runs on (importlib._bootstrap, without
+# loading the importlib package); CPython calls its _find_and_load() for
+# every import of a module that isn't in sys.modules yet. It is only
+# patched while an ImportProfiler runs.
+_bootstrap = sys.modules["_frozen_importlib"]
+
+# Writes that count as a script's first screen, wherever it draws
+SCREEN_METHODS = (
+    ("hardware.ST7789", "ST7789", "ShowBuffer"),
+    ("seedsigner.gui.renderer", "Renderer", "show_image"),
+)
+
+# Prefix of the line profile_startup() reports its results on
+RESULT_PREFIX = "startup-profile: "
+
+# The SeedSigner settings file the test scripts use
+TEST_SETTINGS_FILE = "/seedsigner/settings.json"
+
+
+_hooks = {}
+_profilers = []
+_lock = threading.Lock()
+_original_find_and_load = None
+
+
+def _find_and_load(name, *args):
+    for profiler in _profilers:
+        profiler._enter()
+    start = time.perf_counter()
+    try:
+        return _original_find_and_load(name, *args)
+    finally:
+        elapsed = time.perf_counter() - start
+        for profiler in _profilers:
+            profiler._exit(name, elapsed)
+
+
+def _update_patch():
+    """Patch the import machinery while there are profilers, and only then"""
+    global _original_find_and_load
+    if _profilers and _original_find_and_load is None:
+        _original_find_and_load = _bootstrap._find_and_load
+        _bootstrap._find_and_load = _find_and_load
+    elif not _profilers and _original_find_and_load is not None:
+        _bootstrap._find_and_load = _original_find_and_load
+        _original_find_and_load = None
+
+
+class _HookFinder:
+    """
+    Sits first on sys.meta_path while when_imported() hooks are pending.
+    It finds nothing itself: for a hooked module it takes the spec the
+    other finders return and has the loader run the hooks once the module
+    has executed. Other imports only cost it a dict lookup, and it takes
+    itself off sys.meta_path when the last hook has run.
+    """
+    @staticmethod
+    def find_spec(name, path=None, target=None):
+        if name not in _hooks:
+            return None
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if finder is _HookFinder or find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        if loader is None or not hasattr(loader, "exec_module"):
+            return spec
+        exec_module = loader.exec_module
+
+        def exec_and_hook(module):
+            exec_module(module)
+            del loader.exec_module
+            _run_hooks(name, module)
+        loader.exec_module = exec_and_hook
+        return spec
+
+
+def _update_finder():
+    """Keep _HookFinder on sys.meta_path while hooks are pending, and only then"""
+    installed = _HookFinder in sys.meta_path
+    if _hooks and not installed:
+        sys.meta_path.insert(0, _HookFinder)
+    elif not _hooks and installed:
+        sys.meta_path.remove(_HookFinder)
+
+
+def _run_hooks(name, module):
+    with _lock:
+        hooks = _hooks.pop(name, ())
+        _update_finder()
+    for hook in hooks:
+        hook(module)
+
+
+def when_imported(name, hook=None):
+    """
+    Call hook(module) once `name` has been imported, by whoever imports it
+    first, or right away if it already has been. Lets a script patch a
+    module it no longer imports up front. Usable as a decorator.
+    """
+    if hook is None:
+        return lambda hook: when_imported(name, hook)
+    with _lock:
+        if name not in sys.modules:
+            _hooks.setdefault(name, []).append(hook)
+            _update_finder()
+            return hook
+    hook(sys.modules[name])
+    return hook
+
+
+def use_test_settings_file(path=TEST_SETTINGS_FILE):
+    """Have SeedSigner's Settings read `path`, from whenever it is first imported"""
+    def patch(module):
+        module.Settings.SETTINGS_FILENAME = path
+    when_imported("seedsigner.models.settings", patch)
+
+
+class LazyImport:
+    """
+    Stands in for a module, or for a name in one, and imports it the first
+    time anything is looked up on it or it is called:
+
+      Image = lazy_import("PIL.Image")
+      Renderer = lazy_import("seedsigner.gui.renderer", "Renderer")
+
+    After that each use costs one extra attribute lookup. Setting an
+    attribute sets it on the real object. isinstance() and `is` checks
+    against the proxy don't work; use resolve() for those.
+    """
+    def __init__(self, module, attr=None):
+        object.__setattr__(self, "_module", module)
+        object.__setattr__(self, "_attr", attr)
+        object.__setattr__(self, "_target", None)
+        object.__setattr__(self, "_resolve_lock", threading.Lock())
+
+
+    def resolve(self):
+        target = self._target
+        if target is None:
+            with self._resolve_lock:
+                target = self._target
+                if target is None:
+                    __import__(self._module)
+                    target = sys.modules[self._module]
+                    if self._attr is not None:
+                        target = getattr(target, self._attr)
+                    object.__setattr__(self, "_target", target)
+        return target
+
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+
+    def __setattr__(self, name, value):
+        setattr(self.resolve(), name, value)
+
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+
+    def __repr__(self):
+        name = f"{self._module}.{self._attr}" if self._attr else self._module
+        state = "loaded" if self._target is not None else "not loaded"
+        return f"<lazy {name}, {state}>"
+
+
+def lazy_import(module, attr=None):
+    """A LazyImport for `module`, or for `attr` in it"""
+    return LazyImport(module, attr)
+
+
+class _ImportFrame:
+    __slots__ = ("children",)
+
+    def __init__(self):
+        self.children = 0.0
+
+
+class ImportProfiler:
+    """
+    Times every module imported while it runs, much like -X importtime
+    but in-process, so the results can be reported from the script
+    itself: per module the time spent importing it including the modules
+    it imported in turn (cumulative) and excluding them (self). Modules
+    that failed to import, such as optional ones that aren't installed,
+    are kept with found=False; they cost time all the same.
+    """
+    def __init__(self):
+        self.modules = {}
+        self._local = threading.local()
+
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+    def _enter(self):
+        self._stack().append(_ImportFrame())
+
+
+    def _exit(self, name, elapsed):
+        stack = self._stack()
+        if not stack:
+            # Started while this module was already being imported
+            return
+        frame = stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        self.modules[name] = {"self": elapsed - frame.children, "cumulative": elapsed,
+                              "depth": len(stack), "found": name in sys.modules}
+
+
+    def start(self):
+        with _lock:
+            _profilers.append(self)
+            _update_patch()
+
+
+    def stop(self):
+        with _lock:
+            _profilers.remove(self)
+            _update_patch()
+
+
+    def format(self, top=20):
+        return format_import_times(self.modules, top)
+
+
+def format_import_times(modules, top=20):
+    """
+    Report for ImportProfiler.modules (or the same shape, such as averages
+    over several runs): the total, the script's own imports by their
+    cumulative time, then the `top` modules by self time.
+    """
+    direct = sorted(((name, m) for name, m in modules.items() if m["depth"] == 0),
+                    key=lambda item: -item[1]["cumulative"])
+    total = sum(m["cumulative"] for _, m in direct)
+    lines = [f"{len(modules)} modules imported in {total * 1000:.1f}ms", "", "Direct imports (cumulative):"]
+    for name, m in direct[:top]:
+        lines.append(f"  {m['cumulative'] * 1000:>9.2f}ms  {name}{'' if m['found'] else '  (not found)'}")
+    lines += ["", "Slowest modules (self):"]
+    for name, m in sorted(modules.items(), key=lambda item: -item[1]["self"])[:top]:
+        lines.append(f"  {m['self'] * 1000:>9.2f}ms  {name}")
+    return "\n".join(lines)
+
+
+def profile_startup(script, args):
+    """
+    Run `script` as __main__ in this process with every import timed, and
+    exit as soon as it has drawn its first screen (see SCREEN_METHODS),
+    printing the time since this was called and the import times on one
+    line. Meant to be the first thing a fresh interpreter runs; the
+    startup_profile.py script launches it that way.
+    """
+    started = time.perf_counter()
+    profiler = ImportProfiler()
+
+    def first_screen(original):
+        def show(*show_args, **kwargs):
+            original(*show_args, **kwargs)
+            elapsed = time.perf_counter() - started
+            profiler.stop()
+            import json
+            print(RESULT_PREFIX + json.dumps({"screen": elapsed, "modules": profiler.modules}), flush=True)
+            os._exit(0)
+        return show
+
+    for module_name, class_name, method in SCREEN_METHODS:
+        @when_imported(module_name)
+        def patch(module, class_name=class_name, method=method):
+            cls = getattr(module, class_name)
+            setattr(cls, method, first_screen(getattr(cls, method)))
+
+    # What running `python script args` would set up, without runpy
+    script = os.path.abspath(script)
+    sys.argv = [script] + list(args)
+    sys.path[0] = os.path.dirname(script)
+    with open(script) as f:
+        code = compile(f.read(), script, "exec")
+    profiler.start()
+    exec(code, {"__name__": "__main__", "__file__": script, "__builtins__": __builtins__})
+    profiler.stop()
+    print(f"✗ {script} finished without drawing a screen")
+    return 1
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+from perf.profiling import record_span
+from perf.runner import read_status_kib
+
+
+# Set to 1 to run the camera -> display path on preallocated buffers
+LOW_MEMORY_ENV_VAR = "TEST_LOW_MEMORY"
+
+# Allocation sites listed in the report
+TOP_SITES = 15
+
+
+def low_memory_requested():
+    return os.environ.get(LOW_MEMORY_ENV_VAR, "") not in ("", "0")
+
+
+def peak_rss_kib():
+    """Peak RSS (VmHWM) of this process so far, in KiB"""
+    return read_status_kib("VmHWM")
+
+
+def format_kib(kib):
+    if kib is None:
+        return "-"
+    return f"{kib / 1024:.1f}MiB" if kib >= 1024 else f"{kib}KiB"
+
+
+def format_bytes(size):
+    sign = "-" if size < 0 else ""
+    size = abs(size)
+    if size >= 1 << 20:
+        return f"{sign}{size / (1 << 20):.2f}MiB"
+    if size >= 1 << 10:
+        return f"{sign}{size / (1 << 10):.1f}KiB"
+    return f"{sign}{size}B"
+
+
+class _StageAllocations:
+    __slots__ = ("count", "peak_total", "peak_max", "retained")
+
+    def __init__(self):
+        self.count = 0
+        self.peak_total = 0
+        self.peak_max = 0
+        self.retained = 0
+
+
+class _AllocationSpan:
+    __slots__ = ("tracker", "name", "start", "base")
+
+    def __init__(self, tracker, name):
+        self.tracker = tracker
+        self.name = name
+
+
+    def __enter__(self):
+        self.base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        current, peak = tracemalloc.get_traced_memory()
+        record_span(self.name, duration)
+        self.tracker.record(self.name, peak - self.base, current - self.base, peak)
+
+
+class AllocationTracker:
+    """
+    Per-stage allocation accounting with tracemalloc, for the stages marked
+    with perf.profiling.span(). For each stage it keeps how much memory the
+    stage had allocated at its high point above what was live when it
+    started (the transient buffers it needed) and how much of that was still
+    live when it finished (what it handed on, such as its output buffer),
+    both per call.
+
+    tracemalloc sees Python allocations only: bytes, bytearrays, tuples and
+    so on, not the pixel memory of PIL images, which the peak RSS covers.
+    Its peak is process-wide, so a stage that overlaps allocations on other
+    threads is charged for them too; spans should not nest.
+    """
+    def __init__(self, frames=1):
+        self.frames = frames
+        self.stages = {}
+        self.peak = 0
+        self.sites = []
+        self._lock = threading.Lock()
+
+
+    def span(self, name):
+        return _AllocationSpan(self, name)
+
+
+    def record(self, name, peak, retained, traced_peak):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = _StageAllocations()
+            stage.count += 1
+            stage.peak_total += peak
+            stage.peak_max = max(stage.peak_max, peak)
+            stage.retained += retained
+            self.peak = max(self.peak, traced_peak)
+
+
+    def start(self):
+        tracemalloc.start(self.frames)
+
+
+    def stop(self):
+        """Stop tracing; the biggest allocations still live are kept as `sites`"""
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        self.sites = [(str(stat.traceback[0]), stat.size, stat.count)
+                      for stat in snapshot.statistics("lineno")[:TOP_SITES]]
+
+
+    def summary(self):
+        """Per-stage allocations, largest peak first"""
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: -item[1].peak_max)
+            return {name: {"count": s.count, "peak_mean": s.peak_total // s.count, "peak_max": s.peak_max,
+                           "retained_mean": s.retained // s.count} for name, s in stages}
+
+
+    def results(self):
+        return {"traced_peak": self.peak, "peak_rss_kib": peak_rss_kib(), "stages": self.summary(),
+                "live_sites": [{"site": site, "size": size, "count": count} for site, size, count in self.sites]}
+
+
+    def format(self):
+        lines = [f"{'stage':<18}{'count':>8}{'peak mean':>12}{'peak max':>12}{'retained':>12}"]
+        for name, s in self.summary().items():
+            lines.append(f"{name:<18}{s['count']:>8}{format_bytes(s['peak_mean']):>12}"
+                         f"{format_bytes(s['peak_max']):>12}{format_bytes(s['retained_mean']):>12}")
+        lines.append(f"Traced peak {format_bytes(self.peak)}, peak RSS {format_kib(peak_rss_kib())}")
+        if self.sites:
+            lines.append("Largest allocations still live:")
+            for site, size, count in self.sites:
+                lines.append(f"  {format_bytes(size):>10} in {count:>6} blocks  {site}")
+        return "\n".join(lines)
+
+
+    def write(self, base):
+        """Write the results next to the other profile files; returns the paths written"""
+        with open(base + ".memory.json", "w") as f:
+            json.dump(self.results(), f, indent=2)
+        with open(base + ".memory.txt", "w") as f:
+            f.write(self.format() + "\n")
+        return [base + ".memory.txt", base + ".memory.json"]
@@ -0,0 +1,345 @@
+import bisect
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from perf.runner import read_status_kib
+
+
+ENV_VAR = "TEST_METRICS"
+FORMAT_VERSION = 2
+
+# Default histogram buckets (upper bounds, inclusive) for timings in ms
+MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _Sharded:
+    """
+    Base for metrics updated from several threads. Each thread updates its
+    own shard, which no other thread writes, so the hot path never takes a
+    lock; reading sums the shards and may be an update or two behind.
+    """
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = self._new_shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def _new_shard(self):
+        return [0]
+
+
+    def inc(self, n=1):
+        self._shard()[0] += n
+
+
+    def value(self):
+        return sum(shard[0] for shard in list(self._shards))
+
+
+class Gauge:
+    """
+    A value that is set rather than accumulated. With `read`, the value is
+    instead taken by calling it whenever a snapshot is made.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help="", read=None):
+        self.name = name
+        self.help = help
+        self.read = read
+        self._value = 0
+
+
+    def set(self, value):
+        self._value = value
+
+
+    def value(self):
+        return self.read() if self.read is not None else self._value
+
+
+class Histogram(_Sharded):
+    """
+    Observations in fixed buckets (upper bounds, inclusive) plus their sum.
+    Bucket counts are reported cumulatively, as Prometheus does: each one
+    counts every observation up to its bound, and the last (no bound)
+    equals the total count.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, buckets=MS_BUCKETS, help=""):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+
+
+    def _new_shard(self):
+        # One count per bucket, one for above the last, then the sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+
+    def value(self):
+        totals = [0] * (len(self.buckets) + 2)
+        for shard in list(self._shards):
+            for i, v in enumerate(shard):
+                totals[i] += v
+        cumulative = []
+        count = 0
+        for n in totals[:-1]:
+            count += n
+            cumulative.append(count)
+        return {"count": count, "sum": totals[-1], "buckets": list(zip(self.buckets + (None,), cumulative))}
+
+
+class PendingLatency(Histogram):
+    """
+    Histogram of the time in ms from an event on one thread to the next
+    matching event anywhere, such as from a key press to the next frame
+    written to the panel. Only the first mark() before complete() counts,
+    so a held key or a burst of presses measures from the earliest.
+    """
+    def __init__(self, name, buckets=MS_BUCKETS, help=""):
+        super().__init__(name, buckets, help)
+        self._pending = None
+
+
+    def mark(self):
+        if self._pending is None:
+            self._pending = time.monotonic()
+
+
+    def complete(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self.observe((time.monotonic() - pending) * 1000)
+
+
+class MetricsRegistry:
+    """
+    Named counters, gauges and histograms. Asking for a metric that already
+    exists returns it, so modules can each declare what they update.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already a {metric.kind}")
+            return metric
+
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+
+    def gauge(self, name, help="", read=None):
+        return self._get(Gauge, name, help, read)
+
+
+    def histogram(self, name, buckets=MS_BUCKETS, help=""):
+        return self._get(Histogram, name, buckets, help)
+
+
+    def pending_latency(self, name, buckets=MS_BUCKETS, help=""):
+        return self._get(PendingLatency, name, buckets, help)
+
+
+    def snapshot(self):
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return {
+            "time": time.time(),
+            "monotonic": time.monotonic(),
+            "uptime": time.monotonic() - self.started,
+            "metrics": {name: (metric.kind, metric.value()) for name, metric in metrics},
+        }
+
+
+# Process-wide registry the drivers feed
+metrics = MetricsRegistry()
+
+
+def _number(value):
+    return f"{value:.6g}" if isinstance(value, float) else str(value)
+
+
+def format_snapshot(snapshot, previous=None):
+    """
+    One line per metric, after a header line:
+
+      # metrics 2 time=1700000000.123 uptime=12.5 pid=321
+      display.frames counter 371 rate=29.8
+      capture.fps gauge 30
+      display.write_ms histogram count=371 sum=4128.5 le1=0 le2=0 le5=12 ... inf=371
+
+    Histogram buckets are cumulative: leN counts the observations of at
+    most N, and inf all of them. Counter rates are per second since
+    `previous`, an earlier snapshot.
+    """
+    lines = [f"# metrics {FORMAT_VERSION} time={snapshot['time']:.3f} uptime={snapshot['uptime']:.1f} pid={os.getpid()}"]
+    elapsed = snapshot["monotonic"] - previous["monotonic"] if previous else 0
+    for name, (kind, value) in snapshot["metrics"].items():
+        if kind == "histogram":
+            buckets = " ".join(f"le{_number(bound)}={count}" if bound is not None else f"inf={count}"
+                               for bound, count in value["buckets"])
+            lines.append(f"{name} {kind} count={value['count']} sum={value['sum']:.6g} {buckets}")
+            continue
+        line = f"{name} {kind} {_number(value)}"
+        if kind == "counter" and elapsed > 0 and name in previous["metrics"]:
+            line += f" rate={(value - previous['metrics'][name][1]) / elapsed:.3g}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Publishes registry snapshots for reading on a unit in the field, either
+    written to a file every `interval` seconds (replaced atomically, so a
+    reader never sees half a snapshot) or served on a Unix socket, where
+    each connection gets a fresh snapshot and is closed. Either way counter
+    rates are over the last `interval`.
+    """
+    def __init__(self, registry=metrics, path=None, socket_path=None, interval=5.0):
+        if (path is None) == (socket_path is None):
+            raise ValueError("Export to either a file or a Unix socket")
+        self.registry = registry
+        self.path = path
+        self.socket_path = socket_path
+        self.interval = interval
+        self._previous = None
+        self._current = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+
+
+    @classmethod
+    def from_spec(cls, spec, registry=metrics):
+        """
+        Build an exporter from a compact description, as used for the
+        TEST_METRICS environment variable:
+
+          /tmp/test-metrics.txt[,interval=5]
+          unix:/tmp/test-metrics.sock[,interval=5]
+        """
+        target, *options = spec.split(",")
+        opts = dict(option.split("=", 1) for option in options)
+        kwargs = {}
+        if "interval" in opts:
+            kwargs["interval"] = float(opts.pop("interval"))
+        if opts:
+            raise ValueError(f"Unknown metrics options: {', '.join(opts)}")
+        if target.startswith("unix:"):
+            return cls(registry, socket_path=target[len("unix:"):], **kwargs)
+        return cls(registry, path=target, **kwargs)
+
+
+    def _tick(self, final=False):
+        snapshot = self.registry.snapshot()
+        # A last snapshot just after a periodic one would give rates over a few ms
+        if not (final and self._current and snapshot["monotonic"] - self._current["monotonic"] < self.interval / 2):
+            self._previous = self._current
+        self._current = snapshot
+        if self.path is not None:
+            temp = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp, "w") as f:
+                f.write(format_snapshot(self._current, self._previous))
+            os.replace(temp, self.path)
+
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._tick()
+
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break
+            with conn:
+                try:
+                    conn.sendall(format_snapshot(self.registry.snapshot(), self._current).encode())
+                except OSError:
+                    pass
+
+
+    def start(self):
+        self._tick()
+        if self.socket_path is not None:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(self.socket_path)
+            self._server.listen(4)
+            self._threads.append(threading.Thread(target=self._serve, name="metrics-server", daemon=True))
+        self._threads.append(threading.Thread(target=self._run, name="metrics-exporter", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+
+    def stop(self):
+        """Stop exporting; a file gets one last snapshot, a socket is removed"""
+        self._stop.set()
+        if self._server is not None:
+            # Closing alone doesn't wake a thread blocked in accept() on Linux
+            self._server.shutdown(socket.SHUT_RDWR)
+            self._server.close()
+            os.unlink(self.socket_path)
+        for thread in self._threads:
+            thread.join(self.interval)
+        if self.path is not None:
+            self._tick(final=True)
+
+
+@contextmanager
+def export_metrics(spec=None):
+    """
+    Export the process-wide registry while the block runs, as set by the
+    TEST_METRICS environment variable (see MetricsExporter.from_spec) or
+    `spec`; does nothing when neither is set. Adds process RSS and CPU time
+    as gauges.
+    """
+    spec = spec or os.environ.get(ENV_VAR)
+    if not spec:
+        yield None
+        return
+    metrics.gauge("process.rss_kib", read=lambda: read_status_kib("VmRSS"))
+    metrics.gauge("process.cpu_s", read=time.process_time)
+    exporter = MetricsExporter.from_spec(spec)
+    exporter.start()
+    try:
+        yield exporter
+    finally:
+        exporter.stop()
@@ -0,0 +1,359 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from perf.stats import summarize
+
+
+ENV_VAR = "TEST_PROFILE"
+MODES = ("spans", "sample", "deterministic", "memory")
+
+# Durations kept per span for percentiles; counts and totals cover every call
+SPAN_HISTORY = 10000
+
+
+class _SpanStats:
+    __slots__ = ("count", "total", "durations")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.durations = deque(maxlen=SPAN_HISTORY)
+
+
+_spans = {}
+_spans_lock = threading.Lock()
+_enabled = False
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        record_span(self.name, time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+# What span() hands out while profiling; the memory mode swaps in its own
+_span_type = _Span
+
+
+def span(name):
+    """
+    Context manager timing one run of the stage called `name`. Spans are
+    only recorded while profiling is on; otherwise this returns a shared
+    no-op, so instrumented hot paths cost next to nothing.
+    """
+    return _span_type(name) if _enabled else _NULL_SPAN
+
+
+def record_span(name, duration):
+    with _spans_lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = _SpanStats()
+        stats.count += 1
+        stats.total += duration
+        stats.durations.append(duration)
+
+
+def span_summary():
+    """Per-span count, total and duration percentiles, busiest first"""
+    with _spans_lock:
+        items = [(name, s.count, s.total, list(s.durations)) for name, s in _spans.items()]
+    summary = {}
+    for name, count, total, durations in sorted(items, key=lambda item: -item[2]):
+        summary[name] = dict(summarize(durations), count=count, total=total)
+    return summary
+
+
+def format_span_summary(summary, wall=None):
+    lines = [f"{'span':<18}{'count':>8}{'total':>10}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}"
+             + (f"{'% wall':>8}" if wall else "")]
+    for name, s in summary.items():
+        line = (f"{name:<18}{s['count']:>8}{s['total']:>9.2f}s{s['mean'] * 1000:>8.2f}ms"
+                f"{s['p50'] * 1000:>8.2f}ms{s['p95'] * 1000:>8.2f}ms{s['max'] * 1000:>8.2f}ms")
+        if wall:
+            line += f"{s['total'] / wall * 100:>7.1f}%"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Statistical profiler: a thread that snapshots every other thread's
+    Python stack each `interval` seconds and counts identical stacks, as
+    "thread;outer;...;inner count" lines (the collapsed format flame graph
+    tools read). Time spent in C, such as an SPI transfer, is charged to the
+    Python function that called it.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class StackTracer:
+    """
+    Deterministic profiler: hooks every Python and C function call and
+    return (sys.setprofile, on threads started after it too) and charges
+    the time between events to the full stack, in microseconds, written in
+    the same collapsed format as StackSampler. Exact, but it slows the
+    program down several times, so use it on short runs.
+    """
+    def __init__(self):
+        self.stacks = Counter()
+        self.events = 0
+        self._local = threading.local()
+
+
+    def _profile(self, frame, event, arg):
+        now = time.perf_counter()
+        local = self._local
+        keys = getattr(local, "keys", None)
+        if keys is None:
+            keys = local.keys = [threading.current_thread().name]
+        else:
+            self.stacks[keys[-1]] += now - local.last
+        if event == "call":
+            keys.append(f"{keys[-1]};{_frame_label(frame.f_code)}")
+        elif event == "c_call":
+            keys.append(f"{keys[-1]};{getattr(arg, '__qualname__', arg.__name__)}")
+        elif len(keys) > 1:
+            # Returns from frames entered before tracing started have nothing to pop
+            keys.pop()
+        self.events += 1
+        local.last = time.perf_counter()
+
+
+    def start(self):
+        threading.setprofile(self._profile)
+        sys.setprofile(self._profile)
+
+
+    def stop(self):
+        sys.setprofile(None)
+        threading.setprofile(None)
+
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, seconds in self.stacks.most_common():
+                micros = round(seconds * 1e6)
+                if micros:
+                    f.write(f"{stack} {micros}\n")
+
+
+class Profiler:
+    """
+    One profiling session over an entry point: spans always, plus the
+    stack sampler ("sample", counts of samples), the stack tracer
+    ("deterministic", microseconds) or per-span allocation accounting
+    ("memory", see perf.memory.AllocationTracker). Results go to
+    `output_dir` as <name>-<pid>.spans.txt / .spans.json and, by mode,
+    <name>-<pid>.collapsed or .memory.txt / .memory.json.
+    """
+    def __init__(self, mode="sample", interval=0.005, output_dir=".", name="profile", frames=1):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode}, expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.interval = interval
+        self.frames = frames
+        self.output_dir = output_dir
+        self.name = name
+        self.stacks = None
+        self.memory = None
+        self.started = None
+        self.wall = None
+
+
+    @classmethod
+    def from_spec(cls, spec, name="profile"):
+        """
+        Build a profiler from a compact description, as used for the
+        TEST_PROFILE environment variable or --profile:
+
+          sample[,interval=0.005][,dir=/mnt/sdcard/profiles]
+          deterministic[,dir=...]
+          memory[,frames=1][,dir=...]
+          spans[,dir=...]
+        """
+        mode, *options = spec.split(",")
+        opts = dict(option.split("=", 1) for option in options)
+        kwargs = {"output_dir": opts.pop("dir", ".")}
+        if "interval" in opts:
+            kwargs["interval"] = float(opts.pop("interval"))
+        if "frames" in opts:
+            kwargs["frames"] = int(opts.pop("frames"))
+        if opts:
+            raise ValueError(f"Unknown profiling options: {', '.join(opts)}")
+        return cls(mode or "sample", name=name, **kwargs)
+
+
+    def start(self):
+        global _enabled, _span_type
+        if self.mode == "memory":
+            from perf.memory import AllocationTracker
+            self.memory = AllocationTracker(self.frames)
+            self.memory.start()
+            _span_type = self.memory.span
+        _enabled = True
+        self.started = time.perf_counter()
+        if self.mode == "sample":
+            self.stacks = StackSampler(self.interval)
+        elif self.mode == "deterministic":
+            self.stacks = StackTracer()
+        if self.stacks is not None:
+            self.stacks.start()
+
+
+    def stop(self):
+        global _enabled, _span_type
+        if self.stacks is not None:
+            self.stacks.stop()
+        self.wall = time.perf_counter() - self.started
+        _enabled = False
+        _span_type = _Span
+        if self.memory is not None:
+            self.memory.stop()
+
+
+    def write(self):
+        """Write the results; returns the paths written"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.name}-{os.getpid()}")
+        paths = []
+
+        summary = span_summary()
+        with open(base + ".spans.json", "w") as f:
+            json.dump({"mode": self.mode, "wall": self.wall, "spans": summary}, f, indent=2)
+        with open(base + ".spans.txt", "w") as f:
+            f.write(format_span_summary(summary, self.wall) + "\n")
+        paths += [base + ".spans.txt", base + ".spans.json"]
+
+        if self.stacks is not None:
+            self.stacks.write(base + ".collapsed")
+            paths.append(base + ".collapsed")
+        if self.memory is not None:
+            paths += self.memory.write(base)
+        return paths
+
+
+    def report(self, paths):
+        print(f"\n=== Profile ({self.mode}, {self.wall:.1f}s) ===")
+        summary = span_summary()
+        if summary:
+            print(format_span_summary(summary, self.wall))
+        if self.mode == "sample":
+            print(f"{self.stacks.samples} stack samples every {self.interval * 1000:.0f}ms")
+        elif self.mode == "deterministic":
+            print(f"{self.stacks.events} calls and returns traced")
+        elif self.mode == "memory":
+            print(self.memory.format())
+        for path in paths:
+            print(f"✓ {path}")
+
+
+def take_profile_spec(argv=None):
+    """
+    The profiling spec for this run, if any: from a --profile[=SPEC]
+    argument (removed from `argv`, so the script's own argument parsing
+    never sees it) or else the TEST_PROFILE environment variable. A bare
+    --profile means "sample".
+    """
+    argv = sys.argv if argv is None else argv
+    for i, arg in enumerate(argv[1:], 1):
+        if arg == "--profile":
+            del argv[i]
+            if i < len(argv) and not argv[i].startswith("-") and argv[i].split(",")[0] in MODES:
+                return argv.pop(i)
+            return "sample"
+        if arg.startswith("--profile="):
+            del argv[i]
+            return arg.split("=", 1)[1]
+    return os.environ.get(ENV_VAR) or None
+
+
+def profiled(main, name=None):
+    """
+    Run an entry point's main(), under the profiler if one was asked for
+    (see take_profile_spec); returns what main() returns. Results are
+    written however main() ends, including Ctrl-C and sys.exit().
+    """
+    spec = take_profile_spec()
+    if spec is None:
+        return main()
+    name = name or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    profiler = Profiler.from_spec(spec, name)
+    profiler.start()
+    try:
+        return main()
+    finally:
+        profiler.stop()
+        profiler.report(profiler.write())
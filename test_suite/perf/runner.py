@@ -0,0 +1,337 @@
+import io
+import json
+import platform
+import sys
+import threading
+import time
+
+
+def read_status_kib(field):
+    """A memory figure (VmRSS, VmHWM, ...) of this process from /proc, in KiB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """
+    Reset this process's peak RSS (VmHWM) to its current RSS; returns False
+    where the kernel doesn't allow it, in which case VmHWM stays the peak
+    since the process started.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class Test:
+    """
+    A test function and how it may be scheduled: `interactive` tests wait
+    for the operator and run on the main thread, one at a time; tests that
+    name the same `resources` (display, camera, buttons, ...) never run at
+    the same time.
+    """
+    def __init__(self, func, interactive=False, resources=(), name=None):
+        self.func = func
+        self.interactive = interactive
+        self.resources = frozenset(resources)
+        self.name = name or func.__name__
+
+
+class _ThreadOutput:
+    """
+    Stand-in for sys.stdout that holds back what background tests print, so
+    their output comes out in one piece when each finishes instead of
+    interleaved with the prompts of the test the operator is following.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self._buffers = {}
+
+
+    def capture(self):
+        self._buffers[threading.get_ident()] = io.StringIO()
+
+
+    def release(self):
+        return self._buffers.pop(threading.get_ident()).getvalue()
+
+
+    def write(self, text):
+        buffer = self._buffers.get(threading.get_ident())
+        return (buffer or self.stream).write(text)
+
+
+    def flush(self):
+        self.stream.flush()
+
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class TestRunner:
+    """
+    Runs a list of Tests and records for each one whether it passed, its
+    wall time, CPU time and peak RSS (VmHWM, reset before each test).
+
+    With `concurrent`, tests that don't wait for input run on a background
+    thread while interactive ones wait for the operator. Order still holds
+    where it matters: before an interactive test, the tests listed ahead of
+    it that share one of its resources run first. Per-test CPU time
+    is process CPU when the test ran alone and its own thread's CPU when it
+    overlapped another test; peak RSS is only attributable to one test
+    when it ran alone, so overlapping tests are listed in each result.
+    """
+    def __init__(self, title, tests, concurrent=True):
+        self.title = title
+        self.tests = list(tests)
+        self.concurrent = concurrent
+        self.results = {}
+        self._held = set()
+        self._active = {}
+        self._lock = threading.Condition()
+        self._print_lock = threading.Lock()
+        self._output = None
+
+
+    def _acquire(self, test):
+        with self._lock:
+            while test.resources & self._held:
+                self._lock.wait()
+            self._held |= test.resources
+
+
+    def _release(self, test):
+        with self._lock:
+            self._held -= test.resources
+            self._lock.notify_all()
+
+
+    def _run_one(self, test):
+        self._acquire(test)
+        try:
+            with self._lock:
+                peak_reset = reset_peak_rss() if not self._active else False
+                overlapped = set(self._active)
+                for others in self._active.values():
+                    others.add(test.name)
+                self._active[test.name] = overlapped
+
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            thread_start = time.thread_time()
+            error = None
+            try:
+                passed = bool(test.func())
+            except Exception as e:
+                print(f"✗ {test.name} raised {e!r}")
+                passed = False
+                error = repr(e)
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            thread_cpu = time.thread_time() - thread_start
+
+            with self._lock:
+                del self._active[test.name]
+                peak = read_status_kib("VmHWM")
+        finally:
+            self._release(test)
+
+        self.results[test.name] = {
+            "name": test.name,
+            "passed": passed,
+            "interactive": test.interactive,
+            "wall": wall,
+            "cpu": thread_cpu if overlapped else cpu,
+            "cpu_scope": "thread" if overlapped else "process",
+            "peak_rss_kib": peak,
+            # Only then is the peak this test's own
+            "peak_rss_alone": peak_reset and not overlapped,
+            "overlapped": sorted(overlapped),
+            "error": error,
+        }
+
+
+    def _next_runnable(self, pending):
+        """
+        Take the first pending test whose resources are free, waiting until
+        there is one; None once nothing is pending
+        """
+        with self._lock:
+            while pending:
+                for test in pending:
+                    if not test.resources & self._held:
+                        pending.remove(test)
+                        return test
+                self._lock.wait()
+            return None
+
+
+    def _take_earlier(self, pending, test):
+        """Take the pending tests listed before `test` that share a resource with it"""
+        with self._lock:
+            position = self.tests.index(test)
+            earlier = [t for t in pending if self.tests.index(t) < position and t.resources & test.resources]
+            for t in earlier:
+                pending.remove(t)
+            self._lock.notify_all()
+            return earlier
+
+
+    def _background(self, pending):
+        while True:
+            # A test held up by the interactive one doesn't hold up the rest
+            test = self._next_runnable(pending)
+            if test is None:
+                break
+            self._output.capture()
+            try:
+                self._run_one(test)
+            finally:
+                text = self._output.release()
+            with self._print_lock:
+                self._output.stream.write(f"--- {test.name} (ran in the background) ---\n{text}\n")
+
+
+    def run(self):
+        started = time.time()
+        wall_start = time.perf_counter()
+        interactive = [t for t in self.tests if t.interactive]
+        background = [t for t in self.tests if not t.interactive]
+
+        if self.concurrent and interactive and background:
+            self._output = _ThreadOutput(sys.stdout)
+            sys.stdout = self._output
+            worker = threading.Thread(target=self._background, args=(background,), name="test-runner", daemon=True)
+            try:
+                worker.start()
+                for test in interactive:
+                    for earlier in self._take_earlier(background, test):
+                        self._run_one(earlier)
+                        print()
+                    self._run_one(test)
+                    print()
+                worker.join()
+            finally:
+                sys.stdout = self._output.stream
+        else:
+            for test in self.tests:
+                self._run_one(test)
+                print()
+
+        results = [self.results[t.name] for t in self.tests if t.name in self.results]
+        return {
+            "title": self.title,
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "concurrent": self.concurrent,
+            "wall": time.perf_counter() - wall_start,
+            "passed": sum(r["passed"] for r in results),
+            "total": len(results),
+            "tests": results,
+        }
+
+
+def run_tests(title, tests, concurrent=True):
+    """Run `tests` (Tests or plain functions) and return the results report"""
+    tests = [t if isinstance(t, Test) else Test(t) for t in tests]
+    return TestRunner(title, tests, concurrent).run()
+
+
+def compare(report, baseline, tolerance, min_time=0.05, min_rss_kib=512):
+    """
+    List regressions of `report` against an earlier run: tests that used
+    to pass and now fail, and CPU time, wall time (not for interactive
+    tests, where it's the operator's) or peak RSS more than `tolerance`
+    above the baseline. Differences under `min_time` seconds or
+    `min_rss_kib` are noise and not reported.
+    """
+    previous = {t["name"]: t for t in baseline.get("tests", [])}
+    regressions = []
+    for current in report["tests"]:
+        before = previous.get(current["name"])
+        if before is None:
+            continue
+        name = current["name"]
+        if before["passed"] and not current["passed"]:
+            regressions.append(f"{name}: now fails")
+            continue
+        if not current["passed"]:
+            continue
+        checks = [("CPU time", "cpu")]
+        if not current["interactive"]:
+            checks.append(("wall time", "wall"))
+        for label, key in checks:
+            if current[key] > before[key] * (1 + tolerance) and current[key] - before[key] > min_time:
+                regressions.append(f"{name}: {label} {before[key] * 1000:.0f}ms -> {current[key] * 1000:.0f}ms")
+        if (current["peak_rss_alone"] and before["peak_rss_alone"]
+                and current["peak_rss_kib"] > before["peak_rss_kib"] * (1 + tolerance)
+                and current["peak_rss_kib"] - before["peak_rss_kib"] > min_rss_kib):
+            regressions.append(f"{name}: peak RSS {before['peak_rss_kib']}KiB -> {current['peak_rss_kib']}KiB")
+    return regressions
+
+
+def format_results(report):
+    lines = [f"{'test':<36}{'result':>8}{'wall':>10}{'cpu':>10}{'peak RSS':>12}"]
+    for r in report["tests"]:
+        rss = f"{r['peak_rss_kib'] / 1024:.1f}MiB" if r["peak_rss_kib"] is not None else "-"
+        # Marked where the figure isn't this test's alone
+        cpu_mark = "*" if r["cpu_scope"] == "thread" else " "
+        rss_mark = " " if r["peak_rss_alone"] else "*"
+        lines.append(f"{r['name']:<36}{'✓' if r['passed'] else '✗':>8}{r['wall']:>9.2f}s"
+                     f"{r['cpu']:>8.2f}s{cpu_mark}{rss:>11}{rss_mark}")
+    if any(not r["peak_rss_alone"] for r in report["tests"]):
+        lines.append("* not this test's alone: CPU of its own thread while another test ran, "
+                     "peak RSS shared with other tests or since startup")
+    return "\n".join(lines)
+
+
+def add_runner_arguments(parser):
+    parser.add_argument('--json', '-o', type=str, default=None,
+                       help='Write per-test results as JSON to this file')
+    parser.add_argument('--baseline', '-b', type=str, default=None,
+                       help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                       help='Allowed increase in time or memory over the baseline (default: 0.2)')
+    parser.add_argument('--serial', action='store_true',
+                       help="Run every test in order, don't run tests while interactive ones wait")
+
+
+def finish(report, args):
+    """Print the results, write/compare JSON as asked on the command line; returns the exit code"""
+    print("=== Test Results ===")
+    print(format_results(report))
+    print(f"\nPassed: {report['passed']}/{report['total']} in {report['wall']:.1f}s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.json}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        print(f"\n=== Comparison with {args.baseline} ===")
+        for r in regressions:
+            print(f"✗ {r}")
+        if not regressions:
+            print("✓ No regressions")
+
+    if report["passed"] == report["total"] and not regressions:
+        print("✓ All tests passed!")
+        return 0
+    print("✗ Some tests failed!" if report["passed"] != report["total"] else "✗ Performance regressed!")
+    return 1
@@ -0,0 +1,47 @@
+def percentile(values, pct):
+    """
+    Linear-interpolated percentile of a list of numbers.
+
+    Args:
+    values (list): Samples, in any order
+    pct (float): Percentile in the range 0-100
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return float(ordered[0])
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values):
+    """Count, mean, min, max and the usual percentiles of a list of samples"""
+    if not values:
+        return {"count": 0, "mean": 0.0, "min": 0.0, "p50": 0.0, "p90": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "min": min(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def format_summary(name, values, unit="ms", scale=1000.0):
+    """
+    One-line human readable summary of timing samples.
+
+    Samples are in seconds; `scale` converts them to `unit` for display.
+    """
+    s = summarize(values)
+    if not s["count"]:
+        return f"{name}: no samples"
+    return (f"{name}: n={s['count']} mean={s['mean'] * scale:.2f}{unit} "
+            f"p50={s['p50'] * scale:.2f}{unit} p95={s['p95'] * scale:.2f}{unit} "
+            f"max={s['max'] * scale:.2f}{unit}")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+import json
+import argparse
+import threading
+import subprocess
+
+from capture.preview import PreviewPipeline
+from capture.v4l2 import parse_resolution
+from capture.virtual import VirtualCamera
+from imaging.nv12 import NV12ToRGB565, nv12_frame_size
+from imaging.remap import FIT_MODES, ROTATIONS, RemapTable
+from perf.memory import LOW_MEMORY_ENV_VAR, format_kib, low_memory_requested, peak_rss_kib
+from perf.runner import read_status_kib, reset_peak_rss
+from perf.metrics import ENV_VAR as METRICS_ENV_VAR, export_metrics
+from perf.profiling import ENV_VAR as PROFILE_ENV_VAR, profiled
+from perf.stats import format_summary
+
+try:
+    from qr.scanner import QRScanner
+    from qr.worker import QRDecodeWorker
+except ImportError as e:
+    # pyzbar or the zbar library isn't installed on this host
+    QRScanner = None
+    QR_IMPORT_ERROR = e
+
+
+# Sensor modes the remap check covers: QCIF, CIF, QVGA, VGA and the panel-sized preview
+CHECK_SIZES = ((176, 144), (352, 288), (320, 240), (640, 480), (240, 135))
+
+DEFAULT_SOURCE = "synthetic,qr=" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-qrcode.png")
+
+
+class NullPanel:
+    """Display sink that only accounts for what a panel write would cost"""
+    def __init__(self, write_time=0.0):
+        self.write_time = write_time
+        self.frames = 0
+
+
+    def show(self, buffer):
+        if self.write_time:
+            time.sleep(self.write_time)
+        self.frames += 1
+
+
+def decode_loop(ring, decode, running, timings):
+    """QR decoding as a second consumer of the preview's frame ring"""
+    last_seq = 0
+    while running.is_set():
+        frame = ring.acquire(after_seq=last_seq, timeout=0.5)
+        if frame is None:
+            continue
+        with frame:
+            last_seq = frame.seq
+            start = time.perf_counter()
+            decode(frame)
+            timings.append(time.perf_counter() - start)
+
+def check_remap(panel_width, panel_height):
+    """Map a frame of every common camera size through every fit mode and rotation"""
+    failures = 0
+    for width, height in CHECK_SIZES:
+        frames = {"nv12": bytes(nv12_frame_size(width, height)), "rgb": bytes(width * height * 3)}
+        for fit in FIT_MODES:
+            for rotation in ROTATIONS:
+                for layout, frame in frames.items():
+                    try:
+                        table = RemapTable(width, height, panel_width, panel_height,
+                                           rotation=rotation, fit=fit, layout=layout)
+                        size = table.apply(frame).size
+                        error = None if size == table.content_size else f"got {size}, expected {table.content_size}"
+                    except ValueError as e:
+                        error = str(e)
+                    if error:
+                        print(f"✗ {width}x{height} {layout} fit={fit} rotation={rotation}: {error}")
+                        failures += 1
+    if not failures:
+        print(f"✓ {len(CHECK_SIZES)} camera sizes map to {panel_width}x{panel_height} "
+              f"in every fit mode and rotation")
+    return 1 if failures else 0
+
+def compare_memory(argv):
+    """Run the benchmark once per display path, each in a fresh interpreter so the peaks are its own"""
+    argv = [a for a in argv if a not in ("--compare-memory", "--low-memory")]
+    # The runs must not print a profile after their result line, take over
+    # this run's metrics target or pick their display path from the environment
+    env = {k: v for k, v in os.environ.items()
+           if k not in (PROFILE_ENV_VAR, METRICS_ENV_VAR, LOW_MEMORY_ENV_VAR)}
+    results = []
+    for low_memory in (False, True):
+        command = [sys.executable, os.path.abspath(__file__)] + argv + ["--measure"]
+        if low_memory:
+            command.append("--low-memory")
+        output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+    print(f"{'display path':<14}{'fps':>8}{'convert p50':>14}{'peak RSS':>12}{'growth':>10}")
+    for r in results:
+        print(f"{r['mode']:<14}{r['fps']:>8.1f}{r['convert_p50'] * 1000:>12.2f}ms"
+              f"{format_kib(r['peak_rss_kib']):>12}{format_kib(r['growth_kib']):>10}")
+    print("(growth: peak RSS while running above the RSS once set up)")
+    saved = results[0]["growth_kib"] - results[1]["growth_kib"]
+    print(f"✓ The low-memory path peaks {format_kib(saved)} lower" if saved > 0
+          else "✗ The low-memory path doesn't lower the peak RSS")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the camera -> convert -> display/decode pipeline on a virtual camera')
+    parser.add_argument('--source', '-s', type=str, default=os.environ.get("VIRTUAL_CAMERA", DEFAULT_SOURCE),
+                       help='Virtual camera spec: synthetic[,qr=IMAGE], a .nv12log or a .yuv recording, '
+                            'with ,fps= ,jitter= ,drop= ,drop_every= options (default: synthetic with test-qrcode.png)')
+    parser.add_argument('--duration', '-d', type=float, default=10,
+                       help='How long to run in seconds (default: 10)')
+    parser.add_argument('--panel', type=str, default='240x240',
+                       help='Display resolution (default: 240x240)')
+    parser.add_argument('--rotation', type=int, choices=[0, 90, 180, 270], default=0,
+                       help='Camera rotation (default: 0)')
+    parser.add_argument('--write-ms', type=float, default=0.0,
+                       help='Simulated panel write time per frame in ms (default: 0)')
+    parser.add_argument('--no-decode', action='store_true',
+                       help='Only run the display path')
+    parser.add_argument('--worker', action='store_true',
+                       help='Decode in a separate process instead of a thread')
+    parser.add_argument('--low-memory', action='store_true', default=low_memory_requested(),
+                       help='Convert into a fixed set of preallocated buffers (default: set by TEST_LOW_MEMORY)')
+    parser.add_argument('--compare-memory', action='store_true',
+                       help='Run the normal and the low-memory path one after the other and compare peak RSS')
+    parser.add_argument('--check-remap', action='store_true',
+                       help='Only check that the common camera sizes map onto the panel in every fit mode and rotation')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.compare_memory:
+        return compare_memory(sys.argv[1:])
+    panel_width, panel_height = parse_resolution(args.panel)
+    if args.check_remap:
+        return check_remap(panel_width, panel_height)
+
+    print("=== Virtual Camera Pipeline Benchmark ===\n")
+    camera = VirtualCamera.from_spec(args.source)
+    print(f"Source: {camera.device} {camera.width}x{camera.height} at {camera.fps:.0f} fps "
+          f"(jitter {camera.jitter * 1000:.1f}ms, drop {camera.drop * 100:.0f}%"
+          f"{f', every {camera.drop_every}th' if camera.drop_every else ''})")
+
+    converter = NV12ToRGB565(camera.width, camera.height, panel_width, panel_height,
+                             stride=camera.stride, rotation=args.rotation)
+    panel = NullPanel(args.write_ms / 1000)
+    if args.low_memory:
+        pipeline = PreviewPipeline(camera, converter.convert_into, panel.show, output_size=converter.output_size)
+    else:
+        pipeline = PreviewPipeline(camera, converter.convert, panel.show)
+
+    decode_timings = []
+    decoder = None
+    running = threading.Event()
+    scanner = None
+    worker = None
+    if args.no_decode:
+        pass
+    elif QRScanner is None:
+        print(f"✗ QR decoding skipped: {QR_IMPORT_ERROR}")
+    else:
+        if args.worker:
+            # Timings are then only the cost of handing a frame over
+            worker = QRDecodeWorker(camera.width, camera.height, camera.stride)
+            decode = lambda frame: worker.submit(frame.data, frame.timestamp)
+        else:
+            scanner = QRScanner(camera.width, camera.height, camera.stride)
+            decode = lambda frame: scanner.scan(frame.data)
+        running.set()
+        decoder = threading.Thread(target=decode_loop, args=(pipeline.ring, decode, running, decode_timings),
+                                   name="qr-decode", daemon=True)
+
+    # Everything up to here is startup; the peak from now on is the pipeline's
+    rss_start = read_status_kib("VmRSS")
+    reset_peak_rss()
+    camera.start()
+    try:
+        if decoder is not None:
+            decoder.start()
+        pipeline.run(args.duration)
+    finally:
+        running.clear()
+        if decoder is not None:
+            decoder.join(2)
+        if worker is not None:
+            worker.close()
+        camera.stop()
+
+    peak = peak_rss_kib()
+    if args.measure:
+        results = pipeline.results()
+        print(json.dumps({"mode": "low-memory" if args.low_memory else "normal", "fps": results["fps"],
+                          "convert_p50": results["convert"]["p50"], "peak_rss_kib": peak,
+                          "growth_kib": peak - rss_start}))
+        return 1 if pipeline.error else 0
+
+    print()
+    pipeline.report()
+    print(f"  display path: {'low-memory' if args.low_memory else 'normal'}, "
+          f"peak RSS {format_kib(peak)} ({format_kib(peak - rss_start)} above the RSS at start)")
+    stats = camera.stats()
+    print(f"  source: delivered={stats['delivered']} dropped={stats['dropped']} overruns={stats['overruns']}")
+    if scanner is not None:
+        print()
+        print(format_summary("QR scan", decode_timings))
+        scanner.report()
+    if worker is not None:
+        print()
+        print(format_summary("QR submit", decode_timings))
+        worker.report()
+
+    if pipeline.error:
+        print(f"\n✗ Pipeline stopped early: {pipeline.error}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    with export_metrics():
+        sys.exit(profiled(main))
@@ -0,0 +1,167 @@
+import random
+
+import qrcode
+from PIL import Image, ImageChops, ImageFilter
+
+from imaging.nv12 import rgb_to_nv12
+
+
+ECC_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+# Byte-mode capacity of the versions used, per ECC level, so payloads are
+# sized to fill each symbol
+CAPACITY = {
+    2: {"L": 32, "M": 26, "Q": 20, "H": 14},
+    5: {"L": 106, "M": 84, "Q": 60, "H": 44},
+    10: {"L": 271, "M": 213, "Q": 151, "H": 119},
+    15: {"L": 520, "M": 412, "Q": 292, "H": 220},
+}
+
+DEFAULT_VERSIONS = (2, 5, 10)
+DEFAULT_ECC = ("L", "M", "H")
+
+# Distortions applied on top of the clean symbols, at camera resolution
+DISTORTIONS = ("clean", "blur", "noise", "rotate", "perspective", "low-contrast")
+
+
+class CorpusCase:
+    """
+    One benchmark case: the NV12 frames shown to the decoder and the payload
+    each one should decode to. Multi-part cases have one frame per part and
+    only succeed when every part decodes.
+    """
+    def __init__(self, name, params, frames, payloads):
+        self.name = name
+        self.params = params
+        self.frames = frames
+        self.payloads = payloads
+
+
+def make_payload(length, rng):
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    return "".join(rng.choice(alphabet) for _ in range(length)).encode()
+
+
+def render_qr(payload, version=None, ecc="M"):
+    """Black on white QR symbol with a 4 module quiet zone, one pixel per module"""
+    qr = qrcode.QRCode(version=version, error_correction=ECC_LEVELS[ecc], box_size=1, border=4)
+    qr.add_data(payload)
+    qr.make(fit=version is None)
+    return qr.make_image(fill_color="black", back_color="white").convert("RGB")
+
+
+def place(symbol, width, height, fill=0.8, background=(200, 200, 200)):
+    """Scale a symbol up to `fill` of the short side of a camera-sized canvas"""
+    canvas = Image.new("RGB", (width, height), background)
+    side = int(min(width, height) * fill)
+    canvas.paste(symbol.resize((side, side), Image.NEAREST), ((width - side) // 2, (height - side) // 2))
+    return canvas
+
+
+def perspective_coeffs(src, dst):
+    """
+    Coefficients for Image.transform(PERSPECTIVE) mapping the output quad
+    `dst` onto the input quad `src`, solved with plain Gaussian elimination.
+    """
+    rows = []
+    for (x, y), (u, v) in zip(dst, src):
+        rows.append([x, y, 1, 0, 0, 0, -u * x, -u * y, u])
+        rows.append([0, 0, 0, x, y, 1, -v * x, -v * y, v])
+    n = 8
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(n):
+            if r != col:
+                f = rows[r][col] / rows[col][col]
+                rows[r] = [a - f * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] for i in range(n)]
+
+
+def distort(image, kind, rng):
+    width, height = image.size
+    if kind == "clean":
+        return image
+    if kind == "blur":
+        return image.filter(ImageFilter.GaussianBlur(1.2))
+    if kind == "noise":
+        # Drawn from `rng` rather than Image.effect_noise so the corpus is reproducible
+        samples = bytes(max(0, min(255, int(rng.gauss(128, 24)))) for _ in range(width * height))
+        noise = Image.frombytes("L", (width, height), samples).convert("RGB")
+        return ImageChops.add(image, noise, offset=-128)
+    if kind == "rotate":
+        return image.rotate(rng.uniform(10, 30), resample=Image.BILINEAR, fillcolor=(200, 200, 200))
+    if kind == "perspective":
+        # Pull the top edge in, as when the code is tilted away from the camera
+        inset = width * 0.12
+        corners = [(0, 0), (width, 0), (width, height), (0, height)]
+        tilted = [(inset, height * 0.05), (width - inset, height * 0.05), (width, height), (0, height)]
+        return image.transform(image.size, Image.PERSPECTIVE, perspective_coeffs(corners, tilted),
+                               Image.BILINEAR, fillcolor=(200, 200, 200))
+    if kind == "low-contrast":
+        # Squeeze the full range into 40 levels around mid gray
+        return image.point(lambda v: 100 + v * 40 // 255)
+    raise ValueError(f"Unknown distortion: {kind}")
+
+
+def build_corpus(width, height, versions=DEFAULT_VERSIONS, ecc_levels=DEFAULT_ECC, distortions=DISTORTIONS,
+                 multipart=(3,), seed=1):
+    """
+    Generate the benchmark corpus at camera resolution. The same seed
+    always produces the same frames, so results can be compared run to run.
+    """
+    rng = random.Random(seed)
+    cases = []
+    for version in versions:
+        for ecc in ecc_levels:
+            payload = make_payload(CAPACITY[version][ecc], rng)
+            symbol = render_qr(payload, version, ecc)
+            for kind in distortions:
+                frame = rgb_to_nv12(distort(place(symbol, width, height), kind, rng))
+                cases.append(CorpusCase(
+                    f"v{version}-{ecc}-{kind}",
+                    {"version": version, "ecc": ecc, "distortion": kind, "parts": 1},
+                    [frame], [payload],
+                ))
+
+    # Multi-part sequences in the "pNofM " style of animated QR exports
+    for parts in multipart:
+        payloads = [f"p{i + 1}of{parts} ".encode() + make_payload(60, rng) for i in range(parts)]
+        frames = [rgb_to_nv12(place(render_qr(p, ecc="M"), width, height)) for p in payloads]
+        cases.append(CorpusCase(
+            f"multipart-{parts}",
+            {"version": None, "ecc": "M", "distortion": "clean", "parts": parts},
+            frames, payloads,
+        ))
+    return cases
+
+
+# Horizontal smear, as when the camera is panned during the exposure
+MOTION_BLUR = ImageFilter.Kernel((5, 5), [0] * 10 + [1] * 5 + [0] * 10, scale=5)
+
+
+def motion_sequence(width, height, count=30, sharp_fraction=0.3, seed=1):
+    """
+    A handheld-style sequence of one code: most frames carry a random amount
+    of motion blur and only about `sharp_fraction` of them are in focus.
+    """
+    rng = random.Random(seed)
+    payload = make_payload(CAPACITY[5]["M"], rng)
+    symbol = render_qr(payload, 5, "M")
+    frames = []
+    for _ in range(count):
+        image = place(symbol, width, height)
+        if rng.random() >= sharp_fraction:
+            for _ in range(rng.randint(1, 4)):
+                image = image.filter(MOTION_BLUR)
+        frames.append(rgb_to_nv12(image))
+    return CorpusCase(
+        "motion",
+        {"version": 5, "ecc": "M", "distortion": "motion", "parts": 1, "frames": count},
+        frames, [payload] * count,
+    )
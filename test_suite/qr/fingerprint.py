@@ -0,0 +1,111 @@
+import time
+from collections import deque
+
+from PIL import Image
+
+from qr.luma import luma_image
+
+
+class LumaFingerprinter:
+    """
+    Cheap fingerprint of a frame's luma: the mean brightness of each cell of
+    a `grid` x `grid` block grid, as `grid`**2 bytes.
+
+    It is meant to run on the capture thread for every frame (see the
+    `analyze` hook of CaptureProducer); a 16x16 grid over a 240x240 frame is
+    a single box-filter resize in Pillow.
+    """
+    def __init__(self, width, height, stride=None, grid=16):
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+        self.grid = grid
+
+
+    def __call__(self, frame_data):
+        image = luma_image(frame_data, self.width, self.height, self.stride)
+        return image.resize((self.grid, self.grid), Image.BOX).tobytes()
+
+
+def fingerprint_delta(a, b):
+    """(mean, max) absolute difference between two fingerprints' blocks"""
+    diffs = [abs(x - y) for x, y in zip(a, b)]
+    return sum(diffs) / len(diffs), max(diffs)
+
+
+class DedupDecoder:
+    """
+    Wraps a decode function so near-identical frames are decoded only once.
+
+    The fingerprints of the last `history` decoded frames are kept with
+    their results. A frame whose fingerprint is within `tolerance` (mean
+    block difference) and `max_delta` (largest single block difference) of
+    one of them gets that cached result back instead of a decode. The max
+    check keeps a change in one part of the view, like the next frame of an
+    animated QR, from being averaged away. Entries older than `max_age`
+    seconds are dropped so a static scene that failed to decode is retried
+    now and then.
+    """
+    def __init__(self, decode, tolerance=3.0, max_delta=24, history=8, max_age=1.0, clock=time.monotonic):
+        self.decode = decode
+        self.tolerance = tolerance
+        self.max_delta = max_delta
+        self.max_age = max_age
+        self.clock = clock
+        # (fingerprint, results, decode time, decoded at), newest first
+        self._recent = deque(maxlen=history)
+
+        self.frames = 0
+        self.decoded = 0
+        self.skipped = 0
+        self.decode_time = 0.0
+        self.saved_time = 0.0
+
+
+    def _match(self, fingerprint, now):
+        while self._recent and now - self._recent[-1][3] > self.max_age:
+            self._recent.pop()
+        for entry in self._recent:
+            mean, peak = fingerprint_delta(fingerprint, entry[0])
+            if mean <= self.tolerance and peak <= self.max_delta:
+                return entry
+        return None
+
+
+    def __call__(self, frame_data, fingerprint):
+        """Decode `frame_data` unless a recent frame had a matching fingerprint"""
+        self.frames += 1
+        now = self.clock()
+        entry = self._match(fingerprint, now)
+        if entry is not None:
+            self.skipped += 1
+            self.saved_time += entry[2]
+            return entry[1]
+
+        results = self.decode(frame_data)
+        elapsed = self.clock() - now
+        self.decoded += 1
+        self.decode_time += elapsed
+        self._recent.appendleft((fingerprint, results, elapsed, now))
+        return results
+
+
+    def clear(self):
+        self._recent.clear()
+
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "decoded": self.decoded,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.frames if self.frames else 0.0,
+            "decode_time": self.decode_time,
+            "saved_time": self.saved_time,
+        }
+
+
+    def report(self):
+        s = self.stats()
+        print(f"Duplicate frames skipped: {s['skipped']}/{s['frames']} ({s['skip_rate'] * 100:.1f}%), "
+              f"saved ~{s['saved_time'] * 1000:.0f}ms of {s['decode_time'] * 1000:.0f}ms decoding")
@@ -0,0 +1,49 @@
+from PIL import Image
+from pyzbar.pyzbar import ZBarSymbol, decode
+
+from perf.profiling import span
+
+
+QR_ONLY = [ZBarSymbol.QRCODE]
+
+
+def luma_plane(frame_data, width, height, stride=None):
+    """Zero-copy view of the Y plane at the start of an NV12 frame"""
+    stride = stride or width
+    return memoryview(frame_data)[:stride * height]
+
+
+def luma_image(frame_data, width, height, stride=None):
+    """
+    Wrap the Y plane of an NV12 frame as an "L" mode PIL image.
+
+    Image.frombuffer shares memory with `frame_data`, so no pixels are
+    copied; row padding is skipped through the stride argument.
+    """
+    stride = stride or width
+    return Image.frombuffer("L", (width, height), frame_data, "raw", "L", stride, 1)
+
+
+def decode_luma(luma, width, height, stride=None, symbols=QR_ONLY):
+    """
+    Decode QR codes directly from 8-bit luma bytes.
+
+    pyzbar takes a (pixels, width, height) tuple as grayscale as-is, which
+    avoids the RGB->L conversion and tobytes() copy of the PIL image path.
+    Row padding is harmless to the decoder, so a strided plane is passed
+    with the stride as its width.
+    """
+    stride = stride or width
+    if not isinstance(luma, bytes):
+        # ctypes needs a real bytes object to hand the pointer to zbar
+        luma = bytes(luma[:stride * height])
+    elif len(luma) != stride * height:
+        luma = luma[:stride * height]
+    with span("qr-decode"):
+        return decode((luma, stride, height), symbols=symbols)
+
+
+def decode_image(image, symbols=QR_ONLY):
+    """Decode QR codes from a PIL image of any mode (the RGB path)"""
+    with span("qr-decode"):
+        return decode(image, symbols=symbols)
@@ -0,0 +1,167 @@
+import time
+
+from qr.luma import QR_ONLY, decode_luma, luma_image
+
+
+class QRScanner:
+    """
+    QR scan engine for a stream of luma frames.
+
+    Without a known code position each frame goes through a downscale
+    pyramid: `pyramid` lists integer reduction factors tried in order, so the
+    default (4, 2, 1) tries a quarter-size image first and only falls back
+    to full resolution when the smaller levels find nothing. Once a code has
+    been found, its bounding box (padded by `roi_padding` times its size on
+    every side) is the only area decoded on the following frames, at full
+    resolution. After `max_misses` frames in a row without a decode in the
+    ROI, the engine goes back to full-frame scans.
+
+    Decoded results are returned with their rect and polygon in full-frame
+    coordinates, whichever level produced them.
+    """
+    def __init__(self, width, height, stride=None, pyramid=(4, 2, 1), roi_padding=0.25, max_misses=3,
+                 symbols=QR_ONLY, clock=time.monotonic):
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+        self.pyramid = pyramid
+        self.roi_padding = roi_padding
+        self.max_misses = max_misses
+        self.symbols = symbols
+        self.clock = clock
+        self.roi = None
+        self.misses = 0
+
+        self.frames = 0
+        self.successes = 0
+        self.attempts = 0
+        self.decode_time = 0.0
+        # Successful decodes by where they came from: "roi" or "1/N"
+        self.hits = {}
+        self.roi_resets = 0
+        self._first_scan = None
+        self._last_scan = None
+
+
+    def reset(self):
+        """Forget the tracked code, e.g. when the camera is restarted"""
+        self.roi = None
+        self.misses = 0
+
+
+    def _decode(self, data, width, height, stride=None):
+        start = self.clock()
+        results = decode_luma(data, width, height, stride, symbols=self.symbols)
+        self.decode_time += self.clock() - start
+        self.attempts += 1
+        return results
+
+
+    def _scan_roi(self, frame_data):
+        left, top, right, bottom = self.roi
+        width, height = right - left, bottom - top
+        crop = luma_image(frame_data, self.width, self.height, self.stride).crop(self.roi)
+        return [translate(r, left, top) for r in self._decode(crop.tobytes(), width, height)]
+
+
+    def _scan_pyramid(self, frame_data):
+        image = None
+        for factor in self.pyramid:
+            if factor == 1:
+                results = self._decode(frame_data, self.width, self.height, self.stride)
+            else:
+                if image is None:
+                    image = luma_image(frame_data, self.width, self.height, self.stride)
+                level = image.reduce(factor)
+                results = [scale(r, factor) for r in self._decode(level.tobytes(), *level.size)]
+            if results:
+                return results, f"1/{factor}"
+        return [], None
+
+
+    def _track(self, results):
+        """Pad the union of the decoded codes' boxes into the next ROI"""
+        left = min(r.rect.left for r in results)
+        top = min(r.rect.top for r in results)
+        right = max(r.rect.left + r.rect.width for r in results)
+        bottom = max(r.rect.top + r.rect.height for r in results)
+        # zbar needs a quiet zone around the code, so never pad by less than 8px
+        pad = max(8, int(max(right - left, bottom - top) * self.roi_padding))
+        self.roi = (
+            max(0, left - pad),
+            max(0, top - pad),
+            min(self.width, right + pad),
+            min(self.height, bottom + pad),
+        )
+
+
+    def scan(self, frame_data):
+        """
+        Scan one frame (an NV12 frame or just its Y plane) and return the
+        decoded codes, if any.
+        """
+        now = self.clock()
+        if self._first_scan is None:
+            self._first_scan = now
+        self._last_scan = now
+        self.frames += 1
+
+        if self.roi is not None:
+            results = self._scan_roi(frame_data)
+            source = "roi"
+            if not results:
+                self.misses += 1
+                if self.misses < self.max_misses:
+                    return results
+                # The code moved out of the ROI or left the view
+                self.roi = None
+                self.roi_resets += 1
+
+        if self.roi is None:
+            results, source = self._scan_pyramid(frame_data)
+
+        if results:
+            self.misses = 0
+            self.successes += 1
+            self.hits[source] = self.hits.get(source, 0) + 1
+            self._track(results)
+        return results
+
+
+    def stats(self):
+        elapsed = (self._last_scan - self._first_scan) if self._first_scan is not None else 0.0
+        return {
+            "frames": self.frames,
+            "successes": self.successes,
+            "success_rate": self.successes / self.frames if self.frames else 0.0,
+            "attempts": self.attempts,
+            "attempts_per_frame": self.attempts / self.frames if self.frames else 0.0,
+            "attempts_per_second": self.attempts / elapsed if elapsed else 0.0,
+            "mean_decode_ms": self.decode_time / self.attempts * 1000 if self.attempts else 0.0,
+            "hits": dict(self.hits),
+            "roi_resets": self.roi_resets,
+        }
+
+
+    def report(self):
+        s = self.stats()
+        print(f"Scanned {s['frames']} frames: {s['successes']} decoded ({s['success_rate'] * 100:.1f}%)")
+        print(f"  {s['attempts']} decode attempts ({s['attempts_per_frame']:.2f}/frame, "
+              f"{s['attempts_per_second']:.1f}/s), mean {s['mean_decode_ms']:.1f}ms")
+        hits = ", ".join(f"{k}={v}" for k, v in sorted(s["hits"].items())) or "none"
+        print(f"  decoded from: {hits}; ROI dropped {s['roi_resets']} time(s)")
+
+
+def translate(result, dx, dy):
+    """A pyzbar result with its geometry shifted by (dx, dy)"""
+    rect = result.rect._replace(left=result.rect.left + dx, top=result.rect.top + dy)
+    polygon = [p._replace(x=p.x + dx, y=p.y + dy) for p in result.polygon]
+    return result._replace(rect=rect, polygon=polygon)
+
+
+def scale(result, factor):
+    """A pyzbar result found on a reduced image, mapped back to full size"""
+    r = result.rect
+    rect = r._replace(left=r.left * factor, top=r.top * factor, width=r.width * factor, height=r.height * factor)
+    polygon = [p._replace(x=p.x * factor, y=p.y * factor) for p in result.polygon]
+    return result._replace(rect=rect, polygon=polygon)
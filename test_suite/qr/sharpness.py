@@ -0,0 +1,96 @@
+from collections import deque
+
+from PIL import ImageFilter, ImageStat
+
+from perf.stats import percentile
+from qr.luma import luma_image
+
+
+# 4-neighbour Laplacian, offset to mid gray so negative responses survive
+# the 8-bit output of Image.filter
+LAPLACIAN = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128)
+
+SELECT_MODES = ("window", "adaptive")
+
+
+def laplacian_variance(frame_data, width, height, stride=None, step=2):
+    """
+    Focus score of a frame: the variance of the Laplacian of its Y plane,
+    subsampled by `step` first. Sharp edges give a wide spread of responses,
+    motion blur a narrow one. All the per-pixel work is done by Pillow's C
+    filters, so this stays cheap enough to run on every captured frame.
+    """
+    image = luma_image(frame_data, width, height, stride)
+    if step > 1:
+        image = image.reduce(step)
+    return ImageStat.Stat(image.filter(LAPLACIAN)).var[0]
+
+
+class SharpnessScorer:
+    """Per-frame focus scorer for a fixed frame size, usable as an `analyze` hook"""
+    def __init__(self, width, height, stride=None, step=2):
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+        self.step = step
+
+
+    def __call__(self, frame_data):
+        return laplacian_variance(frame_data, self.width, self.height, self.stride, self.step)
+
+
+class SharpnessGate:
+    """
+    Decides which frames are worth decoding, based on their focus scores.
+
+    "window"    a frame is passed on when none of the `window` - 1 frames
+                before it was sharper, so in a run of blurred frames only
+                the local best gets decoded. Nothing is held back or copied.
+    "adaptive"  a frame is passed on at once when its score is at least
+                `ratio` times the 75th percentile of the last `history`
+                scores, so the threshold follows lighting and scene changes.
+
+    In both modes, after `max_skip` rejected frames in a row the next one is
+    passed regardless.
+
+    select() returns True for frames that should be decoded.
+    """
+    def __init__(self, mode="adaptive", window=3, ratio=0.8, history=30, max_skip=10):
+        if mode not in SELECT_MODES:
+            raise ValueError(f"Unsupported selection mode: {mode}")
+        self.mode = mode
+        self.window = window
+        self.ratio = ratio
+        self.max_skip = max_skip
+        self.scores = deque(maxlen=max(history, window))
+        self._skipped_run = 0
+
+        self.frames = 0
+        self.selected = 0
+
+
+    def select(self, score):
+        self.frames += 1
+        self.scores.append(score)
+
+        if self.mode == "window":
+            recent = list(self.scores)[-self.window:]
+            accept = score >= max(recent)
+        else:
+            accept = score >= self.ratio * percentile(list(self.scores), 75)
+
+        if accept or self._skipped_run >= self.max_skip:
+            self._skipped_run = 0
+            self.selected += 1
+            return True
+        self._skipped_run += 1
+        return False
+
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "selected": self.selected,
+            "rejected": self.frames - self.selected,
+            "mean_score": sum(self.scores) / len(self.scores) if self.scores else 0.0,
+        }
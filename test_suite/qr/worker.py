@@ -0,0 +1,287 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+from perf.stats import summarize
+
+
+def _worker_main(shm_name, slot_size, width, height, stride, scanner_options, requests, results, current):
+    from qr.scanner import QRScanner
+
+    # The worker shares the parent's resource tracker, so attaching here
+    # doesn't make the block go away when a hung worker is killed
+    shm = shared_memory.SharedMemory(name=shm_name)
+    scanner = QRScanner(width, height, stride, **scanner_options)
+    luma_size = stride * height
+    try:
+        while True:
+            job = requests.recv()
+            if job is None:
+                break
+            job_id, slot = job
+            # Published for the parent's deadline check; the lock keeps it
+            # from reading a new job id with the old start time
+            with current.get_lock():
+                current[0] = job_id
+                current[1] = time.monotonic()
+            start = time.perf_counter()
+            offset = slot * slot_size
+            try:
+                decoded, error = scanner.scan(bytes(shm.buf[offset:offset + luma_size])), None
+            except Exception as e:
+                decoded, error = [], repr(e)
+            with current.get_lock():
+                current[1] = 0.0
+            results.send((job_id, decoded, time.perf_counter() - start, error, time.process_time()))
+    finally:
+        shm.close()
+
+
+class DecodeResult:
+    """Outcome of one submitted frame, delivered to the `on_result` callback"""
+    def __init__(self, job_id, timestamp, results, decode_time, latency, error=None, timed_out=False):
+        self.job_id = job_id
+        self.timestamp = timestamp
+        self.results = results
+        self.decode_time = decode_time
+        self.latency = latency
+        self.error = error
+        self.timed_out = timed_out
+
+
+class QRDecodeWorker:
+    """
+    QR decoding in a separate, persistent process.
+
+    Luma frames are copied into one of `slots` buffers in a shared memory
+    block and only the slot number crosses the pipe. The worker runs a
+    QRScanner over the frames in order, so ROI tracking still works, and
+    results come back asynchronously through `on_result`, called from a
+    collector thread. submit() never blocks: when every slot is taken the
+    frame is dropped and counted, so a slow decode can't back up capture.
+
+    A frame that takes longer than `deadline` seconds to decode gets the
+    worker killed and restarted; frames that were queued behind it are
+    handed to the new worker. A frame that crashes the worker is reported
+    as an error rather than retried.
+
+    The forkserver start method keeps restarts cheap: the server has
+    already imported pyzbar, and it is forked from a clean process rather
+    than from one with capture threads running.
+    """
+    def __init__(self, width, height, stride=None, slots=3, deadline=1.0, on_result=None, scanner_options=None):
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+        self.luma_size = self.stride * height
+        self.slots = slots
+        self.deadline = deadline
+        self.on_result = on_result
+        self.scanner_options = scanner_options or {}
+
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._ctx.set_forkserver_preload(["qr.luma", "qr.scanner"])
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * self.luma_size)
+        self._current = None
+        self._free = list(range(slots))
+        # job id -> (slot, submitted at, frame timestamp), in submission order
+        self._inflight = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._process = None
+        self._requests = None
+        self._results = None
+        self._closing = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.errors = 0
+        # CPU seconds used by the current worker, and by the ones it replaced
+        self._worker_cpu = 0.0
+        self._retired_cpu = 0.0
+        self.decode_times = deque(maxlen=1000)
+        self.latencies = deque(maxlen=1000)
+        self.queue_depths = deque(maxlen=1000)
+
+        self._start_worker()
+        self._collector = threading.Thread(target=self._collect, name="qr-collector", daemon=True)
+        self._collector.start()
+
+
+    def _start_worker(self):
+        parent_requests, child_requests = self._ctx.Pipe(duplex=False)
+        child_results, parent_results = self._ctx.Pipe(duplex=False)
+        # A fresh one per worker, so a lock held by a killed worker can't
+        # block the next
+        self._current = self._ctx.Array("d", 2)
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._shm.name, self.luma_size, self.width, self.height, self.stride, self.scanner_options,
+                  parent_requests, parent_results, self._current),
+            name="qr-decode-worker",
+            daemon=True,
+        )
+        self._process.start()
+        # Only the worker keeps these ends open, so its death shows up as EOF
+        parent_requests.close()
+        parent_results.close()
+        self._requests = child_requests
+        self._results = child_results
+
+
+    def _restart_worker(self):
+        self._process.kill()
+        self._process.join()
+        self._requests.close()
+        self._results.close()
+        self.restarts += 1
+        self._retired_cpu += self._worker_cpu
+        self._worker_cpu = 0.0
+        self._start_worker()
+        # Frames queued behind the one that hung are still in their slots
+        for job_id, (slot, _, _) in self._inflight.items():
+            self._requests.send((job_id, slot))
+
+
+    def submit(self, luma, timestamp=None):
+        """Queue a Y plane for decoding; returns its job id, or None if it was dropped"""
+        with self._lock:
+            if self._closing:
+                return None
+            self.queue_depths.append(len(self._inflight))
+            if not self._free:
+                self.dropped += 1
+                return None
+            slot = self._free.pop()
+            offset = slot * self.luma_size
+            self._shm.buf[offset:offset + self.luma_size] = luma[:self.luma_size]
+            job_id = self._next_id
+            self._next_id += 1
+            now = time.monotonic()
+            self._inflight[job_id] = (slot, now, now if timestamp is None else timestamp)
+            self.submitted += 1
+            self._requests.send((job_id, slot))
+            return job_id
+
+
+    def _finish(self, job_id, decoded, decode_time, error=None, timed_out=False):
+        slot, submitted_at, timestamp = self._inflight.pop(job_id)
+        self._free.append(slot)
+        latency = time.monotonic() - submitted_at
+        if timed_out:
+            self.timeouts += 1
+        elif error:
+            self.errors += 1
+        else:
+            self.completed += 1
+            self.decode_times.append(decode_time)
+        self.latencies.append(latency)
+        return DecodeResult(job_id, timestamp, decoded, decode_time, latency, error, timed_out)
+
+
+    def _collect(self):
+        stopping = False
+        while True:
+            outcome = None
+            try:
+                message = self._results.recv() if self._results.poll(0.05) else None
+                ended = False
+            except (EOFError, OSError):
+                message = None
+                ended = True
+            with self._lock:
+                if message is not None:
+                    job_id, decoded, decode_time, error, self._worker_cpu = message
+                    if job_id in self._inflight:
+                        outcome = self._finish(job_id, decoded, decode_time, error)
+                else:
+                    with self._current.get_lock():
+                        job_id, started = int(self._current[0]), self._current[1]
+                    running = started and job_id in self._inflight
+                    hung = running and time.monotonic() - started > self.deadline
+                    ended = ended or not (self._process.is_alive() or self._results.poll())
+                    if hung:
+                        outcome = self._finish(job_id, [], time.monotonic() - started, timed_out=True)
+                    elif ended and running:
+                        # Don't hand a frame that crashed the worker to the next one
+                        outcome = self._finish(job_id, [], time.monotonic() - started, error="worker exited")
+                    if hung or ended:
+                        if self._closing:
+                            # The worker was told to exit; whatever is still queued is abandoned
+                            self._process.kill()
+                            stopping = True
+                        else:
+                            self._restart_worker()
+            if outcome is not None and self.on_result is not None:
+                self.on_result(outcome)
+            if stopping:
+                return
+
+
+    @property
+    def cpu_time(self):
+        """CPU seconds spent in worker processes, as of their last result"""
+        return self._retired_cpu + self._worker_cpu
+
+
+    @property
+    def queue_depth(self):
+        with self._lock:
+            return len(self._inflight)
+
+
+    def close(self):
+        """Let the worker finish the frames already queued, then shut it down"""
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+            self._requests.send(None)
+        # Queued frames are each still bound by the deadline
+        self._collector.join(self.deadline * (self.slots + 1))
+        self._process.kill()
+        self._process.join()
+        self._requests.close()
+        self._results.close()
+        self._shm.close()
+        self._shm.unlink()
+
+
+    def stats(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+                "errors": self.errors,
+                "cpu_time": self.cpu_time,
+                "queue_depth": summarize(list(self.queue_depths)),
+                "decode_time": summarize(list(self.decode_times)),
+                "latency": summarize(list(self.latencies)),
+            }
+
+
+    def report(self):
+        s = self.stats()
+        decode, latency, depth = s["decode_time"], s["latency"], s["queue_depth"]
+        print(f"QR worker: {s['completed']}/{s['submitted']} decoded, {s['dropped']} dropped (busy), "
+              f"{s['timeouts']} timed out, {s['restarts']} restarts, {s['errors']} errors")
+        print(f"  decode p50={decode['p50'] * 1000:.1f}ms p90={decode['p90'] * 1000:.1f}ms "
+              f"p99={decode['p99'] * 1000:.1f}ms max={decode['max'] * 1000:.1f}ms")
+        print(f"  submit->result p50={latency['p50'] * 1000:.1f}ms p99={latency['p99'] * 1000:.1f}ms, "
+              f"queue depth mean={depth['mean']:.2f} max={depth['max']:.0f}")
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
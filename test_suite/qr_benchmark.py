@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+import time
+import argparse
+
+from PIL import Image, ImageOps
+
+from capture.v4l2 import parse_resolution
+from imaging.nv12 import NV12ToRGB565, rgb_to_nv12
+from perf.stats import format_summary, summarize
+from qr.corpus import DEFAULT_ECC, DEFAULT_VERSIONS, DISTORTIONS, CorpusCase, build_corpus, motion_sequence
+from qr.luma import decode_image, decode_luma, luma_image
+from qr.scanner import QRScanner
+from qr.sharpness import SELECT_MODES, SharpnessGate, SharpnessScorer
+
+
+def make_camera_frame(qr_image, width, height, fill=0.8, background=(200, 200, 200)):
+    """Place a QR image on a camera-sized canvas and encode it as NV12"""
+    canvas = Image.new("RGB", (width, height), background)
+    side = int(min(width, height) * fill)
+    qr = qr_image.convert("RGB").resize((side, side), Image.NEAREST)
+    canvas.paste(qr, ((width - side) // 2, (height - side) // 2))
+    return rgb_to_nv12(canvas)
+
+
+# Decode strategies under test. Each factory is called once per frame size
+# and returns a function that decodes one NV12 frame.
+
+def rgb_strategy(width, height):
+    """NV12 -> RGB image -> pyzbar, the way the camera path used to work"""
+    converter = NV12ToRGB565(width, height, width, height, fit="stretch")
+    return lambda frame: decode_image(converter.to_image(frame))
+
+def luma_strategy(width, height):
+    """Y plane straight into pyzbar, as delivered by V4L2Stream.read_luma()"""
+    return lambda frame: decode_luma(frame, width, height)
+
+def autocontrast_strategy(width, height):
+    """Y plane stretched to the full 0-255 range before decoding"""
+    def decode(frame):
+        image = ImageOps.autocontrast(luma_image(frame, width, height), cutoff=1)
+        return decode_luma(image.tobytes(), width, height)
+    return decode
+
+def pyramid_strategy(width, height):
+    """QRScanner downscale pyramid, with no ROI carried between frames"""
+    scanner = QRScanner(width, height)
+    def decode(frame):
+        scanner.reset()
+        return scanner.scan(frame)
+    return decode
+
+STRATEGIES = {
+    "rgb": rgb_strategy,
+    "luma": luma_strategy,
+    "luma-autocontrast": autocontrast_strategy,
+    "pyramid": pyramid_strategy,
+}
+
+def run_case(case, decode, iterations):
+    """Decode every frame of a case `iterations` times; returns timings and successes"""
+    timings = []
+    successes = 0
+    for frame, payload in zip(case.frames, case.payloads):
+        for _ in range(iterations):
+            start = time.perf_counter()
+            results = decode(frame)
+            timings.append(time.perf_counter() - start)
+            data = [r.data for r in results]
+            # Images given on the command line have no known payload
+            if (payload in data) if payload is not None else data:
+                successes += 1
+    return timings, successes
+
+def run_benchmark(cases, strategies, width, height, iterations):
+    report = {
+        "resolution": f"{width}x{height}",
+        "iterations": iterations,
+        "strategies": {},
+        "cases": {case.name: {"params": case.params, "results": {}} for case in cases},
+    }
+    for name in strategies:
+        decode = STRATEGIES[name](width, height)
+        all_timings = []
+        attempts = successes = passed = 0
+        for case in cases:
+            timings, ok = run_case(case, decode, iterations)
+            all_timings.extend(timings)
+            attempts += len(timings)
+            successes += ok
+            passed += ok == len(timings)
+            report["cases"][case.name]["results"][name] = {
+                "success_rate": ok / len(timings) if timings else 0.0,
+                "latency": summarize(timings),
+            }
+        total = sum(all_timings)
+        report["strategies"][name] = {
+            "attempts": attempts,
+            "successes": successes,
+            "success_rate": successes / attempts if attempts else 0.0,
+            "cases_passed": passed,
+            "throughput": attempts / total if total else 0.0,
+            "latency": summarize(all_timings),
+        }
+        print(format_summary(f"{name:18s}", all_timings))
+        print(f"{'':18s}  {successes}/{attempts} decoded ({successes / attempts * 100 if attempts else 0:.1f}%), "
+              f"{passed}/{len(cases)} cases, {attempts / total if total else 0:.1f} decodes/s")
+    return report
+
+def bench_selection(case, width, height, mode):
+    """
+    Scan a motion-blurred sequence with frame selection `mode` (None scans
+    every frame). CPU time includes scoring, so the filter has to pay for
+    itself.
+    """
+    scanner = QRScanner(width, height)
+    scorer = SharpnessScorer(width, height)
+    gate = SharpnessGate(mode) if mode else None
+    successes = 0
+    start = time.process_time()
+    for frame, payload in zip(case.frames, case.payloads):
+        if gate and not gate.select(scorer(frame)):
+            continue
+        if payload in [r.data for r in scanner.scan(frame)]:
+            successes += 1
+    cpu = time.process_time() - start
+    return {
+        "frames": len(case.frames),
+        "decoded_frames": scanner.frames,
+        "successes": successes,
+        "success_rate": successes / scanner.frames if scanner.frames else 0.0,
+        "cpu_seconds": cpu,
+        "successes_per_cpu_second": successes / cpu if cpu else 0.0,
+    }
+
+def run_selection(case, width, height):
+    print(f"\n--- Sharpness selection ({len(case.frames)} motion-blurred frames) ---")
+    results = {}
+    for mode in (None,) + SELECT_MODES:
+        name = mode or "all-frames"
+        r = results[name] = bench_selection(case, width, height, mode)
+        print(f"{name:18s}  decoded {r['decoded_frames']}/{r['frames']} frames, "
+              f"{r['successes']} successes ({r['success_rate'] * 100:.1f}%), "
+              f"{r['cpu_seconds'] * 1000:.0f}ms CPU, {r['successes_per_cpu_second']:.1f} successes/CPU-s")
+    return results
+
+def compare(report, baseline, tolerance):
+    """List regressions of `report` against an earlier run"""
+    regressions = []
+    for name, current in report["strategies"].items():
+        previous = baseline.get("strategies", {}).get(name)
+        if previous is None:
+            continue
+        if current["success_rate"] < previous["success_rate"]:
+            regressions.append(f"{name}: success rate {previous['success_rate'] * 100:.1f}% -> "
+                               f"{current['success_rate'] * 100:.1f}%")
+        if current["latency"]["p50"] > previous["latency"]["p50"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 latency {previous['latency']['p50'] * 1000:.2f}ms -> "
+                               f"{current['latency']['p50'] * 1000:.2f}ms")
+        for case_name, case in report["cases"].items():
+            before = baseline.get("cases", {}).get(case_name, {}).get("results", {}).get(name)
+            after = case["results"].get(name)
+            if before and after and after["success_rate"] < before["success_rate"]:
+                regressions.append(f"{name}: {case_name} no longer decodes reliably")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark QR decoding on a generated corpus of camera frames')
+    parser.add_argument('images', nargs='*',
+                       help='Extra QR code images to include in the corpus')
+    parser.add_argument('--resolution', '-r', type=str, default='240x240',
+                       help='Camera frame resolution (default: 240x240)')
+    parser.add_argument('--iterations', '-n', type=int, default=5,
+                       help='Decodes per frame and strategy (default: 5)')
+    parser.add_argument('--strategies', type=str, default=','.join(STRATEGIES),
+                       help=f"Comma separated strategies to run (default: {','.join(STRATEGIES)})")
+    parser.add_argument('--versions', type=str, default=','.join(map(str, DEFAULT_VERSIONS)),
+                       help='QR versions to generate, from 2,5,10,15 (default: 2,5,10)')
+    parser.add_argument('--ecc', type=str, default=','.join(DEFAULT_ECC),
+                       help='Error correction levels to generate (default: L,M,H)')
+    parser.add_argument('--distortions', type=str, default=','.join(DISTORTIONS),
+                       help='Distortions to apply (default: all)')
+    parser.add_argument('--motion', type=int, default=30,
+                       help='Frames in the sharpness selection sequence, 0 to skip (default: 30)')
+    parser.add_argument('--seed', type=int, default=1,
+                       help='Corpus random seed (default: 1)')
+    parser.add_argument('--json', '-o', type=str, default=None,
+                       help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', '-b', type=str, default=None,
+                       help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                       help='Allowed p50 latency increase over the baseline (default: 0.2)')
+
+    args = parser.parse_args()
+    width, height = parse_resolution(args.resolution)
+    strategies = args.strategies.split(',')
+    for name in strategies:
+        if name not in STRATEGIES:
+            print(f"✗ Unknown strategy: {name}")
+            return 1
+
+    print("=== QR Decode Benchmark ===\n")
+    start = time.monotonic()
+    cases = build_corpus(width, height,
+                         versions=[int(v) for v in args.versions.split(',')],
+                         ecc_levels=args.ecc.split(','),
+                         distortions=args.distortions.split(','),
+                         seed=args.seed)
+    for path in args.images:
+        cases.append(CorpusCase(os.path.basename(path), {"image": path, "parts": 1},
+                                [make_camera_frame(Image.open(path), width, height)], [None]))
+    frames = sum(len(case.frames) for case in cases)
+    print(f"Corpus: {len(cases)} cases, {frames} frames at {width}x{height} NV12 "
+          f"(generated in {time.monotonic() - start:.1f}s)")
+    print(f"{args.iterations} iterations per frame and strategy\n")
+
+    report = run_benchmark(cases, strategies, width, height, args.iterations)
+    report["seed"] = args.seed
+    if args.motion:
+        report["selection"] = run_selection(motion_sequence(width, height, args.motion, seed=args.seed), width, height)
+
+    print()
+    for name in strategies:
+        failed = [case.name for case in cases if report["cases"][case.name]["results"][name]["success_rate"] < 1]
+        if failed:
+            more = f" and {len(failed) - 8} more" if len(failed) > 8 else ""
+            print(f"✗ {name} missed {len(failed)} case(s): {', '.join(failed[:8])}{more}")
+        else:
+            print(f"✓ {name} decoded every case")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        print(f"\n=== Comparison with {args.baseline} ===")
+        for r in regressions:
+            print(f"✗ {r}")
+        if regressions:
+            return 1
+        print("✓ No regressions")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+import argparse
+
+# Add the seedsigner src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seedsigner'))
+
+from capture.ring import CaptureProducer, FrameRing, format_ring_stats
+from capture.v4l2 import V4L2Stream
+from perf.imports import use_test_settings_file
+from qr.fingerprint import DedupDecoder, LumaFingerprinter
+from qr.scanner import QRScanner
+from qr.sharpness import SELECT_MODES, SharpnessGate, SharpnessScorer
+from qr.worker import QRDecodeWorker
+
+# Monkey patch the Settings class to use our custom settings file, whenever
+# something first imports it
+use_test_settings_file()
+
+
+def parse_pyramid(value):
+    factors = tuple(int(f) for f in value.split(","))
+    if not factors or any(f < 1 for f in factors):
+        raise argparse.ArgumentTypeError(f"Invalid pyramid: {value}")
+    return factors
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan QR codes from the live camera with ROI tracking')
+    parser.add_argument('--duration', '-d', type=float, default=30,
+                       help='How long to scan for in seconds (default: 30)')
+    parser.add_argument('--pyramid', '-p', type=parse_pyramid, default=(4, 2, 1),
+                       help='Downscale factors tried in order on full-frame scans (default: 4,2,1)')
+    parser.add_argument('--padding', type=float, default=0.25,
+                       help='ROI padding as a fraction of the code size (default: 0.25)')
+    parser.add_argument('--misses', type=int, default=3,
+                       help='ROI misses before going back to full-frame scans (default: 3)')
+    parser.add_argument('--no-dedup', action='store_true',
+                       help='Decode every frame, even ones nearly identical to a recent one')
+    parser.add_argument('--select', type=str, choices=('all',) + SELECT_MODES, default='adaptive',
+                       help='Which frames to decode by sharpness: all, the sharpest in a sliding window, '
+                            'or those above an adaptive threshold (default: adaptive)')
+    parser.add_argument('--worker', action='store_true',
+                       help='Decode in a separate process; frames arriving while it is busy are skipped')
+    parser.add_argument('--deadline', type=float, default=1.0,
+                       help='With --worker, seconds a single decode may take before the worker is restarted '
+                            '(default: 1.0)')
+
+    args = parser.parse_args()
+
+    print("=== Live QR Scan ===\n")
+    stream = V4L2Stream.from_settings()
+    scanner = QRScanner(stream.width, stream.height, pyramid=args.pyramid,
+                        roi_padding=args.padding, max_misses=args.misses)
+    print(f"Camera: {stream.width}x{stream.height}, pyramid {args.pyramid}")
+    print(f"Scanning for {args.duration:.0f}s, hold a QR code in front of the camera...\n")
+
+    # Frames are fingerprinted and focus-scored on the capture thread, so
+    # the decode loop can skip repeats and blurred frames cheaply
+    fingerprint = LumaFingerprinter(stream.width, stream.height)
+    sharpness = SharpnessScorer(stream.width, stream.height)
+    ring = FrameRing(stream.frame_size)
+    producer = CaptureProducer(stream, ring, analyze=lambda view: (fingerprint(view), sharpness(view)))
+    dedup = None if args.no_dedup or args.worker else DedupDecoder(scanner.scan)
+    gate = None if args.select == 'all' else SharpnessGate(args.select)
+
+    last_data = None
+    last_seq = 0
+    cpu = 0.0
+    worker = None
+    worker_successes = []
+
+    def show(results):
+        nonlocal last_data
+        data = [r.data for r in results]
+        if data and data != last_data:
+            for r in results:
+                print(f"✓ {r.data.decode(errors='replace')} at {tuple(r.rect)}")
+            last_data = data
+
+    def on_result(result):
+        if result.timed_out:
+            print(f"✗ Decode of frame {result.job_id} passed the {args.deadline:.1f}s deadline, worker restarted")
+        elif result.error:
+            print(f"✗ Decode of frame {result.job_id} failed: {result.error}")
+        elif result.results:
+            worker_successes.append(result.job_id)
+            show(result.results)
+
+    if args.worker:
+        worker = QRDecodeWorker(stream.width, stream.height, deadline=args.deadline, on_result=on_result,
+                                scanner_options={"pyramid": args.pyramid, "roi_padding": args.padding,
+                                                 "max_misses": args.misses})
+    try:
+        with stream:
+            cpu_start = time.process_time()
+            producer.start()
+            try:
+                end = time.monotonic() + args.duration
+                while time.monotonic() < end:
+                    frame = ring.acquire(after_seq=last_seq, timeout=1)
+                    if frame is None:
+                        if producer.error:
+                            raise producer.error
+                        continue
+                    with frame:
+                        last_seq = frame.seq
+                        frame_fingerprint, score = frame.meta
+                        if gate and not gate.select(score):
+                            continue
+                        if worker:
+                            worker.submit(frame.data, frame.timestamp)
+                            continue
+                        results = dedup(frame.data, frame_fingerprint) if dedup else scanner.scan(frame.data)
+                    show(results)
+            finally:
+                # Stop capturing before the stream is closed under it
+                producer.stop()
+                if worker:
+                    worker.close()
+                cpu = time.process_time() - cpu_start + (worker.cpu_time if worker else 0.0)
+    except KeyboardInterrupt:
+        print("\nScan interrupted")
+    except Exception as e:
+        print(f"✗ Scan failed: {e}")
+        return 1
+    finally:
+        if worker:
+            worker.close()
+
+    print()
+    if worker:
+        worker.report()
+        successes = len(worker_successes)
+    else:
+        scanner.report()
+        successes = scanner.successes
+    if dedup:
+        dedup.report()
+    if gate:
+        g = gate.stats()
+        print(f"Sharpness selection ({args.select}): {g['selected']}/{g['frames']} frames decoded, "
+              f"mean focus score {g['mean_score']:.0f}")
+    print(f"CPU time {cpu:.1f}s: {successes / cpu if cpu else 0:.2f} successful decodes per CPU-second")
+    print(f"Frame ring: {format_ring_stats(ring.stats())}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
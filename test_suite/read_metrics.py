@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import socket
+import argparse
+
+from perf.metrics import ENV_VAR, MetricsExporter
+
+
+def read_snapshot(exporter):
+    """The latest snapshot text from a running exporter's file or socket"""
+    if exporter.path is not None:
+        with open(exporter.path) as f:
+            return f.read()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(2)
+        sock.connect(exporter.socket_path)
+        chunks = []
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode()
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the metrics a running test script exports')
+    parser.add_argument('spec', type=str,
+                       help=f'Where the script exports to, as set in {ENV_VAR}: a file path or unix:SOCKET')
+    parser.add_argument('--watch', '-w', type=float, default=0,
+                       help='Print again every this many seconds (default: once)')
+
+    args = parser.parse_args()
+    exporter = MetricsExporter.from_spec(args.spec)
+    while True:
+        try:
+            print(read_snapshot(exporter), end="", flush=True)
+        except OSError as e:
+            print(f"✗ Can't read metrics from {args.spec}: {e}")
+            return 1
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
+        print()
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        sys.exit(0)
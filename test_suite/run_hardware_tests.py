@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import sys
+import argparse
+
+import buttons_test
+import camera_test
+import lcd_test
+from capture.session import format_session_stats, stop_sessions
+from perf.metrics import export_metrics
+from perf.profiling import profiled
+from perf.runner import add_runner_arguments, finish, run_tests
+
+
+SUITES = {
+    "lcd": lcd_test.suite,
+    "camera": camera_test.suite,
+    "buttons": buttons_test.suite,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the LCD, camera and button tests as one timed session. '
+                                                 'Tests that need no input run while the button test waits for presses.')
+    parser.add_argument('--suites', type=str, default=','.join(SUITES),
+                       help=f"Comma separated suites to run (default: {','.join(SUITES)})")
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    names = args.suites.split(",")
+    unknown = [n for n in names if n not in SUITES]
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(unknown)}")
+
+    print("=== Hardware Test Session ===\n")
+
+    if "lcd" in names or "camera" in names:
+        print("Initializing renderer...")
+        if lcd_test.initialize_renderer() is None:
+            print("✗ Failed to initialize renderer. Exiting.")
+            return 1
+
+    tests = []
+    for name in names:
+        for test in SUITES[name]():
+            test.name = f"{name}.{test.name}"
+            tests.append(test)
+
+    report = run_tests("+".join(names), tests, concurrent=not args.serial)
+
+    if "camera" in names:
+        stop_sessions()
+        print(f"Camera session: {format_session_stats(camera_test.camera_session().stats())}")
+    return finish(report, args)
+
+if __name__ == "__main__":
+    with export_metrics():
+        sys.exit(profiled(main))
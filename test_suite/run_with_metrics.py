@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import runpy
+import argparse
+
+from perf.metrics import ENV_VAR, export_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a script, such as SeedSigner's main.py, while exporting the "
+                                                 "metrics the display and input drivers record")
+    parser.add_argument('--metrics', type=str, default=None,
+                       help=f'Where to export to: a file path or unix:SOCKET (default: ${ENV_VAR})')
+    parser.add_argument('script', help='Script to run')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="The script's own arguments")
+
+    args = parser.parse_args()
+    script = os.path.abspath(args.script)
+    # The script runs as if started directly; the test suite stays
+    # importable after its own modules, so the drivers find the registry
+    suite_dir = sys.path[0]
+    sys.path[0] = os.path.dirname(script)
+    sys.path.append(suite_dir)
+    sys.argv = [script] + args.args
+    with export_metrics(args.metrics) as exporter:
+        if exporter is None:
+            print(f"✗ No metrics target given (--metrics or {ENV_VAR}), running without exporting")
+        runpy.run_path(script, run_name="__main__")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+from perf.imports import RESULT_PREFIX, format_import_times
+from perf.stats import format_summary
+
+
+# A fresh interpreter that runs the script under perf.imports.profile_startup()
+CHILD = "import sys; from perf.imports import profile_startup; sys.exit(profile_startup(sys.argv[1], sys.argv[2:]))"
+
+
+def average_modules(runs):
+    """Mean import times per module over the runs that imported it"""
+    modules = {}
+    for run in runs:
+        for name, m in run["modules"].items():
+            modules.setdefault(name, []).append(m)
+    return {name: {"self": sum(m["self"] for m in ms) / len(ms),
+                   "cumulative": sum(m["cumulative"] for m in ms) / len(ms),
+                   "depth": ms[0]["depth"], "found": ms[0]["found"]} for name, ms in modules.items()}
+
+def launch(script, script_args, timeout):
+    """One fresh interpreter up to the script's first screen; returns its results with the wall time added"""
+    # Nothing but perf.imports is loaded ahead of the script
+    command = [sys.executable, "-c", CHILD, os.path.abspath(script)] + script_args
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    # Killing the child ends the read below if it never gets to a screen
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        for line in process.stdout:
+            if line.startswith(RESULT_PREFIX):
+                results = json.loads(line[len(RESULT_PREFIX):])
+                results["launch"] = time.perf_counter() - start
+                return results
+        return None
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a test script's startup: each module it imports and "
+                                                 "the time from launch to its first screen")
+    parser.add_argument('--repeat', '-n', type=int, default=5,
+                       help='Launches to average over (default: 5)')
+    parser.add_argument('--top', type=int, default=20,
+                       help='Modules listed per table (default: 20)')
+    parser.add_argument('--timeout', type=float, default=60,
+                       help='Seconds to wait for the first screen (default: 60)')
+    parser.add_argument('script', help='Script to launch, such as test.py')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="The script's own arguments")
+
+    args = parser.parse_args()
+    print(f"=== Startup Profile: {args.script} ===\n")
+    runs = []
+    for _ in range(args.repeat):
+        results = launch(args.script, args.args, args.timeout)
+        if results is None:
+            print(f"✗ {args.script} showed no screen within {args.timeout:.0f}s")
+            return 1
+        runs.append(results)
+
+    print(format_import_times(average_modules(runs), args.top))
+    print()
+    print(format_summary("Launch to first screen", [r["launch"] for r in runs]))
+    print(format_summary("Script start to first screen", [r["screen"] for r in runs]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
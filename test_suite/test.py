@@ -1,9 +1,16 @@
-import os
 import struct
 import time
 from periphery import GPIO
 from hardware.ST7789 import ST7789
-from PIL import Image, ImageDraw, ImageFont
+from capture.session import format_session_stats, get_session
+from capture.v4l2 import V4L2Stream
+from imaging.fonts import get_atlas
+from imaging.nv12 import NV12ToRGB565, rgb_to_rgb565
+from imaging.screen_cache import format_cache_stats, screen_cache
+from perf.memory import low_memory_requested
+from perf.metrics import export_metrics, metrics
+from perf.profiling import profiled
+from PIL import Image
 
 
 # Set up the V4L2 device and capture configuration
@@ -13,6 +20,9 @@ HEIGHT = 135
 PIXEL_FORMAT = 'NV12'  # Y/CbCr 4:2:0 format
 FRAME_SIZE = 48480  # This is the size of one frame in bytes
 
+# Key press -> next frame on the panel, completed by the display driver
+input_latency = metrics.pending_latency("input.latency_ms")
+
 # Define button pins
 pins = [
     ("KEY2", GPIO(43, "in")),  # KEY 2
@@ -30,30 +40,41 @@ pins = [
 disp = ST7789()
 width, height = 240, 240  # LCD resolution
 
+MESSAGE_FONT = "/test_suite/Poppins-Regular.otf"
+MESSAGE_FONT_SIZE = 16
+
+# Camera frame -> LCD buffer converter, created on first use; its remap table
+# fixes the crop, scale and rotation once for every frame
+preview_converter = None
+
+# TEST_LOW_MEMORY=1 converts frames straight out of the capture ring into
+# one preallocated panel buffer
+LOW_MEMORY = low_memory_requested()
+preview_buffer = bytearray(width * height * 2) if LOW_MEMORY else None
+
+
+def camera_session():
+    """
+    The shared V4L2 stream; it stays open between captures and closes when
+    idle. Frames are read at FRAME_SIZE, what this camera delivers for the
+    format, rather than at the size computed from WIDTH and HEIGHT.
+    """
+    return get_session("v4l2", lambda: V4L2Stream(CAMERA_DEVICE, WIDTH, HEIGHT, PIXEL_FORMAT, frame_size=FRAME_SIZE))
+
 
 def capture_frame():
     """
-    Captures one frame from the camera using v4l2-ctl.
+    Captures one frame from the camera through the shared camera session,
+    so the device is only negotiated when the stream isn't already running.
     """
-    # Ensure the output file doesn't already exist
-    if os.path.exists('frame.yuv'):
-        os.remove('frame.yuv')
-    
-    cmd = f'v4l2-ctl --device={CAMERA_DEVICE} --set-fmt-video=width={WIDTH},height={HEIGHT},pixelformat={PIXEL_FORMAT} --stream-mmap --stream-to=frame.yuv --stream-count=1'
-    print(f"Executing command: {cmd}")
-    
-    # Use os.system to run the command and capture potential errors
-    result = os.system(cmd)
-    print(f"v4l2-ctl command exit status: {result}")
-    
-    # Check if file was created
-    if not os.path.exists('frame.yuv'):
-        raise ValueError("Failed to capture frame. No output file created.")
+    with camera_session() as session:
+        frame_data = session.read_frame()
     
-    with open('frame.yuv', 'rb') as file:
-        frame_data = file.read()
+    if frame_data is None:
+        raise ValueError("Failed to capture frame. No frame received from the camera.")
     
     print(f"Captured frame size: {len(frame_data)} bytes")
+    print(f"Camera session: {format_session_stats(session.stats())}")
     
     # Some additional sanity checks
     if len(frame_data) == 0:
@@ -62,6 +83,21 @@ def capture_frame():
     return frame_data
 
 
+def show_ring_frame():
+    """
+    Low-memory counterpart of capture_frame() + display_frame_on_lcd():
+    the frame is converted while still held in the capture ring, so it is
+    never copied out.
+    """
+    with camera_session() as session:
+        frame = session.next_frame()
+        if frame is None:
+            raise ValueError("Failed to capture frame. No frame received from the camera.")
+        with frame:
+            print(f"Captured frame size: {len(frame.data)} bytes")
+            display_frame_on_lcd(frame.data)
+
+
 def convert_nv12_to_rgb(frame_data):
     """
     Converts NV12 frame data to an RGB image with improved error handling.
@@ -134,27 +170,43 @@ def display_on_lcd(rgb_data):
         print(f"Failed to display image: {e}")
 
 
-def display_message(text, display_time = 2):
+def display_frame_on_lcd(frame_data):
     """
-    Display a message on the image display with Unicode and encoding safeguards.
+    Display a raw NV12 camera frame on the LCD.
+
+    Scaling, crop-to-fit and RGB565 encoding happen in one fused pass, so
+    this skips the intermediate RGB buffer and PIL resize entirely.
+    """
+    global preview_converter
+    try:
+        if preview_converter is None:
+            preview_converter = NV12ToRGB565(WIDTH, HEIGHT, width, height, fit="crop")
+        if preview_buffer is not None:
+            disp.ShowBuffer(preview_converter.convert_into(frame_data, preview_buffer))
+        else:
+            disp.ShowBuffer(preview_converter.convert(frame_data))
+    except Exception as e:
+        print(f"Failed to display frame: {e}")
+
+
+def render_message(text, background=(0, 0, 0), color=(255, 255, 255)):
+    """
+    Draw `text` centered on a full-screen image and encode it for the panel.
     
     Args:
-    text (str): The message to display
+    text (str): The message, already sanitized
+    
+    Returns:
+    bytes: Big-endian RGB565 screen buffer
     """
     # Create a blank image with RGB mode
-    img = Image.new('RGB', (width, height), (0, 0, 0))  # Black background
-    draw = ImageDraw.Draw(img)
+    img = Image.new('RGB', (width, height), background)
     
-    # Load a Font
-    #font = ImageFont.load_default()
-    font = ImageFont.truetype("/test_suite/Poppins-Regular.otf", 16)
-    
-    # Sanitize text: replace or remove problematic Unicode characters
-    # This ensures we only use ASCII or easily encodable characters
-    safe_text = ''.join(char if ord(char) < 128 else ' ' for char in text)
+    # Glyphs are rasterized once per process and reused for every message
+    font = get_atlas(MESSAGE_FONT, MESSAGE_FONT_SIZE)
     
     # Use textbbox to get text dimensions
-    text_bbox = draw.textbbox((0, 0), safe_text, font=font)
+    text_bbox = font.textbbox(text)
     
     # Calculate text width and height from bounding box
     text_width = text_bbox[2] - text_bbox[0]
@@ -164,9 +216,29 @@ def display_message(text, display_time = 2):
     x = (width - text_width) // 2
     y = (height - text_height) // 2
     
-    # Draw the text
-    draw.text((x, y), safe_text, font=font, fill=(255, 255, 255))  # White text
-    disp.ShowImage(img, 0, 0)
+    # Draw the text with its top-left at (x, y), as ImageDraw.text does by
+    # default: the baseline sits one ascent below the top
+    font.draw(img, (x, y + font.ascent), text, fill=color)
+    return rgb_to_rgb565(img)
+
+
+def display_message(text, display_time = 2):
+    """
+    Display a message on the image display with Unicode and encoding safeguards.
+    
+    Screens already shown are kept encoded, so showing one again is a
+    single SPI transfer.
+    
+    Args:
+    text (str): The message to display
+    """
+    # Sanitize text: replace or remove problematic Unicode characters
+    # This ensures we only use ASCII or easily encodable characters
+    safe_text = ''.join(char if ord(char) < 128 else ' ' for char in text)
+    
+    # Everything that affects the drawn screen is part of the key
+    key = ("message", safe_text, MESSAGE_FONT, MESSAGE_FONT_SIZE, (0, 0, 0), (255, 255, 255), "center", width, height)
+    disp.ShowBuffer(screen_cache.render(key, lambda: render_message(safe_text)))
 
     # Wait for specified display time
     time.sleep(display_time)
@@ -182,6 +254,7 @@ def button_test():
         start_time = time.time()
         while True:
             if not pin.read():  # Button is pressed (active low)
+                input_latency.mark()
                 results[name] = True
                 display_message(f"{name} Button OK ✓", 1.5)
                 time.sleep(0.5)  # Debounce
@@ -201,10 +274,11 @@ def camera_test():
     """Test the camera by capturing a frame and displaying it."""
     try:
         display_message("Testing Camera...")
-        frame_data = capture_frame()
-        display_message("Converting to RGB...")
-        rgb_data = convert_nv12_to_rgb(frame_data)
-        display_on_lcd(rgb_data)
+        if LOW_MEMORY:
+            show_ring_frame()
+        else:
+            frame_data = capture_frame()
+            display_frame_on_lcd(frame_data)
         time.sleep(2)
         return True
     except Exception as e:
@@ -232,15 +306,18 @@ def main():
             if not in_pin.read():
                 display_message("Exiting Test Suite...")
                 time.sleep(1)
+                print(f"Screen cache: {format_cache_stats(screen_cache.stats())}")
                 return
             
             # Check for KEY1 (Button Test)
             if not key1_pin.read():
+                input_latency.mark()
                 selected_test = "button"
                 break
             
             # Check for KEY2 (Camera Test)
             if not key2_pin.read():
+                input_latency.mark()
                 selected_test = "camera"
                 break
             
@@ -270,4 +347,5 @@ def main():
         time.sleep(0.5)
 
 if __name__ == "__main__":
-    main()
+    with export_metrics():
+        profiled(main)
@@ -1,5 +1,12 @@
+import sys
+
 from pyzbar.pyzbar import decode
 
 from PIL import Image
 
-decode(Image.open('/test_suite/test-qrcode.png'))
\ No newline at end of file
+results = decode(Image.open('/test_suite/test-qrcode.png'))
+if not results:
+    print("✗ No QR code decoded from test-qrcode.png")
+    sys.exit(1)
+for result in results:
+    print(f"✓ Decoded {result.type}: {result.data.decode(errors='replace')}")